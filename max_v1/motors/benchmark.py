@@ -0,0 +1,254 @@
+"""End-to-end throughput benchmark of `FeetechMotorsBus`, on real servos or on the servos of `BusEmulator`.
+
+Every combination of motor count, tick workload, baud rate and retry policy is run for a fixed duration, ticks back
+to back, and reports the achieved rate, the p50/p99 latency of a tick, the failed ticks and the bytes on the wire per
+tick, counted on the serial port. Workloads:
+- "position": read of Present_Position,
+- "state": read of the state block of `read_state`,
+- "read_write": read of the state block and write of Goal_Position, like a control loop tick.
+
+Results are saved as JSON, and can be compared against a previous run with `--baseline`.
+
+On real servos, they must already be at each of the benchmarked baud rates: only the port is set to them.
+
+Example of usage:
+```bash
+# Emulated servos, see `max_v1.motors.emulator`
+python -m max_v1.motors.benchmark --emulate --motors 6 12 --baudrates 1000000 500000 --output bench.json
+# Real servos, compared with a previous run
+python -m max_v1.motors.benchmark --port /dev/ttyACM0 --ids 1 2 3 4 5 6 --baseline bench.json
+```
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import time
+
+import numpy as np
+
+from max_v1.motors.configs import FeetechMotorsBusConfig
+from max_v1.motors.feetech import FeetechMotorsBus
+from max_v1.motors.retry import RetryPolicy
+
+WORKLOADS = ["position", "state", "read_write"]
+
+RETRY_POLICIES = {
+    "default": RetryPolicy(),
+    # Fails fast, for control loops which rather skip a tick than wait for a motor
+    "tight": RetryPolicy(num_retry=3, budget_s=0.004, initial_timeout_s=0.002, min_timeout_s=0.0005),
+}
+
+# Results of the baseline are reported as regressions when their rate dropped by more than this fraction
+DEFAULT_TOLERANCE = 0.1
+
+
+class CountingSerial:
+    """Serial port counting the bytes written and read through it."""
+
+    def __init__(self, ser):
+        self.ser = ser
+        self.tx_bytes = 0
+        self.rx_bytes = 0
+
+    def write(self, data):
+        num_bytes = self.ser.write(data)
+        self.tx_bytes += num_bytes or 0
+        return num_bytes
+
+    def read(self, size=1):
+        data = self.ser.read(size)
+        self.rx_bytes += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.ser, name)
+
+
+def run_workload(motors_bus, workload: str, duration_s: float) -> dict:
+    """Run ticks of `workload` back to back for `duration_s` seconds."""
+    if workload not in WORKLOADS:
+        raise ValueError(f"Unknown workload '{workload}', expected one of {WORKLOADS}.")
+
+    ser = CountingSerial(motors_bus.port_handler.ser)
+    motors_bus.port_handler.ser = ser
+    goal_position = np.full(len(motors_bus.motor_names), 2048)
+
+    latencies = []
+    num_failures = 0
+    start = time.perf_counter()
+    try:
+        while time.perf_counter() - start < duration_s:
+            t_tick = time.perf_counter()
+            try:
+                if workload == "position":
+                    motors_bus.read("Present_Position")
+                else:
+                    motors_bus.read_state()
+                    if workload == "read_write":
+                        # Alternate the goal so that every tick sends a write
+                        goal_position[:] = 2048 + len(latencies) % 2
+                        motors_bus.write("Goal_Position", goal_position)
+            except ConnectionError:
+                num_failures += 1
+            latencies.append(time.perf_counter() - t_tick)
+        elapsed = time.perf_counter() - start
+    finally:
+        motors_bus.port_handler.ser = ser.ser
+
+    latencies = np.array(latencies)
+    num_ticks = len(latencies)
+    return {
+        "num_ticks": num_ticks,
+        "num_failures": num_failures,
+        "rate_hz": num_ticks / elapsed,
+        "latency_s": {
+            "p50": float(np.percentile(latencies, 50)),
+            "p99": float(np.percentile(latencies, 99)),
+            "max": float(latencies.max()),
+        },
+        "tx_bytes_per_tick": ser.tx_bytes / num_ticks,
+        "rx_bytes_per_tick": ser.rx_bytes / num_ticks,
+    }
+
+
+def make_bus(port, motor_ids, backend, retry_policy, model="sts3215"):
+    motors = {f"servo_{motor_id}": (motor_id, model) for motor_id in motor_ids}
+    config = FeetechMotorsBusConfig(port=port, motors=motors, backend=backend, retry_policy=retry_policy)
+    motors_bus = FeetechMotorsBus(config)
+    motors_bus.connect()
+    return motors_bus
+
+
+def run_benchmark(
+    motor_counts,
+    workloads=WORKLOADS,
+    baudrates=(1_000_000,),
+    retry_policies=("default",),
+    backend="native",
+    duration_s=2.0,
+    port=None,
+    motor_ids=None,
+) -> list[dict]:
+    """Benchmark every combination of the parameters. Servos are emulated when `port` is None, otherwise the first
+    `motor_count` servos of `motor_ids` are used."""
+    from max_v1.motors.emulator import BusEmulator
+
+    results = []
+    for motor_count, baudrate, policy_name in itertools.product(motor_counts, baudrates, retry_policies):
+        if port is None:
+            ids = list(range(1, motor_count + 1))
+            emulator = BusEmulator(ids, baudrate=baudrate)
+            bus_port = emulator.start()
+        else:
+            if motor_count > len(motor_ids):
+                raise ValueError(f"{motor_count} motors requested, but only {len(motor_ids)} IDs were given.")
+            ids = motor_ids[:motor_count]
+            emulator = None
+            bus_port = port
+
+        motors_bus = make_bus(bus_port, ids, backend, RETRY_POLICIES[policy_name])
+        try:
+            motors_bus.set_bus_baudrate(baudrate)
+            for workload in workloads:
+                result = {
+                    "motors": motor_count,
+                    "workload": workload,
+                    "baudrate": baudrate,
+                    "retry_policy": policy_name,
+                    "backend": backend,
+                }
+                result.update(run_workload(motors_bus, workload, duration_s))
+                results.append(result)
+                print(
+                    f"{motor_count} motors, {workload}, {baudrate} baud, {policy_name}: "
+                    f"{result['rate_hz']:.0f} Hz, p50 {result['latency_s']['p50'] * 1000:.2f} ms, "
+                    f"p99 {result['latency_s']['p99'] * 1000:.2f} ms, "
+                    f"{result['tx_bytes_per_tick'] + result['rx_bytes_per_tick']:.0f} B/tick"
+                )
+        finally:
+            motors_bus.disconnect()
+            if emulator is not None:
+                emulator.stop()
+    return results
+
+
+def get_result_key(result: dict) -> tuple:
+    return (result["motors"], result["workload"], result["baudrate"], result["retry_policy"], result["backend"])
+
+
+def compare_results(results: list[dict], baseline: list[dict], tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """Print the change of rate of each result present in `baseline`. Returns the descriptions of the regressions."""
+    baseline_by_key = {get_result_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        reference = baseline_by_key.get(get_result_key(result))
+        if reference is None:
+            continue
+        change = result["rate_hz"] / reference["rate_hz"] - 1
+        description = f"{get_result_key(result)}: {reference['rate_hz']:.0f} -> {result['rate_hz']:.0f} Hz ({change:+.1%})"
+        print(description)
+        if change < -tolerance:
+            regressions.append(description)
+    return regressions
+
+
+def save_results(path: str, results: list[dict], emulated: bool):
+    report = {
+        "meta": {
+            "timestamp_utc": time.time(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "emulated": emulated,
+        },
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def load_results(path: str) -> list[dict]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--port", type=str, help="Port of the motors bus")
+    source.add_argument("--emulate", action="store_true", help="Benchmark emulated servos instead of real ones")
+    parser.add_argument("--ids", type=int, nargs="+", default=None, help="IDs of the real servos")
+    parser.add_argument("--motors", type=int, nargs="+", default=[6, 12], help="Numbers of motors")
+    parser.add_argument("--workloads", type=str, nargs="+", default=WORKLOADS, choices=WORKLOADS)
+    parser.add_argument("--baudrates", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument(
+        "--retry-policies", type=str, nargs="+", default=["default"], choices=list(RETRY_POLICIES)
+    )
+    parser.add_argument("--backend", type=str, default="native", help="Bus backend (scservo_sdk or native)")
+    parser.add_argument("--duration-s", type=float, default=2.0, help="Duration of each benchmark")
+    parser.add_argument("--output", type=str, default=None, help="Path of the JSON results")
+    parser.add_argument("--baseline", type=str, default=None, help="JSON results to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Tolerated drop of rate")
+    args = parser.parse_args()
+
+    if args.port is not None and args.ids is None:
+        parser.error("--ids is required with --port")
+
+    results = run_benchmark(
+        args.motors,
+        args.workloads,
+        args.baudrates,
+        args.retry_policies,
+        args.backend,
+        args.duration_s,
+        args.port,
+        args.ids,
+    )
+    if args.output is not None:
+        save_results(args.output, results, emulated=args.emulate)
+
+    if args.baseline is not None:
+        regressions = compare_results(results, load_results(args.baseline), args.tolerance)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} regression(s) above {args.tolerance:.0%}")
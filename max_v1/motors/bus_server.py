@@ -0,0 +1,457 @@
+"""Daemon owning a `FeetechMotorsBus` and serving it to several local processes over a Unix domain socket, so that
+e.g. diagnostics tools, calibration scripts and the controller can use the same serial port at the same time.
+
+Clients use `RemoteMotorsBus`, a proxy with the `FeetechMotorsBus` API used by the rest of the stack (`connect`,
+`read`, `write`, `read_state`, `motor_names`, ...), which forwards each call to the daemon and waits for its reply.
+
+Requests arriving within `merge_window_s` of each other form a batch. In a batch, the reads of the same register by
+different clients are merged into a single sync read of the union of their motors, and likewise for `read_state`.
+The writes of the same register are merged into a single sync write, the latest request winning for a motor written
+by several clients. Writes are sent before reads, so that reads see the goals of their batch. A failed merged
+transaction fails all the requests merged into it, so the requests with motor indices out of range or with values
+not matching their motors are rejected on arrival instead.
+
+The protocol is binary and little-endian. Each request and reply is a header `LENGTH (uint32) REQUEST_ID (uint32)
+OP_OR_STATUS (uint8)` followed by `LENGTH` bytes of body:
+- requests: `NAME_LENGTH (uint8) NAME MOTOR_COUNT (uint8) MOTOR_INDICES (uint8 each, none for all motors)` then the
+  values of a write as an array,
+- replies: the values of a read as an array, the JSON description of the bus for `INFO`, or the error message,
+- arrays: `DESCR_LENGTH (uint16) COUNT (uint32) DESCR DATA`, with the dtype descr of `np.lib.format`.
+
+Example of usage:
+```bash
+python -m max_v1.motors.bus_server --port /dev/ttyACM0 --ids 1 2 3 4 5 6 --socket /tmp/front_bus.sock
+```
+```python
+motors_bus = RemoteMotorsBus("/tmp/front_bus.sock")
+motors_bus.connect()
+position = motors_bus.read("Present_Position")
+motors_bus.write("Goal_Position", position + 30)
+```
+"""
+
+import argparse
+import ast
+import json
+import os
+import selectors
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from max_v1.motors.feetech import (
+    FeetechMotorsBus,
+    FeetechMotorsBusConfig,
+    JointOutOfRangeError,
+    RobotDeviceAlreadyConnectedError,
+    RobotDeviceNotConnectedError,
+)
+
+HEADER = struct.Struct("<IIB")
+ARRAY_HEADER = struct.Struct("<HI")
+
+# Operations of the requests
+READ = 1
+WRITE = 2
+READ_STATE = 3
+INFO = 4
+
+# Status of the replies: OK, or 1 + index of the class of the error raised by the bus, the last one for the others
+OK = 0
+ERRORS = [ConnectionError, KeyError, ValueError, JointOutOfRangeError, RuntimeError]
+
+DEFAULT_MERGE_WINDOW_S = 0.0005
+# Replies waiting to be sent to a client which does not read them, above which it is disconnected
+DEFAULT_MAX_PENDING_BYTES = 1 << 20
+# Time waited by a client for each reply of the server
+DEFAULT_TIMEOUT_S = 1.0
+
+
+def encode_array(values) -> bytes:
+    values = np.ascontiguousarray(np.atleast_1d(values))
+    descr = repr(np.lib.format.dtype_to_descr(values.dtype)).encode()
+    return ARRAY_HEADER.pack(len(descr), len(values)) + descr + values.tobytes()
+
+
+def decode_array(body: bytes, pos: int = 0) -> np.ndarray:
+    descr_length, count = ARRAY_HEADER.unpack_from(body, pos)
+    pos += ARRAY_HEADER.size
+    dtype = np.lib.format.descr_to_dtype(ast.literal_eval(body[pos : pos + descr_length].decode()))
+    return np.frombuffer(body, dtype=dtype, count=count, offset=pos + descr_length).copy()
+
+
+def encode_request(data_name: str, motor_indices, values=None) -> bytes:
+    name = data_name.encode()
+    body = bytes([len(name)]) + name + bytes([len(motor_indices), *motor_indices])
+    if values is not None:
+        body += encode_array(values)
+    return body
+
+
+def get_error_status(error: Exception) -> int:
+    for i, error_class in enumerate(ERRORS):
+        if isinstance(error, error_class):
+            return i + 1
+    return len(ERRORS)
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("The bus server closed the connection.")
+        data += chunk
+    return bytes(data)
+
+
+@dataclass
+class Request:
+    client: socket.socket
+    request_id: int
+    op: int
+    data_name: str
+    # Indices of the motors in `motors_bus.motor_names`
+    motor_indices: np.ndarray
+    values: np.ndarray | None = None
+
+
+class BusServer:
+    """Serves `motors_bus`, which must be connected, on the Unix domain socket `path` from a background thread.
+
+    Replies are sent without blocking, so that a client which stops reading cannot stall the others: they wait in its
+    outbox, and the client is disconnected once more than `max_pending_bytes` are waiting.
+    """
+
+    def __init__(
+        self,
+        motors_bus: FeetechMotorsBus,
+        path: str,
+        merge_window_s: float = DEFAULT_MERGE_WINDOW_S,
+        max_pending_bytes: int = DEFAULT_MAX_PENDING_BYTES,
+    ):
+        self.motors_bus = motors_bus
+        self.path = path
+        self.merge_window_s = merge_window_s
+        self.max_pending_bytes = max_pending_bytes
+        self.listener = None
+        self.selector = None
+        # Bytes received from each client and not parsed yet, and replies not sent yet
+        self.buffers = {}
+        self.outboxes = {}
+        self.thread = None
+        self.is_running = False
+        self.stats = {"clients": 0, "requests": 0, "transactions": 0, "errors": 0, "dropped_clients": 0}
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        self.listener.listen()
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.is_running = True
+        self.thread = threading.Thread(target=self.serve, name="BusServer", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.is_running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        for client in list(self.buffers):
+            self.close_client(client)
+        if self.listener is not None:
+            self.selector.close()
+            self.listener.close()
+            self.listener = None
+            os.unlink(self.path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def serve(self):
+        pending = []
+        while self.is_running:
+            pending += self.receive_requests(timeout_s=0.05)
+            if not pending:
+                continue
+            # Wait for the requests of the other clients for the same tick
+            deadline = time.monotonic() + self.merge_window_s
+            while (remaining := deadline - time.monotonic()) > 0:
+                pending += self.receive_requests(remaining)
+            self.process_batch(pending)
+            pending = []
+
+    def receive_requests(self, timeout_s: float) -> list[Request]:
+        requests = []
+        for key, events in self.selector.select(timeout_s):
+            if key.fileobj is self.listener:
+                client, _ = self.listener.accept()
+                client.setblocking(False)
+                self.selector.register(client, selectors.EVENT_READ)
+                self.buffers[client] = bytearray()
+                self.outboxes[client] = bytearray()
+                self.stats["clients"] += 1
+                continue
+
+            client = key.fileobj
+            if events & selectors.EVENT_WRITE:
+                self.send_pending(client)
+            if not events & selectors.EVENT_READ or client not in self.buffers:
+                continue
+            try:
+                data = client.recv(65536)
+            except BlockingIOError:
+                continue
+            except OSError:
+                data = b""
+            if not data:
+                self.close_client(client)
+                continue
+            buffer = self.buffers[client]
+            buffer += data
+            while len(buffer) >= HEADER.size:
+                length, request_id, op = HEADER.unpack_from(buffer)
+                if len(buffer) < HEADER.size + length:
+                    break
+                body = bytes(buffer[HEADER.size : HEADER.size + length])
+                del buffer[: HEADER.size + length]
+                try:
+                    requests.append(self.parse_request(client, request_id, op, body))
+                except Exception as e:
+                    request = Request(client, request_id, op, "", np.empty(0, dtype=np.intp))
+                    self.reply_error([request], ValueError(f"Malformed request: {e}"))
+        self.stats["requests"] += len(requests)
+        return requests
+
+    def parse_request(self, client, request_id: int, op: int, body: bytes) -> Request:
+        name_length = body[0]
+        data_name = body[1 : 1 + name_length].decode()
+        pos = 1 + name_length
+        num_motors = body[pos]
+        motor_indices = np.frombuffer(body, dtype=np.uint8, count=num_motors, offset=pos + 1).astype(np.intp)
+        num_bus_motors = len(self.motors_bus.motor_names)
+        if num_motors == 0:
+            motor_indices = np.arange(num_bus_motors)
+        elif motor_indices.max() >= num_bus_motors:
+            # Rejected here rather than failing the transaction merged with the requests of the other clients
+            raise ValueError(f"motor indices {motor_indices.tolist()} out of range for {num_bus_motors} motors")
+        values = None
+        if op == WRITE:
+            values = decode_array(body, pos + 1 + num_motors)
+            if values.size != 1 and values.shape != motor_indices.shape:
+                raise ValueError(f"{values.size} values for the {len(motor_indices)} motors {motor_indices.tolist()}")
+        return Request(client, request_id, op, data_name, motor_indices, values)
+
+    def close_client(self, client: socket.socket):
+        self.selector.unregister(client)
+        del self.buffers[client]
+        del self.outboxes[client]
+        client.close()
+
+    def reply(self, request: Request, status: int = OK, body: bytes = b""):
+        outbox = self.outboxes.get(request.client)
+        if outbox is None:
+            return
+        was_empty = not outbox
+        outbox += HEADER.pack(len(body), request.request_id, status)
+        outbox += body
+        if len(outbox) > self.max_pending_bytes:
+            self.stats["dropped_clients"] += 1
+            self.close_client(request.client)
+        elif was_empty:
+            self.send_pending(request.client)
+
+    def send_pending(self, client: socket.socket):
+        """Send as much of the outbox of `client` as its socket accepts, and wait to send the rest once it is
+        writable."""
+        outbox = self.outboxes.get(client)
+        if outbox is None:
+            return
+        try:
+            num_bytes = client.send(outbox)
+        except BlockingIOError:
+            num_bytes = 0
+        except OSError:
+            self.close_client(client)
+            return
+        del outbox[:num_bytes]
+        events = selectors.EVENT_READ | selectors.EVENT_WRITE if outbox else selectors.EVENT_READ
+        if self.selector.get_key(client).events != events:
+            self.selector.modify(client, events)
+
+    def reply_error(self, requests: list[Request], error: Exception):
+        self.stats["errors"] += 1
+        status = get_error_status(error)
+        message = str(error) if status < len(ERRORS) else f"{type(error).__name__}: {error}"
+        for request in requests:
+            self.reply(request, status, message.encode())
+
+    def process_batch(self, requests: list[Request]):
+        groups = {}
+        for request in requests:
+            if request.op == INFO:
+                motors = self.motors_bus.motors
+                self.reply(request, body=json.dumps({"port": self.motors_bus.port, "motors": motors}).encode())
+            else:
+                groups.setdefault((request.op, request.data_name), []).append(request)
+
+        # Writes first, so that the reads of the batch see them
+        for (op, data_name), group in sorted(groups.items(), key=lambda item: item[0][0] != WRITE):
+            self.stats["transactions"] += 1
+            try:
+                if op == WRITE:
+                    self.write(data_name, group)
+                else:
+                    self.read(op, data_name, group)
+            except Exception as e:
+                self.reply_error(group, e)
+
+    def write(self, data_name: str, requests: list[Request]):
+        goals = {}
+        for request in requests:
+            values = np.broadcast_to(request.values, request.motor_indices.shape)
+            goals.update(zip(request.motor_indices.tolist(), values.tolist()))
+        motor_indices = sorted(goals)
+        motor_names = [self.motors_bus.motor_names[i] for i in motor_indices]
+        self.motors_bus.write(data_name, np.array([goals[i] for i in motor_indices]), motor_names)
+        for request in requests:
+            self.reply(request)
+
+    def read(self, op: int, data_name: str, requests: list[Request]):
+        motor_indices = np.unique(np.concatenate([request.motor_indices for request in requests]))
+        motor_names = [self.motors_bus.motor_names[i] for i in motor_indices]
+        if op == READ_STATE:
+            values = self.motors_bus.read_state(motor_names)
+        else:
+            values = self.motors_bus.read(data_name, motor_names)
+        for request in requests:
+            self.reply(request, body=encode_array(values[np.searchsorted(motor_indices, request.motor_indices)]))
+
+
+class RemoteMotorsBus:
+    """Proxy of the `FeetechMotorsBus` served by a `BusServer` on the Unix domain socket `path`. Calls are thread
+    safe, and block until the reply of the server, for at most `timeout_s` (None to wait forever). On a timeout the
+    connection is closed, since a late reply would be taken for the one of the next request."""
+
+    def __init__(self, path: str, timeout_s: float | None = DEFAULT_TIMEOUT_S):
+        self.path = path
+        self.timeout_s = timeout_s
+        self.port = None
+        self.motors = {}
+        self.sock = None
+        self.lock = threading.Lock()
+        self.next_request_id = 0
+        self.is_connected = False
+        self._motor_indices = {}
+
+    def connect(self):
+        if self.is_connected:
+            raise RobotDeviceAlreadyConnectedError(
+                f"RemoteMotorsBus({self.path}) is already connected. Do not call `motors_bus.connect()` twice."
+            )
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout_s)
+        self.sock.connect(self.path)
+        self.is_connected = True
+        info = json.loads(self.request(INFO, encode_request("", [])))
+        self.port = info["port"]
+        self.motors = {name: tuple(motor) for name, motor in info["motors"].items()}
+        self._motor_indices = {name: i for i, name in enumerate(self.motors)}
+
+    def disconnect(self):
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"RemoteMotorsBus({self.path}) is not connected. Try running `motors_bus.connect()` first."
+            )
+        self.sock.close()
+        self.sock = None
+        self.is_connected = False
+
+    @property
+    def motor_names(self) -> list[str]:
+        return list(self.motors.keys())
+
+    @property
+    def motor_models(self) -> list[str]:
+        return [model for _, model in self.motors.values()]
+
+    @property
+    def motor_indices(self) -> list[int]:
+        return [idx for idx, _ in self.motors.values()]
+
+    def get_motor_indices(self, motor_names: str | list[str] | None) -> list[int]:
+        if motor_names is None:
+            return []
+        if isinstance(motor_names, str):
+            motor_names = [motor_names]
+        return [self._motor_indices[name] for name in motor_names]
+
+    def request(self, op: int, body: bytes) -> bytes:
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"RemoteMotorsBus({self.path}) is not connected. You need to run `motors_bus.connect()`."
+            )
+        with self.lock:
+            request_id = self.next_request_id
+            self.next_request_id = (request_id + 1) & 0xFFFFFFFF
+            try:
+                self.sock.sendall(HEADER.pack(len(body), request_id, op) + body)
+                length, reply_id, status = HEADER.unpack(recv_exactly(self.sock, HEADER.size))
+                reply = recv_exactly(self.sock, length)
+            except TimeoutError:
+                self.disconnect()
+                raise TimeoutError(
+                    f"The bus server at {self.path} did not reply within {self.timeout_s}s, disconnected."
+                ) from None
+        if reply_id != request_id:
+            raise ConnectionError(f"Reply {reply_id} of the bus server does not match the request {request_id}.")
+        if status != OK:
+            raise ERRORS[status - 1](reply.decode())
+        return reply
+
+    def read(self, data_name, motor_names: str | list[str] | None = None):
+        return decode_array(self.request(READ, encode_request(data_name, self.get_motor_indices(motor_names))))
+
+    def read_state(self, motor_names: str | list[str] | None = None) -> np.ndarray:
+        return decode_array(self.request(READ_STATE, encode_request("", self.get_motor_indices(motor_names))))
+
+    def write(self, data_name, values: int | float | np.ndarray, motor_names: str | list[str] | None = None):
+        self.request(WRITE, encode_request(data_name, self.get_motor_indices(motor_names), values))
+
+    def __del__(self):
+        if getattr(self, "is_connected", False):
+            self.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=str, required=True, help="Port of the motors bus")
+    parser.add_argument("--ids", type=int, nargs="+", required=True, help="IDs of the servos")
+    parser.add_argument("--model", type=str, default="sts3215", help="Model of the servos")
+    parser.add_argument("--backend", type=str, default="scservo_sdk", help="Bus backend")
+    parser.add_argument("--socket", type=str, required=True, help="Path of the Unix domain socket to serve")
+    parser.add_argument("--merge-window-s", type=float, default=DEFAULT_MERGE_WINDOW_S)
+    args = parser.parse_args()
+
+    motors = {f"servo_{motor_id}": (motor_id, args.model) for motor_id in args.ids}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port=args.port, motors=motors, backend=args.backend))
+    motors_bus.connect()
+    with BusServer(motors_bus, args.socket, args.merge_window_s) as server:
+        print(f"Serving {args.port} on {args.socket}, press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(server.stats)
+    motors_bus.disconnect()
@@ -0,0 +1,612 @@
+"""Native packet codec for the Feetech protocol, used by `FeetechMotorsBus(backend="native")`.
+
+Instruction and status packets are laid out as:
+```
+instruction: 0xFF 0xFF ID LENGTH INSTRUCTION PARAM_1 ... PARAM_N CHECKSUM
+status:      0xFF 0xFF ID LENGTH ERROR       PARAM_1 ... PARAM_N CHECKSUM
+```
+with `LENGTH = N + 2` and `CHECKSUM = ~(ID + LENGTH + INSTRUCTION/ERROR + PARAM_1 + ... + PARAM_N) & 0xFF`.
+
+Sync write packets are precomputed once per register and motor set, then values are packed little-endian straight
+into the reused packet buffer. Sync read responses are read into a preallocated buffer and decoded for all motors
+at once with `np.frombuffer`, including the header, id and checksum validation.
+
+REG_WRITE packets of several motors are sent back to back in a single write by `GroupRegWrite`, and their
+acknowledgements are read like the responses of a sync read. Retries only resend the packets of the motors which did
+not acknowledge.
+
+The `PortHandler`, `PacketHandler`, `GroupSyncRead` and `GroupSyncWrite` classes are drop-in replacements for the
+ones of `scservo_sdk` used by `FeetechMotorsBus`, working over a pyserial port or any other transport of
+`max_v1.motors.transport`, chosen from the port name.
+"""
+
+import os
+import select
+import time
+
+import numpy as np
+
+# Same values as `scservo_sdk`
+COMM_SUCCESS = 0
+COMM_PORT_BUSY = -1
+COMM_TX_FAIL = -2
+COMM_RX_FAIL = -3
+COMM_TX_ERROR = -4
+COMM_RX_WAITING = -5
+COMM_RX_TIMEOUT = -6
+COMM_RX_CORRUPT = -7
+COMM_NOT_AVAILABLE = -9
+
+COMM_RESULTS = {
+    COMM_SUCCESS: "[TxRxResult] Communication success!",
+    COMM_PORT_BUSY: "[TxRxResult] Port is in use!",
+    COMM_TX_FAIL: "[TxRxResult] Failed transmit instruction packet!",
+    COMM_RX_FAIL: "[TxRxResult] Failed get status packet from device!",
+    COMM_TX_ERROR: "[TxRxResult] Incorrect instruction packet!",
+    COMM_RX_WAITING: "[TxRxResult] Now receiving status packet!",
+    COMM_RX_TIMEOUT: "[TxRxResult] There is no status packet!",
+    COMM_RX_CORRUPT: "[TxRxResult] Incorrect status packet!",
+    COMM_NOT_AVAILABLE: "[TxRxResult] Protocol does not support this function!",
+}
+
+# Error bits of the status packets
+ERRBIT_VOLTAGE = 1
+ERRBIT_ANGLE = 2
+ERRBIT_OVERHEAT = 4
+ERRBIT_OVERELE = 8
+ERRBIT_OVERLOAD = 32
+
+RX_PACKET_ERRORS = {
+    ERRBIT_VOLTAGE: "[ServoStatus] Input voltage error!",
+    ERRBIT_ANGLE: "[ServoStatus] Angle sen error!",
+    ERRBIT_OVERHEAT: "[ServoStatus] Overheat error!",
+    ERRBIT_OVERELE: "[ServoStatus] OverEle error!",
+    ERRBIT_OVERLOAD: "[ServoStatus] Overload error!",
+}
+
+BROADCAST_ID = 0xFE
+MAX_ID = 0xFC
+
+INST_PING = 0x01
+INST_READ = 0x02
+INST_WRITE = 0x03
+INST_REG_WRITE = 0x04
+INST_ACTION = 0x05
+INST_SYNC_READ = 0x82
+INST_SYNC_WRITE = 0x83
+
+# Header (2), id, length, instruction/error and checksum
+PACKET_OVERHEAD = 6
+
+DEFAULT_BAUDRATE = 1_000_000
+# USB-serial adapters deliver received bytes by chunks, with a latency of up to a few milliseconds.
+LATENCY_TIMER_MS = 16
+
+VALUE_DTYPES = {1: np.dtype("<u1"), 2: np.dtype("<u2"), 4: np.dtype("<u4")}
+
+
+def compute_checksum(packet: np.ndarray) -> int:
+    """Checksum of a full packet (header and checksum byte included, the latter being ignored)."""
+    return int(~np.sum(packet[2:-1], dtype=np.uint32) & 0xFF)
+
+
+def make_instruction_packet(motor_id: int, instruction: int, params=()) -> bytearray:
+    packet = bytearray(PACKET_OVERHEAD + len(params))
+    packet[0:5] = bytes((0xFF, 0xFF, motor_id, len(params) + 2, instruction))
+    packet[5:-1] = bytes(params)
+    packet[-1] = compute_checksum(np.frombuffer(packet, dtype=np.uint8))
+    return packet
+
+
+def encode_values(values, data_length: int, out: np.ndarray):
+    """Pack `values` little-endian into the uint8 array `out` of shape (len(values), data_length).
+
+    Negative values are sent as their two's complement, like `convert_to_bytes` does.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        values = np.rint(values)
+    values = values.astype(np.int64, copy=False)
+    out[:] = values.astype(VALUE_DTYPES[data_length]).view(np.uint8).reshape(len(values), data_length)
+
+
+def decode_values(data: np.ndarray, data_length: int, out: np.ndarray | None = None) -> np.ndarray:
+    """Decode little-endian values from the uint8 array `data` of shape (num_motors, data_length)."""
+    if out is None:
+        out = np.empty(data.shape, dtype=np.uint8)
+    np.copyto(out, data)
+    return out.view(VALUE_DTYPES[data_length])[:, 0]
+
+
+def parse_status_packets(buffer: bytes | bytearray | memoryview) -> dict[int, tuple[int, bytes]]:
+    """Find all the valid status packets in `buffer`, which may contain garbage or truncated packets.
+
+    This is the slow path used when a response is not exactly the expected sequence of status packets.
+    Returns a dict mapping motor ids to `(error, params)`.
+    """
+    packets = {}
+    buffer = bytes(buffer)
+    pos = 0
+    while True:
+        pos = buffer.find(b"\xff\xff", pos)
+        if pos < 0 or pos + 4 > len(buffer):
+            return packets
+        motor_id, length = buffer[pos + 2], buffer[pos + 3]
+        end = pos + 4 + length
+        if motor_id == 0xFF or length < 2 or end > len(buffer):
+            pos += 1
+            continue
+        packet = np.frombuffer(buffer[pos:end], dtype=np.uint8)
+        if compute_checksum(packet) != packet[-1]:
+            pos += 1
+            continue
+        packets[motor_id] = (buffer[pos + 4], buffer[pos + 5 : end - 1])
+        pos = end
+
+
+class SyncWritePacket:
+    """Prepared sync write packet of `data_length` bytes at `address` for `motor_ids`."""
+
+    def __init__(self, address: int, data_length: int, motor_ids: list[int]):
+        self.address = address
+        self.data_length = data_length
+        self.motor_ids = list(motor_ids)
+
+        num_motors = len(self.motor_ids)
+        length = (data_length + 1) * num_motors + 4
+        self.buffer = bytearray(length + 4)
+        self.array = np.frombuffer(self.buffer, dtype=np.uint8)
+        self.array[:7] = (0xFF, 0xFF, BROADCAST_ID, length, INST_SYNC_WRITE, address, data_length)
+
+        slots = self.array[7:-1].reshape(num_motors, data_length + 1)
+        slots[:, 0] = self.motor_ids
+        self.data = slots[:, 1:]
+
+        # The checksum of the constant part of the packet is computed once
+        self._constant_sum = int(np.sum(self.array[2:7], dtype=np.uint32)) + sum(self.motor_ids)
+
+    def pack(self, values) -> bytearray:
+        encode_values(values, self.data_length, self.data)
+        self.update_checksum()
+        return self.buffer
+
+    def pack_registers(self, registers) -> bytearray:
+        """Pack the values of several registers of the block, given as `(offset, data_length, values)`."""
+        for offset, data_length, values in registers:
+            encode_values(values, data_length, self.data[:, offset : offset + data_length])
+        self.update_checksum()
+        return self.buffer
+
+    def update_checksum(self):
+        self.array[-1] = ~(self._constant_sum + int(np.sum(self.data, dtype=np.uint32))) & 0xFF
+
+
+class SyncReadPacket:
+    """Prepared sync read request of `data_length` bytes at `address` for `motor_ids`, and decoder of the
+    matching responses: one status packet per motor, in the order of `motor_ids`."""
+
+    def __init__(self, address: int, data_length: int, motor_ids: list[int]):
+        self.address = address
+        self.data_length = data_length
+        self.motor_ids = list(motor_ids)
+
+        num_motors = len(self.motor_ids)
+        self.request = make_instruction_packet(
+            BROADCAST_ID, INST_SYNC_READ, [address, data_length, *self.motor_ids]
+        )
+
+        self.status_length = PACKET_OVERHEAD + data_length
+        self.response = bytearray(self.status_length * num_motors)
+        self.response_array = np.frombuffer(self.response, dtype=np.uint8).reshape(num_motors, self.status_length)
+
+        self._expected_header = np.array(
+            [[0xFF, 0xFF, motor_id, data_length + 2] for motor_id in self.motor_ids], dtype=np.uint8
+        )
+        self.data = np.zeros((num_motors, data_length), dtype=np.uint8)
+        self.errors = np.zeros(num_motors, dtype=np.uint8)
+        self.valid = np.zeros(num_motors, dtype=bool)
+        self._values = {}
+
+    def decode(self, num_bytes: int) -> np.ndarray:
+        """Decode the first `num_bytes` of `self.response`. Returns the mask of motors with a valid status
+        packet, whose data is in `self.data`."""
+        if num_bytes == len(self.response):
+            response = self.response_array
+            valid = np.all(response[:, :4] == self._expected_header, axis=1)
+            checksums = ~np.sum(response[:, 2:-1], axis=1, dtype=np.uint32) & 0xFF
+            valid &= checksums == response[:, -1]
+            if valid.all():
+                np.copyto(self.data, response[:, 5:-1])
+                np.copyto(self.errors, response[:, 4])
+                self.valid[:] = True
+                return self.valid
+
+        # Some replies are missing, truncated or corrupted, so they are not aligned anymore
+        packets = parse_status_packets(memoryview(self.response)[:num_bytes])
+        for i, motor_id in enumerate(self.motor_ids):
+            error, params = packets.get(motor_id, (0, b""))
+            self.valid[i] = len(params) == self.data_length
+            if self.valid[i]:
+                self.data[i] = np.frombuffer(params, dtype=np.uint8)
+                self.errors[i] = error
+        return self.valid
+
+    def get_values(self, address: int | None = None, data_length: int | None = None) -> np.ndarray:
+        """Values of the register of `data_length` bytes at `address`, within the block read, for all motors."""
+        if address is None:
+            address, data_length = self.address, self.data_length
+        offset = address - self.address
+        out = self._values.get((address, data_length))
+        if out is None:
+            out = self._values[(address, data_length)] = np.empty((len(self.motor_ids), data_length), np.uint8)
+        return decode_values(self.data[:, offset : offset + data_length], data_length, out)
+
+
+class PortHandler:
+    """Serial port with the same interface as `scservo_sdk.PortHandler`, over the transport of `port_name` (see
+    `max_v1.motors.transport`)."""
+
+    def __init__(self, port_name):
+        self.port_name = port_name
+        self.baudrate = DEFAULT_BAUDRATE
+        self.is_open = False
+        self.is_using = False
+        self.ser = None
+        # Set by `abort`, which also makes the pipe opened with the port readable to wake up `read_into`
+        self.aborted = False
+        self.abort_fds = None
+
+        self.packet_timeout_s = 0.0
+        self.tx_time_per_byte_ms = 0.0
+        self._update_tx_time()
+
+    def openPort(self):
+        return self.setBaudRate(self.baudrate)
+
+    def closePort(self):
+        if self.ser is not None:
+            self.ser.close()
+        if self.abort_fds is not None:
+            for fd in self.abort_fds:
+                os.close(fd)
+            self.abort_fds = None
+        self.is_open = False
+
+    def abort(self):
+        """Make the `read_into` in flight, possibly in another thread, and the next ones return at once, until
+        `clear_abort`."""
+        self.aborted = True
+        if self.abort_fds is not None:
+            os.write(self.abort_fds[1], b"\0")
+
+    def clear_abort(self):
+        self.aborted = False
+        if self.abort_fds is not None:
+            while select.select([self.abort_fds[0]], [], [], 0)[0]:
+                os.read(self.abort_fds[0], 64)
+
+    def clearPort(self):
+        self.ser.reset_input_buffer()
+
+    def setPortName(self, port_name):
+        self.port_name = port_name
+
+    def getPortName(self):
+        return self.port_name
+
+    def setBaudRate(self, baudrate):
+        from max_v1.motors.transport import open_transport
+
+        self.baudrate = baudrate
+        self._update_tx_time()
+        if self.is_open:
+            self.ser.baudrate = baudrate
+            return True
+
+        # Non blocking reads, waiting for bytes is done with `select` in `read_into`
+        self.ser = open_transport(self.port_name, baudrate)
+        self.abort_fds = os.pipe()
+        self.is_open = True
+        return True
+
+    def getBaudRate(self):
+        return self.baudrate
+
+    def _update_tx_time(self):
+        # 10 bits per byte on the wire: start bit, 8 data bits and stop bit
+        self.tx_time_per_byte_ms = (1000.0 / self.baudrate) * 10.0
+
+    def setPacketTimeout(self, packet_length):
+        self.packet_timeout_s = self.get_packet_timeout(packet_length)
+
+    def setPacketTimeoutMillis(self, msec):
+        self.packet_timeout_s = msec / 1000
+
+    def get_packet_timeout(self, packet_length) -> float:
+        """Timeout in seconds to receive `packet_length` bytes."""
+        return (self.tx_time_per_byte_ms * (packet_length + 3) + LATENCY_TIMER_MS) / 1000
+
+    def writePort(self, packet):
+        return self.ser.write(packet)
+
+    def readPort(self, length):
+        return self.ser.read(length)
+
+    def read_into(self, buffer: bytearray, timeout_s: float) -> int:
+        """Read into `buffer` until it is full or `timeout_s` elapsed. Returns the number of bytes read."""
+        view = memoryview(buffer)
+        num_bytes = 0
+        deadline = time.monotonic() + timeout_s
+        while num_bytes < len(buffer) and not self.aborted:
+            chunk = self.ser.read(len(buffer) - num_bytes)
+            if chunk:
+                view[num_bytes : num_bytes + len(chunk)] = chunk
+                num_bytes += len(chunk)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            select.select([self.ser.fileno(), self.abort_fds[0]], [], [], remaining)
+        return num_bytes
+
+
+class PacketHandler:
+    """Same interface as `scservo_sdk.PacketHandler`, for the functions used by `FeetechMotorsBus`."""
+
+    def __init__(self, protocol_version=0):
+        self.protocol_version = protocol_version
+
+    def getProtocolVersion(self):
+        return self.protocol_version
+
+    def getTxRxResult(self, result):
+        return COMM_RESULTS.get(result, "")
+
+    def getRxPacketError(self, error):
+        for bit, message in RX_PACKET_ERRORS.items():
+            if error & bit:
+                return message
+        return ""
+
+    def writeTxOnly(self, port, scs_id, address, length, data):
+        """Write instruction without waiting for a reply, e.g. to `BROADCAST_ID`."""
+        packet = make_instruction_packet(scs_id, INST_WRITE, [address, *data[:length]])
+        return self.txPacket(port, packet)
+
+    def txPacket(self, port, packet):
+        if port.is_using:
+            return COMM_PORT_BUSY
+        if port.writePort(packet) != len(packet):
+            return COMM_TX_FAIL
+        return COMM_SUCCESS
+
+
+class RegWritePackets:
+    """REG_WRITE packets of `data_length` bytes at `address`, one per motor of `motor_ids`, concatenated so that they
+    are sent in a single write. Each motor acknowledges with a status packet without parameters, in order.
+
+    The motors which acknowledged are kept in `valid` until the next `pack`, so that retries only send the packets of
+    the others."""
+
+    def __init__(self, address: int, data_length: int, motor_ids: list[int]):
+        self.address = address
+        self.data_length = data_length
+        self.motor_ids = list(motor_ids)
+
+        num_motors = len(self.motor_ids)
+        self.packet_length = PACKET_OVERHEAD + 1 + data_length
+        self.buffer = bytearray(self.packet_length * num_motors)
+        self.array = np.frombuffer(self.buffer, dtype=np.uint8).reshape(num_motors, self.packet_length)
+        self.array[:, :6] = [
+            (0xFF, 0xFF, motor_id, data_length + 3, INST_REG_WRITE, address) for motor_id in self.motor_ids
+        ]
+        self.data = self.array[:, 6:-1]
+
+        self.response = bytearray(PACKET_OVERHEAD * num_motors)
+        self.valid = np.zeros(num_motors, dtype=bool)
+        self.num_pending = num_motors
+
+    def pack(self, values) -> bytearray:
+        encode_values(values, self.data_length, self.data)
+        self.array[:, -1] = ~np.sum(self.array[:, 2:-1], axis=1, dtype=np.uint32) & 0xFF
+        self.valid[:] = False
+        return self.buffer
+
+    def get_pending_packets(self) -> bytes | bytearray:
+        """Packets of the motors which did not acknowledge yet."""
+        pending = ~self.valid
+        self.num_pending = int(pending.sum())
+        if self.num_pending == len(self.motor_ids):
+            return self.buffer
+        return self.array[pending].tobytes()
+
+    @property
+    def pending_response(self) -> memoryview:
+        return memoryview(self.response)[: PACKET_OVERHEAD * self.num_pending]
+
+    def decode(self, num_bytes: int) -> np.ndarray:
+        """Add the motors whose acknowledgement is in the first `num_bytes` of `pending_response` to `valid`."""
+        packets = parse_status_packets(self.pending_response[:num_bytes])
+        self.valid |= [motor_id in packets for motor_id in self.motor_ids]
+        return self.valid
+
+
+class GroupSyncRead:
+    """Same interface as `scservo_sdk.GroupSyncRead`, backed by a `SyncReadPacket` prepared once the motors
+    are added. `getValues` decodes a register for all motors at once."""
+
+    def __init__(self, port, ph, start_address, data_length):
+        self.port = port
+        self.ph = ph
+        self.start_address = start_address
+        self.data_length = data_length
+        self.motor_ids = []
+        self.packet = None
+        self.last_result = False
+
+    def addParam(self, scs_id):
+        if scs_id in self.motor_ids:
+            return False
+        self.motor_ids.append(scs_id)
+        self.packet = None
+        return True
+
+    def removeParam(self, scs_id):
+        if scs_id in self.motor_ids:
+            self.motor_ids.remove(scs_id)
+            self.packet = None
+
+    def clearParam(self):
+        self.motor_ids = []
+        self.packet = None
+
+    def txPacket(self):
+        if not self.motor_ids:
+            return COMM_NOT_AVAILABLE
+        if self.packet is None:
+            self.packet = SyncReadPacket(self.start_address, self.data_length, self.motor_ids)
+        self.port.clearPort()
+        result = self.ph.txPacket(self.port, self.packet.request)
+        if result == COMM_SUCCESS:
+            # Like `scservo_sdk`, the timeout fits the response by default and can be overridden before `rxPacket`
+            self.port.setPacketTimeout(len(self.packet.response))
+        return result
+
+    def rxPacket(self):
+        self.last_result = False
+        if not self.motor_ids:
+            return COMM_NOT_AVAILABLE
+
+        response = self.packet.response
+        num_bytes = self.port.read_into(response, self.port.packet_timeout_s)
+        return self.decodeResponse(num_bytes)
+
+    def decodeResponse(self, num_bytes):
+        """Decode the first `num_bytes` received in `self.packet.response`."""
+        valid = self.packet.decode(num_bytes)
+        if valid.all():
+            self.last_result = True
+            return COMM_SUCCESS
+        return COMM_RX_TIMEOUT if num_bytes < len(self.packet.response) else COMM_RX_CORRUPT
+
+    def txRxPacket(self):
+        result = self.txPacket()
+        if result != COMM_SUCCESS:
+            return result
+        return self.rxPacket()
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.packet.valid
+
+    @property
+    def data_dict(self) -> dict[int, list[int]]:
+        return {motor_id: self.packet.data[i].tolist() for i, motor_id in enumerate(self.motor_ids)}
+
+    def isAvailable(self, scs_id, address, data_length):
+        if self.packet is None or scs_id not in self.motor_ids:
+            return False
+        if address < self.start_address or self.start_address + self.data_length - data_length < address:
+            return False
+        return bool(self.packet.valid[self.motor_ids.index(scs_id)])
+
+    def getData(self, scs_id, address, data_length):
+        if not self.isAvailable(scs_id, address, data_length):
+            return 0
+        return int(self.getValues(address, data_length)[self.motor_ids.index(scs_id)])
+
+    def getValues(self, address=None, data_length=None) -> np.ndarray:
+        return self.packet.get_values(address, data_length)
+
+    def getBlock(self) -> np.ndarray:
+        """Raw bytes read for all motors, of shape (num_motors, data_length)."""
+        return self.packet.data
+
+
+class GroupSyncWrite:
+    """Same interface as `scservo_sdk.GroupSyncWrite`, backed by a `SyncWritePacket` prepared once the motors
+    are added. `setValues` packs the values of all motors at once."""
+
+    def __init__(self, port, ph, start_address, data_length):
+        self.port = port
+        self.ph = ph
+        self.start_address = start_address
+        self.data_length = data_length
+        self.data_dict = {}
+        self.packet = None
+
+    def addParam(self, scs_id, data=None):
+        if scs_id in self.data_dict:
+            return False
+        self.data_dict[scs_id] = [0] * self.data_length if data is None else list(data)
+        self.packet = None
+        return True
+
+    def removeParam(self, scs_id):
+        if self.data_dict.pop(scs_id, None) is not None:
+            self.packet = None
+
+    def changeParam(self, scs_id, data):
+        if scs_id not in self.data_dict:
+            return False
+        self.data_dict[scs_id] = list(data)
+        if self.packet is not None:
+            self.packet.data[list(self.data_dict).index(scs_id)] = data
+            self.packet.update_checksum()
+        return True
+
+    def clearParam(self):
+        self.data_dict = {}
+        self.packet = None
+
+    def prepare(self) -> SyncWritePacket:
+        if self.packet is None:
+            self.packet = SyncWritePacket(self.start_address, self.data_length, list(self.data_dict))
+            self.packet.data[:] = list(self.data_dict.values())
+            self.packet.update_checksum()
+        return self.packet
+
+    def setValues(self, values):
+        self.prepare().pack(values)
+
+    def setBlockValues(self, registers):
+        """Pack several registers of the block at once, given as `(offset, data_length, values)`."""
+        self.prepare().pack_registers(registers)
+
+    def txPacket(self):
+        if not self.data_dict:
+            return COMM_NOT_AVAILABLE
+        return self.ph.txPacket(self.port, self.prepare().buffer)
+
+
+class GroupRegWrite:
+    """REG_WRITE of a register to several motors, with the transaction interface of `GroupSyncRead` (`txPacket`,
+    `rxPacket` and `valid`): the values are only registered by the motors, and applied by the next ACTION."""
+
+    def __init__(self, port, ph, start_address, data_length, motor_ids):
+        self.port = port
+        self.ph = ph
+        self.packet = RegWritePackets(start_address, data_length, motor_ids)
+
+    def setValues(self, values):
+        self.packet.pack(values)
+
+    def txPacket(self):
+        if not self.packet.motor_ids:
+            return COMM_NOT_AVAILABLE
+        self.port.clearPort()
+        result = self.ph.txPacket(self.port, self.packet.get_pending_packets())
+        if result == COMM_SUCCESS:
+            self.port.setPacketTimeout(len(self.packet.pending_response))
+        return result
+
+    def rxPacket(self):
+        response = self.packet.pending_response
+        num_bytes = self.port.read_into(response, self.port.packet_timeout_s)
+        if self.packet.decode(num_bytes).all():
+            return COMM_SUCCESS
+        return COMM_RX_TIMEOUT if num_bytes < len(response) else COMM_RX_CORRUPT
+
+    @property
+    def valid(self) -> np.ndarray:
+        return self.packet.valid
@@ -13,9 +13,29 @@ class FeetechMotorsBusConfig(MotorsBusConfig):
     port: str
     motors: dict[str, tuple[int, str]]
     mock: bool = False
+    backend: str = "scservo_sdk"
+    retry_policy: object | None = None
+    write_tolerances: dict[str, float] | None = None
+    broadcast_writes: bool = False
+    record_path: str | None = None
 
-    def __init__(self, port: str, motors: dict[str, tuple[int, str]], mock: bool = False):
+    def __init__(
+        self,
+        port: str,
+        motors: dict[str, tuple[int, str]],
+        mock: bool = False,
+        backend: str = "scservo_sdk",
+        retry_policy: object | None = None,
+        write_tolerances: dict[str, float] | None = None,
+        broadcast_writes: bool = False,
+        record_path: str | None = None,
+    ):
         super().__init__(type="feetech")
         self.port = port
         self.motors = motors
         self.mock = mock
+        self.backend = backend
+        self.retry_policy = retry_policy
+        self.write_tolerances = write_tolerances
+        self.broadcast_writes = broadcast_writes
+        self.record_path = record_path
@@ -62,28 +62,18 @@ def configure_motor(port, model, motor_idx_des, baudrate_des):
     # Motor bus is connected, proceed with the rest of the operations
     try:
         print("Scanning all baudrates and motor indices")
-        all_baudrates = set(SCS_SERIES_BAUDRATE_TABLE.values())
-        motor_index = -1  # Set the motor index to an out-of-range value.
-
-        for baudrate in all_baudrates:
-            motor_bus.set_bus_baudrate(baudrate)
-            present_ids = motor_bus.find_motor_indices(list(range(1, 10)))
-            if len(present_ids) > 1:
-                raise ValueError(
-                    "Error: More than one motor ID detected. This script is designed to only handle one motor at a time. Please disconnect all but one motor."
-                )
-
-            if len(present_ids) == 1:
-                if motor_index != -1:
-                    raise ValueError(
-                        "Error: More than one motor ID detected. This script is designed to only handle one motor at a time. Please disconnect all but one motor."
-                    )
-                motor_index = present_ids[0]
-                break
-
-        if motor_index == -1:
+        inventory = motor_bus.scan_baudrates()
+        if len(inventory) > 1:
+            raise ValueError(
+                "Error: More than one motor ID detected. This script is designed to only handle one motor at a time. Please disconnect all but one motor."
+            )
+
+        if len(inventory) == 0:
             raise ValueError("No motors detected. Please ensure you have one motor connected.")
 
+        motor_index = inventory[0].id
+        baudrate = inventory[0].baudrate
+        motor_bus.set_bus_baudrate(baudrate)
         print(f"Motor index found at: {motor_index}")
 
         # Allows ID and BAUDRATE to be written in memory
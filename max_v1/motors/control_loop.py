@@ -0,0 +1,195 @@
+"""Fixed-rate control loop on top of `FeetechMotorsBus`, with deadline and jitter accounting.
+
+Each tick runs three phases: read the motors, compute with a user step function, write the result to the motors.
+Ticks are scheduled on absolute monotonic deadlines (`start + tick * period`), so that timing errors do not
+accumulate, and waiting for a deadline sleeps until shortly before it then spins, since `time.sleep` alone
+commonly wakes up one or several milliseconds late.
+
+Example of usage:
+```python
+def step(state, tick):
+    # Return the goal positions to write, or None to write nothing on this tick
+    return state["Present_Position"] + 1
+
+loop = ControlLoop(motors_bus, step, rate_hz=200)
+loop.run(duration_s=10)
+print(loop.stats.summary())
+```
+"""
+
+import enum
+import time
+
+import numpy as np
+
+
+class DegradePolicy(enum.Enum):
+    # Run the late ticks back to back until the loop is on schedule again
+    CATCH_UP = "catch_up"
+    # Drop the ticks whose deadline has already passed, and realign on the next deadline
+    SKIP = "skip"
+    # Skip the compute and write phases of a tick which starts later than one period, to catch up faster
+    SKIP_WRITE = "skip_write"
+    # Raise a `ControlLoopOverrunError`
+    RAISE = "raise"
+
+
+class ControlLoopOverrunError(Exception):
+    def __init__(self, message="Control loop tick overran its deadline"):
+        self.message = message
+        super().__init__(self.message)
+
+
+class ControlLoopStats:
+    """Timing of the last `history` ticks in preallocated ring buffers, plus counters since the start."""
+
+    PHASES = ["read", "compute", "write"]
+
+    def __init__(self, period_s: float, history: int = 10_000):
+        self.period_s = period_s
+        self.history = history
+        # Delay between the deadline of a tick and its actual start
+        self.jitter_s = np.zeros(history)
+        self.phase_s = {phase: np.zeros(history) for phase in self.PHASES}
+        self.tick_s = np.zeros(history)
+        self.num_ticks = 0
+        self.num_overruns = 0
+        self.num_skipped = 0
+
+    def record(self, jitter_s: float, read_s: float, compute_s: float, write_s: float):
+        i = self.num_ticks % self.history
+        self.jitter_s[i] = jitter_s
+        self.phase_s["read"][i] = read_s
+        self.phase_s["compute"][i] = compute_s
+        self.phase_s["write"][i] = write_s
+        self.tick_s[i] = read_s + compute_s + write_s
+        self.num_ticks += 1
+
+    def summary(self, percentiles=(50, 90, 99)) -> dict:
+        num = min(self.num_ticks, self.history)
+        summary = {
+            "num_ticks": self.num_ticks,
+            "num_overruns": self.num_overruns,
+            "num_skipped": self.num_skipped,
+            "rate_hz": 1 / self.period_s,
+        }
+        if num == 0:
+            return summary
+
+        for name, values in [("jitter_s", self.jitter_s), ("tick_s", self.tick_s)] + [
+            (f"{phase}_s", self.phase_s[phase]) for phase in self.PHASES
+        ]:
+            summary[name] = {
+                f"p{p}": float(value) for p, value in zip(percentiles, np.percentile(values[:num], percentiles), strict=True)
+            }
+            summary[name]["max"] = float(values[:num].max())
+        return summary
+
+
+def wait_until(deadline: float, spin_s: float):
+    """Sleep until `spin_s` before the `time.perf_counter()` `deadline`, then spin until it."""
+    remaining = deadline - time.perf_counter()
+    if remaining > spin_s:
+        time.sleep(remaining - spin_s)
+    while time.perf_counter() < deadline:
+        pass
+
+
+class ControlLoop:
+    """Runs `step_fn(state, tick)` at `rate_hz` between a read and a write of the motors.
+
+    By default the state is `motors_bus.read_state()` and a non None result of `step_fn` is written to
+    "Goal_Position". Other phases can be provided with `read_fn(motors_bus)` and `write_fn(motors_bus, action)`.
+    A tick overruns when it ends after the deadline of the next one; `degrade_policy` decides what to do then.
+    If given, `idle_fn(motors_bus, budget_s)` is called at the end of the ticks which leave some time before the
+    next deadline, e.g. `lambda bus, budget_s: bus.retry_stale_motors(budget_s)`.
+    """
+
+    def __init__(
+        self,
+        motors_bus,
+        step_fn,
+        rate_hz: float = 200,
+        read_fn=None,
+        write_fn=None,
+        idle_fn=None,
+        degrade_policy: DegradePolicy = DegradePolicy.SKIP,
+        spin_s: float = 0.001,
+        history: int = 10_000,
+    ):
+        self.motors_bus = motors_bus
+        self.step_fn = step_fn
+        self.rate_hz = rate_hz
+        self.period_s = 1 / rate_hz
+        self.read_fn = read_fn if read_fn is not None else _read_state
+        self.write_fn = write_fn if write_fn is not None else _write_goal_position
+        self.idle_fn = idle_fn
+        self.degrade_policy = DegradePolicy(degrade_policy)
+        self.spin_s = spin_s
+        self.stats = ControlLoopStats(self.period_s, history)
+        self.is_running = False
+
+    def stop(self):
+        """Stop the loop at the end of the current tick. Can be called from `step_fn` or from another thread."""
+        self.is_running = False
+
+    def run(self, num_ticks: int | None = None, duration_s: float | None = None):
+        if duration_s is not None:
+            num_ticks = int(duration_s * self.rate_hz)
+
+        self.is_running = True
+        start = time.perf_counter()
+        tick = 0
+        while self.is_running and (num_ticks is None or tick < num_ticks):
+            deadline = start + tick * self.period_s
+            wait_until(deadline, self.spin_s)
+
+            t_read = time.perf_counter()
+            jitter = t_read - deadline
+            state = self.read_fn(self.motors_bus)
+            t_compute = time.perf_counter()
+
+            if self.degrade_policy == DegradePolicy.SKIP_WRITE and jitter > self.period_s:
+                self.stats.num_skipped += 1
+                t_write = t_end = t_compute
+            else:
+                action = self.step_fn(state, tick)
+                t_write = time.perf_counter()
+                if action is not None:
+                    self.write_fn(self.motors_bus, action)
+                t_end = time.perf_counter()
+
+            self.stats.record(jitter, t_compute - t_read, t_write - t_compute, t_end - t_write)
+            tick += 1
+
+            next_deadline = start + tick * self.period_s
+            if t_end > next_deadline:
+                self.stats.num_overruns += 1
+                if self.degrade_policy == DegradePolicy.RAISE:
+                    self.is_running = False
+                    raise ControlLoopOverrunError(
+                        f"Tick {tick - 1} took {(t_end - t_read) * 1000:.2f} ms, "
+                        f"more than the period of {self.period_s * 1000:.2f} ms at {self.rate_hz} Hz."
+                    )
+                if self.degrade_policy == DegradePolicy.SKIP:
+                    missed = int((t_end - start) / self.period_s) + 1 - tick
+                    if num_ticks is not None:
+                        # Skipped ticks still count towards the total, to keep the duration of the run
+                        missed = min(missed, num_ticks - tick)
+                    self.stats.num_skipped += missed
+                    tick += missed
+            elif self.idle_fn is not None:
+                idle_s = next_deadline - self.spin_s - time.perf_counter()
+                if idle_s > 0:
+                    self.idle_fn(self.motors_bus, idle_s)
+
+        self.is_running = False
+        return self.stats
+
+
+def _read_state(motors_bus):
+    return motors_bus.read_state()
+
+
+def _write_goal_position(motors_bus, goal_position):
+    motors_bus.write("Goal_Position", goal_position)
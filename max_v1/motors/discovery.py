@@ -0,0 +1,260 @@
+"""Fast discovery of the Feetech motors connected to a bus.
+
+Instead of pinging the IDs one by one with the long timeouts of regular transactions, a single broadcast ping is
+sent and all the status packets received during a listening window are collected. The window is derived from the
+baud rate: the time on the wire of one status packet per possible responder, plus the latency of the USB-serial
+adapter. Listening stops early once all the expected IDs replied, or once the line stayed quiet after the replies.
+Real servos do not space out their replies to a broadcast ping, so replies may collide on the wire and be lost. The
+expected IDs which did not reply, or all the IDs when garbled replies were received, are then pinged with
+`ping_ids`: sync reads of the Model register by chunks of IDs, which the motors answer in turn, and which also give
+the model of each motor. It also finds the motors which do not answer broadcast pings.
+
+Example of usage:
+```python
+motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port="/dev/ttyACM0", motors={}))
+motors_bus.connect()
+for motor in motors_bus.scan_baudrates():
+    print(motor.id, motor.baudrate, motor.model)
+```
+
+Or from the command line, scanning several ports concurrently:
+```bash
+python -m max_v1.motors.discovery --ports /dev/ttyACM0 /dev/ttyACM1
+```
+"""
+
+import argparse
+import select
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from max_v1.motors.codec import (
+    BROADCAST_ID,
+    INST_PING,
+    INST_SYNC_READ,
+    LATENCY_TIMER_MS,
+    MAX_ID,
+    PACKET_OVERHEAD,
+    make_instruction_packet,
+    parse_status_packets,
+)
+
+# Processing time of a motor before it starts replying, on top of its Return_Delay register (0 by default)
+REPLY_DELAY_S = 0.0001
+
+# Number of IDs per sync read of `ping_ids`, to keep every request and response window short
+SYNC_READ_PING_CHUNK = 32
+
+# Address and size of the Model register, the same for all the models of the SCS series
+MODEL_ADDRESS = 3
+MODEL_BYTES = 2
+
+# Model numbers stored in the Model register
+MODEL_NUMBER_TABLE = {
+    777: "sts3215",
+}
+
+
+@dataclass
+class DiscoveredMotor:
+    id: int
+    baudrate: int
+    model_number: int | None = None
+
+    @property
+    def model(self) -> str | None:
+        return MODEL_NUMBER_TABLE.get(self.model_number)
+
+
+def get_byte_time(baudrate: int) -> float:
+    # 10 bits per byte on the wire: start bit, 8 data bits and stop bit
+    return 10 / baudrate
+
+
+def get_response_window(baudrate: int, num_replies: int, reply_bytes: int, latency_s: float) -> float:
+    """Time to receive `num_replies` status packets of `reply_bytes` bytes each, after the end of a request."""
+    return num_replies * (reply_bytes * get_byte_time(baudrate) + REPLY_DELAY_S) + latency_s
+
+
+def wait_readable(ser, timeout_s: float):
+    try:
+        select.select([ser.fileno()], [], [], timeout_s)
+    except (AttributeError, OSError, ValueError):
+        # No file descriptor to wait on (e.g. on Windows), poll instead
+        time.sleep(min(timeout_s, 0.0005))
+
+
+def listen(
+    port_handler, window_s: float, expected_ids=None, quiet_s: float | None = None
+) -> tuple[dict, int]:
+    """Collect the status packets received for at most `window_s` seconds.
+
+    Returns early once all `expected_ids` replied, or once no byte was received for `quiet_s` seconds after the
+    first reply. Returns a dict mapping motor ids to `(error, params)`, and the number of bytes received.
+    """
+    ser = port_handler.ser
+    buffer = bytearray()
+    packets = {}
+    expected_ids = None if expected_ids is None else set(expected_ids)
+
+    start = time.monotonic()
+    deadline = start + window_s
+    last_rx = None
+    while True:
+        now = time.monotonic()
+        chunk = port_handler.readPort(ser.in_waiting or 1)
+        if chunk:
+            buffer += chunk
+            last_rx = now
+            packets = parse_status_packets(buffer)
+            if expected_ids is not None and expected_ids <= packets.keys():
+                break
+            continue
+
+        if now >= deadline:
+            break
+        if quiet_s is not None and last_rx is not None and now - last_rx >= quiet_s:
+            break
+        wait_readable(ser, min(deadline - now, quiet_s or deadline - now))
+    return packets, len(buffer)
+
+
+def send(port_handler, packet: bytearray):
+    port_handler.ser.reset_input_buffer()
+    port_handler.writePort(packet)
+
+
+def broadcast_ping(port_handler, expected_ids=None, max_id: int = MAX_ID, latency_s: float | None = None) -> list[int]:
+    """IDs of the motors replying to a broadcast ping at the current baud rate of `port_handler`.
+
+    If `expected_ids` is given, listening stops as soon as all of them replied, and the window is sized for the
+    highest expected id instead of `max_id`. Replies may collide, see `broadcast_ping_replies`.
+    """
+    motor_ids, _ = broadcast_ping_replies(port_handler, expected_ids, max_id, latency_s)
+    return motor_ids
+
+
+def broadcast_ping_replies(
+    port_handler, expected_ids=None, max_id: int = MAX_ID, latency_s: float | None = None
+) -> tuple[list[int], bool]:
+    """Same as `broadcast_ping`, also returning whether bytes which are not valid status packets were received,
+    i.e. whether replies collided."""
+    if latency_s is None:
+        latency_s = LATENCY_TIMER_MS / 1000
+    baudrate = port_handler.getBaudRate()
+    if expected_ids:
+        max_id = max(expected_ids)
+
+    request = make_instruction_packet(BROADCAST_ID, INST_PING)
+    window_s = len(request) * get_byte_time(baudrate) + get_response_window(
+        baudrate, max_id + 1, PACKET_OVERHEAD, latency_s
+    )
+    # Consecutive replies are separated by a few packet times at most, the rest is adapter latency
+    quiet_s = get_response_window(baudrate, 4, PACKET_OVERHEAD, latency_s)
+
+    send(port_handler, request)
+    packets, num_bytes = listen(port_handler, window_s, expected_ids, quiet_s)
+    collided = num_bytes > len(packets) * PACKET_OVERHEAD
+    return sorted(packets), collided
+
+
+def ping_ids(port_handler, motor_ids, latency_s: float | None = None) -> dict[int, int]:
+    """Model numbers of the motors of `motor_ids` which are present, found with sync reads of the Model register.
+
+    Unlike `broadcast_ping`, this only relies on sync reads, and also returns the model of each motor.
+    """
+    if latency_s is None:
+        latency_s = LATENCY_TIMER_MS / 1000
+    baudrate = port_handler.getBaudRate()
+    motor_ids = list(motor_ids)
+
+    models = {}
+    for i in range(0, len(motor_ids), SYNC_READ_PING_CHUNK):
+        chunk = motor_ids[i : i + SYNC_READ_PING_CHUNK]
+        request = make_instruction_packet(BROADCAST_ID, INST_SYNC_READ, [MODEL_ADDRESS, MODEL_BYTES, *chunk])
+        window_s = len(request) * get_byte_time(baudrate) + get_response_window(
+            baudrate, len(chunk), PACKET_OVERHEAD + MODEL_BYTES, latency_s
+        )
+        send(port_handler, request)
+        packets, _ = listen(port_handler, window_s, expected_ids=chunk)
+        for motor_id, (_, params) in packets.items():
+            if motor_id in chunk and len(params) == MODEL_BYTES:
+                models[motor_id] = int.from_bytes(params, "little")
+    return models
+
+
+def scan_baudrates(port_handler, baudrates, expected_ids=None, latency_s: float | None = None) -> list[DiscoveredMotor]:
+    """Inventory of the motors replying at each of `baudrates`, stopping once all `expected_ids` were found.
+
+    The port is left at its initial baud rate.
+    """
+    initial_baudrate = port_handler.getBaudRate()
+    remaining_ids = None if expected_ids is None else set(expected_ids)
+
+    inventory = []
+    try:
+        for baudrate in baudrates:
+            port_handler.setBaudRate(baudrate)
+            motor_ids, collided = broadcast_ping_replies(port_handler, remaining_ids, latency_s=latency_s)
+            models = ping_ids(port_handler, motor_ids, latency_s) if motor_ids else {}
+
+            # Replies to the broadcast ping may have collided, or some firmwares do not answer it
+            if remaining_ids is not None:
+                missing_ids = remaining_ids - set(motor_ids)
+            elif collided:
+                missing_ids = set(range(MAX_ID + 1)) - set(motor_ids)
+            else:
+                missing_ids = set()
+            if missing_ids:
+                models.update(ping_ids(port_handler, sorted(missing_ids), latency_s))
+
+            motor_ids = sorted(set(motor_ids) | set(models))
+            if not motor_ids:
+                continue
+            inventory += [DiscoveredMotor(motor_id, baudrate, models.get(motor_id)) for motor_id in motor_ids]
+
+            if remaining_ids is not None:
+                remaining_ids -= set(motor_ids)
+                if not remaining_ids:
+                    break
+    finally:
+        port_handler.setBaudRate(initial_baudrate)
+
+    return inventory
+
+
+def scan_ports(ports, baudrates=None, expected_ids=None) -> dict[str, list[DiscoveredMotor]]:
+    """Run `scan_baudrates` on several ports concurrently. A port can only listen at one baud rate at a time,
+    so the baud rates of a port are scanned sequentially."""
+    from max_v1.motors.codec import PortHandler
+    from max_v1.motors.feetech import SCS_SERIES_BAUDRATE_TABLE
+
+    if baudrates is None:
+        baudrates = list(SCS_SERIES_BAUDRATE_TABLE.values())
+
+    def scan_port(port):
+        port_handler = PortHandler(port)
+        if not port_handler.openPort():
+            raise OSError(f"Failed to open port '{port}'.")
+        try:
+            return scan_baudrates(port_handler, baudrates, expected_ids)
+        finally:
+            port_handler.closePort()
+
+    with ThreadPoolExecutor(max_workers=len(ports)) as executor:
+        return dict(zip(ports, executor.map(scan_port, ports), strict=True))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ports", type=str, nargs="+", required=True, help="Motors bus ports")
+    parser.add_argument(
+        "--ids", type=int, nargs="*", default=None, help="Expected motor IDs, to stop scanning once all are found"
+    )
+    args = parser.parse_args()
+
+    for port, inventory in scan_ports(args.ports, expected_ids=args.ids).items():
+        print(f"{port}: {len(inventory)} motor(s)")
+        for motor in inventory:
+            print(f"  ID {motor.id} at {motor.baudrate} baud, model {motor.model or motor.model_number}")
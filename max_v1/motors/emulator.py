@@ -0,0 +1,472 @@
+"""Emulator of a bus of Feetech STS3215 servos on a Linux pseudo-terminal, to run `FeetechMotorsBus` without hardware.
+
+The emulator speaks the real packet protocol (PING, READ, WRITE, REG_WRITE, ACTION, SYNC_READ, SYNC_WRITE), over the
+slave end of a pty which can be opened like any serial port, or over an in-memory loopback of
+`max_v1.motors.transport`. Each servo has its own register file laid out like `SCS_SERIES_CONTROL_TABLE`, so that
+IDs, baud rates, goals and settings written by the bus are read back.
+
+Replies are timed like on the wire: a reply is only delivered once the request and the reply had time to go through
+the line at the baud rate set on the port, after the Return_Delay of the servo (2 us per unit). Servos only answer
+when the baud rate of the port matches their Baud_Rate register. Faults can be injected with `FaultConfig`: dropped
+replies, corrupted checksums, latency spikes and colliding replies to broadcast pings.
+
+Goal positions are reached instantly when the torque is enabled: the emulator is meant for the timing of the bus,
+not for the dynamics of the servos.
+
+Example of usage:
+```python
+with BusEmulator([1, 2, 3], faults=FaultConfig(drop_rate=0.01, seed=0)) as emulator:
+    config = FeetechMotorsBusConfig(port=emulator.port, motors=motors, backend="native")
+    motors_bus = FeetechMotorsBus(config)
+    motors_bus.connect()
+    print(motors_bus.read("Present_Position"))
+    print(emulator.stats)
+```
+
+Or from the command line, to serve a bus until Ctrl+C:
+```bash
+python -m max_v1.motors.emulator --ids 1 2 3 4 5 6 --drop-rate 0.01
+```
+"""
+
+import argparse
+import os
+import random
+import select
+import struct
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from max_v1.motors.codec import (
+    BROADCAST_ID,
+    DEFAULT_BAUDRATE,
+    INST_ACTION,
+    INST_PING,
+    INST_READ,
+    INST_REG_WRITE,
+    INST_SYNC_READ,
+    INST_SYNC_WRITE,
+    INST_WRITE,
+    compute_checksum,
+    make_instruction_packet,
+)
+from max_v1.motors.discovery import MODEL_NUMBER_TABLE, REPLY_DELAY_S, get_byte_time
+from max_v1.motors.feetech import SCS_SERIES_BAUDRATE_TABLE, SCS_SERIES_CONTROL_TABLE
+
+MEMORY_SIZE = 256
+
+# Unit of the Return_Delay register
+RETURN_DELAY_UNIT_S = 2e-6
+
+# Time slept by the serving thread before spinning until a reply is due, `time.sleep` alone often wakes up late
+SPIN_S = 0.0002
+
+# Registers of a servo out of the factory, the others are 0
+DEFAULT_REGISTERS = {
+    "Baud_Rate": 0,
+    "Return_Delay": 0,
+    "Response_Status_Level": 1,
+    "Max_Angle_Limit": 4095,
+    "Max_Temperature_Limit": 70,
+    "Max_Voltage_Limit": 140,
+    "Min_Voltage_Limit": 40,
+    "Max_Torque_Limit": 1000,
+    "P_Coefficient": 32,
+    "D_Coefficient": 32,
+    "Protection_Current": 500,
+    "Angular_Resolution": 1,
+    "Torque_Limit": 1000,
+    "Lock": 1,
+    "Present_Position": 2048,
+    "Present_Voltage": 120,
+    "Present_Temperature": 30,
+}
+
+MODEL_NUMBERS = {model: number for number, model in MODEL_NUMBER_TABLE.items()}
+
+try:
+    import termios
+
+    # Baud rates of the speeds of termios, e.g. `termios.B115200`
+    TERMIOS_BAUDRATES = {
+        getattr(termios, name): int(name[1:]) for name in dir(termios) if name.startswith("B") and name[1:].isdigit()
+    }
+except ImportError:
+    # The pty of the emulator needs termios, but the servos can still be served with `start(loopback=...)`
+    termios = None
+    TERMIOS_BAUDRATES = {}
+
+
+@dataclass
+class FaultConfig:
+    """Probabilities of the faults injected on each reply, drawn from a generator seeded with `seed`."""
+
+    # The reply is not sent at all
+    drop_rate: float = 0.0
+    # The checksum of the reply is wrong
+    corrupt_rate: float = 0.0
+    # The reply is delayed by `spike_s` on top of the wire time
+    spike_rate: float = 0.0
+    spike_s: float = 0.005
+    seed: int | None = None
+    # Like real servos, the servos with the same Return_Delay reply to a broadcast ping at the same time instead of
+    # in turn: their replies collide, and the line carries the bitwise AND of their bytes
+    collide_broadcast: bool = False
+
+
+class EmulatedServo:
+    """Register file of one servo, with `SCS_SERIES_CONTROL_TABLE` addresses."""
+
+    def __init__(self, motor_id: int, baudrate: int = DEFAULT_BAUDRATE, model: str = "sts3215"):
+        self.memory = bytearray(MEMORY_SIZE)
+        for data_name, value in DEFAULT_REGISTERS.items():
+            self.set(data_name, value)
+        self.set("Model", MODEL_NUMBERS[model])
+        self.set("ID", motor_id)
+        self.set("Baud_Rate", list(SCS_SERIES_BAUDRATE_TABLE.values()).index(baudrate))
+        # Pending write of a REG_WRITE instruction, applied on ACTION
+        self.registered = None
+
+    @property
+    def id(self) -> int:
+        return self.get("ID")
+
+    @property
+    def baudrate(self) -> int:
+        return SCS_SERIES_BAUDRATE_TABLE[self.get("Baud_Rate")]
+
+    @property
+    def return_delay_s(self) -> float:
+        return self.get("Return_Delay") * RETURN_DELAY_UNIT_S
+
+    def get(self, data_name: str) -> int:
+        addr, bytes = SCS_SERIES_CONTROL_TABLE[data_name]
+        return int.from_bytes(self.memory[addr : addr + bytes], "little")
+
+    def set(self, data_name: str, value: int):
+        addr, bytes = SCS_SERIES_CONTROL_TABLE[data_name]
+        self.memory[addr : addr + bytes] = (value & ((1 << (8 * bytes)) - 1)).to_bytes(bytes, "little")
+
+    def read(self, address: int, length: int) -> bytes:
+        return bytes(self.memory[address : address + length])
+
+    def write(self, address: int, data: bytes):
+        self.memory[address : address + len(data)] = data
+        goal_addr, goal_bytes = SCS_SERIES_CONTROL_TABLE["Goal_Position"]
+        if self.get("Torque_Enable") and address < goal_addr + goal_bytes and address + len(data) > goal_addr:
+            self.set("Present_Position", self.get("Goal_Position"))
+
+
+def make_status_packet(motor_id: int, params=(), error: int = 0) -> bytearray:
+    # Status packets have the layout of instruction packets, with the error in place of the instruction
+    return make_instruction_packet(motor_id, error, params)
+
+
+def collide_replies(replies: list[tuple[EmulatedServo, bytearray]]) -> list[tuple[EmulatedServo, bytearray]]:
+    """Merge the replies of the servos with the same Return_Delay, which start together on the line. The line is
+    pulled low by any of the servos, so the bytes received are the bitwise AND of theirs."""
+    groups = {}
+    for servo, reply in replies:
+        groups.setdefault(servo.get("Return_Delay"), []).append((servo, reply))
+
+    merged = []
+    for group in groups.values():
+        servo, reply = group[0]
+        reply = bytearray(reply)
+        for _, other in group[1:]:
+            reply = bytearray(a & b for a, b in zip(reply, other, strict=True))
+        merged.append((servo, reply))
+    return merged
+
+
+def get_line_baudrate(fd: int) -> int | None:
+    """Baud rate set on the pty by the client, or None if it cannot be read."""
+    if termios is None:
+        return None
+    try:
+        speed = termios.tcgetattr(fd)[5]
+    except (termios.error, OSError):
+        return None
+
+    if speed in TERMIOS_BAUDRATES:
+        return TERMIOS_BAUDRATES[speed]
+
+    # Baud rates without a constant (e.g. 128000) are set with `BOTHER` and read back with `TCGETS2`
+    try:
+        import fcntl
+
+        TCGETS2 = 0x802C542A
+        buffer = fcntl.ioctl(fd, TCGETS2, bytes(44))
+        return struct.unpack("4I20s2I", buffer)[-1]
+    except OSError:
+        return None
+
+
+def wait_until(deadline: float):
+    remaining = deadline - time.perf_counter()
+    if remaining > SPIN_S:
+        time.sleep(remaining - SPIN_S)
+    while time.perf_counter() < deadline:
+        pass
+
+
+class BusEmulator:
+    """Servos of `motor_ids` on a pty, served by a background thread between `start()` and `stop()`.
+
+    `baudrate` is the initial baud rate of the servos, and the baud rate of the line when the one set on the pty by
+    the client cannot be read. `latency_s` emulates the latency of a USB-serial adapter, added once per request.
+    """
+
+    def __init__(
+        self,
+        motor_ids=(),
+        baudrate: int = DEFAULT_BAUDRATE,
+        faults: FaultConfig | None = None,
+        latency_s: float = 0.0,
+        model: str = "sts3215",
+    ):
+        self.servos = [EmulatedServo(motor_id, baudrate, model) for motor_id in motor_ids]
+        self.baudrate = baudrate
+        self.faults = faults if faults is not None else FaultConfig()
+        self.latency_s = latency_s
+        self.rng = random.Random(self.faults.seed)
+
+        self.port = None
+        self.master_fd = None
+        self.slave_fd = None
+        # Other end of the loopback, when served with `start(loopback=...)` instead of a pty
+        self.sock = None
+        self.thread = None
+        self.is_running = False
+        self.stats = {
+            "requests": 0,
+            "replies": 0,
+            "dropped": 0,
+            "corrupted": 0,
+            "spikes": 0,
+            "rx_bytes": 0,
+            "tx_bytes": 0,
+        }
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def add_servo(self, motor_id: int, baudrate: int | None = None, model: str = "sts3215") -> EmulatedServo:
+        servo = EmulatedServo(motor_id, baudrate or self.baudrate, model)
+        self.servos.append(servo)
+        return servo
+
+    def get_servo(self, motor_id: int) -> EmulatedServo | None:
+        for servo in self.servos:
+            if servo.id == motor_id:
+                return servo
+        return None
+
+    def start(self, loopback: str | None = None) -> str:
+        """Open the pty and start serving. Returns the name of the port to connect to.
+
+        If `loopback` is given, the servos are served in memory on the port "loop://<loopback>" instead of a pty
+        (see `max_v1.motors.transport`). The baud rate of the line is then always `self.baudrate`.
+        """
+        if loopback is not None:
+            from max_v1.motors.transport import create_loopback
+
+            self.sock = create_loopback(loopback)
+            self.master_fd = self.sock.fileno()
+            self.port = f"loop://{loopback}"
+        else:
+            import pty
+            import tty
+
+            self.master_fd, self.slave_fd = pty.openpty()
+            tty.setraw(self.master_fd)
+            tty.setraw(self.slave_fd)
+            self.port = os.ttyname(self.slave_fd)
+
+        self.is_running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        self.is_running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        else:
+            for fd in [self.master_fd, self.slave_fd]:
+                if fd is not None:
+                    os.close(fd)
+        self.master_fd = self.slave_fd = None
+
+    def get_line_baudrate(self) -> int:
+        return (get_line_baudrate(self.slave_fd) if self.slave_fd is not None else None) or self.baudrate
+
+    def wait_until_read(self, num_bytes: int, timeout_s: float = 1.0):
+        """Wait until the servos read `num_bytes` bytes in total, e.g. all the bytes sent by the client before it
+        changes the baud rate of the line."""
+        deadline = time.perf_counter() + timeout_s
+        while self.stats["rx_bytes"] < num_bytes:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"The emulated servos read {self.stats['rx_bytes']} bytes instead of {num_bytes}")
+            time.sleep(0.001)
+
+    def serve(self):
+        buffer = bytearray()
+        while self.is_running:
+            readable, _, _ = select.select([self.master_fd], [], [], 0.05)
+            if not readable:
+                continue
+            # The baud rate is read before the bytes, so that a client which switches baud rate once its bytes were
+            # read (see `wait_until_read`) never has them handled at the new baud rate
+            baudrate = self.get_line_baudrate()
+            try:
+                chunk = os.read(self.master_fd, 1024)
+            except OSError:
+                chunk = b""
+            if not chunk:
+                # The client closed the port, wait for it to reopen it
+                time.sleep(0.01)
+                continue
+            t_rx = time.perf_counter()
+            self.stats["rx_bytes"] += len(chunk)
+            buffer += chunk
+
+            for packet in self.pop_packets(buffer):
+                self.stats["requests"] += 1
+                self.handle(packet, t_rx, baudrate)
+
+    def pop_packets(self, buffer: bytearray) -> list[bytes]:
+        """Remove the complete instruction packets from the start of `buffer`, skipping the invalid bytes."""
+        packets = []
+        while True:
+            start = buffer.find(b"\xff\xff")
+            if start < 0:
+                # Keep a trailing 0xFF which may start the next header
+                del buffer[: max(len(buffer) - 1, 0)]
+                return packets
+            del buffer[:start]
+            if len(buffer) < 4:
+                return packets
+            end = 4 + buffer[3]
+            if buffer[2] == 0xFF or buffer[3] < 2:
+                del buffer[:1]
+                continue
+            if len(buffer) < end:
+                return packets
+            packet = bytes(buffer[:end])
+            if compute_checksum(np.frombuffer(packet, dtype=np.uint8)) != packet[-1]:
+                # Corrupted or misaligned, resynchronize on the next header
+                del buffer[:1]
+                continue
+            packets.append(packet)
+            del buffer[:end]
+
+    def handle(self, packet: bytes, t_rx: float, baudrate: int):
+        motor_id, instruction, params = packet[2], packet[4], packet[5:-1]
+        servos = [servo for servo in self.servos if servo.baudrate == baudrate]
+        if motor_id != BROADCAST_ID:
+            servos = [servo for servo in servos if servo.id == motor_id]
+
+        replies = []
+        if instruction == INST_PING:
+            replies = [(servo, b"") for servo in sorted(servos, key=lambda servo: servo.id)]
+        elif instruction == INST_READ:
+            replies = [(servo, servo.read(params[0], params[1])) for servo in servos]
+        elif instruction == INST_WRITE:
+            for servo in servos:
+                servo.write(params[0], params[1:])
+            replies = [(servo, b"") for servo in servos if servo.get("Response_Status_Level")]
+        elif instruction == INST_REG_WRITE:
+            for servo in servos:
+                servo.registered = (params[0], params[1:])
+            replies = [(servo, b"") for servo in servos if servo.get("Response_Status_Level")]
+        elif instruction == INST_ACTION:
+            for servo in servos:
+                if servo.registered is not None:
+                    servo.write(*servo.registered)
+                    servo.registered = None
+        elif instruction == INST_SYNC_WRITE:
+            addr, length = params[0], params[1]
+            for i in range(2, len(params) - length, length + 1):
+                servo = self.get_servo(params[i])
+                if servo in servos:
+                    servo.write(addr, params[i + 1 : i + 1 + length])
+        elif instruction == INST_SYNC_READ:
+            addr, length = params[0], params[1]
+            # The servos reply one after the other, in the order of the request
+            for requested_id in params[2:]:
+                servo = self.get_servo(requested_id)
+                if servo in servos:
+                    replies.append((servo, servo.read(addr, length)))
+
+        # Broadcast instructions get no reply, except the PING and SYNC_READ
+        if motor_id == BROADCAST_ID and instruction not in (INST_PING, INST_SYNC_READ):
+            replies = []
+        replies = [(servo, make_status_packet(servo.id, params)) for servo, params in replies]
+        if motor_id == BROADCAST_ID and instruction == INST_PING and self.faults.collide_broadcast:
+            replies = collide_replies(replies)
+        self.send_replies(replies, t_rx + len(packet) * get_byte_time(baudrate) + self.latency_s, baudrate)
+
+    def send_replies(self, replies, t_request_end: float, baudrate: int):
+        """Send the status packets of `replies`, given as `(servo, packet)`, one after the other."""
+        byte_time = get_byte_time(baudrate)
+        t = t_request_end
+        for servo, reply in replies:
+            faults = self.faults
+            if self.rng.random() < faults.drop_rate:
+                self.stats["dropped"] += 1
+                continue
+
+            if self.rng.random() < faults.corrupt_rate:
+                reply[-1] ^= 0xFF
+                self.stats["corrupted"] += 1
+            if self.rng.random() < faults.spike_rate:
+                t += faults.spike_s
+                self.stats["spikes"] += 1
+
+            t += servo.return_delay_s + REPLY_DELAY_S + len(reply) * byte_time
+            wait_until(t)
+            try:
+                os.write(self.master_fd, reply)
+            except OSError:
+                return
+            self.stats["replies"] += 1
+            self.stats["tx_bytes"] += len(reply)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ids", type=int, nargs="+", required=True, help="IDs of the emulated servos")
+    parser.add_argument("--baudrate", type=int, default=DEFAULT_BAUDRATE, help="Initial baud rate of the servos")
+    parser.add_argument("--latency-s", type=float, default=0.0, help="Latency of the emulated USB-serial adapter")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Probability of dropping a reply")
+    parser.add_argument("--corrupt-rate", type=float, default=0.0, help="Probability of corrupting a reply")
+    parser.add_argument("--spike-rate", type=float, default=0.0, help="Probability of delaying a reply")
+    parser.add_argument("--spike-s", type=float, default=0.005, help="Delay of the delayed replies")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the fault injection")
+    parser.add_argument(
+        "--collide-broadcast", action="store_true", help="Make the replies to broadcast pings collide"
+    )
+    args = parser.parse_args()
+
+    faults = FaultConfig(
+        args.drop_rate, args.corrupt_rate, args.spike_rate, args.spike_s, args.seed, args.collide_broadcast
+    )
+    with BusEmulator(args.ids, args.baudrate, faults, args.latency_s) as emulator:
+        print(f"Emulating servos {args.ids} on {emulator.port}, press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(emulator.stats)
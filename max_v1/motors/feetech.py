@@ -1,19 +1,38 @@
 import enum
+import functools
+import importlib
 import logging
-import math
 import time
 import traceback
+from collections import OrderedDict
 from copy import deepcopy
 
 import numpy as np
-import tqdm
+
+from max_v1.motors.retry import FailureStats, RetryPolicy, RttEstimator
+from max_v1.motors.telemetry import DEFAULT_CAPACITY, TelemetryRecorder
 
 # Définir les classes et fonctions manquantes localement
 class FeetechMotorsBusConfig:
-    def __init__(self, port, motors, mock=False):
+    def __init__(
+        self,
+        port,
+        motors,
+        mock=False,
+        backend="scservo_sdk",
+        retry_policy=None,
+        write_tolerances=None,
+        broadcast_writes=False,
+        record_path=None,
+    ):
         self.port = port
         self.motors = motors
         self.mock = mock
+        self.backend = backend
+        self.retry_policy = retry_policy
+        self.write_tolerances = write_tolerances
+        self.broadcast_writes = broadcast_writes
+        self.record_path = record_path
 
 class RobotDeviceAlreadyConnectedError(Exception):
     def __init__(self, message="Device is already connected"):
@@ -25,6 +44,11 @@ class RobotDeviceNotConnectedError(Exception):
         self.message = message
         super().__init__(self.message)
 
+class EmergencyStopError(Exception):
+    def __init__(self, message="The bus is emergency stopped, call `motors_bus.clear_emergency_stop()` first"):
+        self.message = message
+        super().__init__(self.message)
+
 def capture_timestamp_utc():
     """Capture the current timestamp in UTC."""
     return time.time()
@@ -34,6 +58,12 @@ BAUDRATE = 1_000_000
 TIMEOUT_MS = 1000
 
 MAX_ID_RANGE = 252
+BROADCAST_ID = 0xFE
+INST_WRITE = 0x03
+INST_ACTION = 0x05
+
+# Number of times the torque disabling packet of `emergency_stop` is sent
+ESTOP_REPEATS = 3
 
 # The following bounds define the lower and upper joints range (after calibration).
 # For joints in degree (i.e. revolute joints), their nominal range is [-180, 180] degrees
@@ -51,6 +81,36 @@ UPPER_BOUND_LINEAR = 110
 
 HALF_TURN_DEGREE = 180
 
+# Modules with the interface of `scservo_sdk` used by `FeetechMotorsBus`, by backend. "scservo_sdk" relies on the
+# python feetech sdk, "native" on the NumPy packet codec of `max_v1.motors.codec` which avoids per-byte Python work
+# when building packets and decoding responses, "emulator" on the same codec over the pty of a `BusEmulator` started
+# on connect (see `max_v1.motors.emulator`), and "mock" on a mocked sdk whose transactions succeed instantly.
+BACKEND_MODULES = {
+    "scservo_sdk": "scservo_sdk",
+    "native": "max_v1.motors.codec",
+    "emulator": "max_v1.motors.codec",
+    "mock": "max_v1.tests.motors.mock_scservo_sdk",
+}
+AVAILABLE_BACKENDS = list(BACKEND_MODULES)
+# Backends relying on `max_v1.motors.codec`, which packs and decodes the values of all the motors at once
+NATIVE_BACKENDS = ["native", "emulator"]
+
+
+def register_backend(backend: str, module: str, native: bool = False):
+    """Make the module `module`, with the interface of `scservo_sdk`, available as `backend`."""
+    BACKEND_MODULES[backend] = module
+    if backend not in AVAILABLE_BACKENDS:
+        AVAILABLE_BACKENDS.append(backend)
+    if native and backend not in NATIVE_BACKENDS:
+        NATIVE_BACKENDS.append(backend)
+    load_backend.cache_clear()
+
+
+@functools.cache
+def load_backend(backend: str):
+    """Module of `backend`, imported on first use so that optional sdks are only needed by the buses using them."""
+    return importlib.import_module(BACKEND_MODULES[backend])
+
 
 # See this link for STS3215 Memory Table:
 # https://docs.google.com/spreadsheets/d/1GVs7W1VS1PqdhA1nW-abeyAHhTUxKUdR/edit?usp=sharing&ouid=116566590112741600240&rtpof=true&sd=true
@@ -119,6 +179,26 @@ SCS_SERIES_BAUDRATE_TABLE = {
 CALIBRATION_REQUIRED = ["Goal_Position", "Present_Position"]
 CONVERT_UINT32_TO_INT32_REQUIRED = ["Goal_Position", "Present_Position"]
 
+# Registers published into the shared joint state, by field of `max_v1.motors.shared_state.SharedJointState`
+SHARED_STATE_FIELDS = {
+    "Present_Position": "position",
+    "Present_Speed": "velocity",
+    "Present_Load": "load",
+}
+
+# Registers making up the joint state. They are laid out contiguously in the control table, from
+# Present_Position (56) to Present_Current (69), so `read_state` fetches them in a single transaction.
+STATE_DATA_NAMES = [
+    "Present_Position",
+    "Present_Speed",
+    "Present_Load",
+    "Present_Voltage",
+    "Present_Temperature",
+    "Status",
+    "Moving",
+    "Present_Current",
+]
+
 
 MODEL_CONTROL_TABLE = {
     "scs_series": SCS_SERIES_CONTROL_TABLE,
@@ -139,6 +219,11 @@ MODEL_BAUDRATE_TABLE = {
 NUM_READ_RETRY = 20
 NUM_WRITE_RETRY = 20
 
+# Maximum number of prepared GroupSyncRead/GroupSyncWrite handles kept per bus. A control loop only
+# uses a handful of (data_name, motors) pairs, but calibration routines like `move_until_block` read
+# many single-motor subsets, so older handles are evicted in least-recently-used order.
+GROUP_SYNC_CACHE_SIZE = 64
+
 
 def convert_degrees_to_steps(degrees: float | np.ndarray, models: str | list[str]) -> np.ndarray:
     """This function converts the degree range to the step range for indicating motors rotation.
@@ -152,10 +237,7 @@ def convert_degrees_to_steps(degrees: float | np.ndarray, models: str | list[str
 
 
 def convert_to_bytes(value, bytes, mock=False):
-    if mock:
-        return value
-
-    import scservo_sdk as scs
+    scs = load_backend("mock" if mock else "scservo_sdk")
 
     # Note: No need to convert back into unsigned int, since this byte preprocessing
     # already handles it for us.
@@ -183,6 +265,47 @@ def convert_to_bytes(value, bytes, mock=False):
     return data
 
 
+def pack_registers(values, sizes, mock=False, native=False) -> list:
+    """Bytes of consecutive registers of `sizes` bytes, for one motor."""
+    data = []
+    for value, size in zip(values, sizes, strict=True):
+        if native:
+            # Same little-endian two's complement bytes as `convert_to_bytes`, without `scservo_sdk`
+            data += list((int(value) & ((1 << (8 * size)) - 1)).to_bytes(size, "little"))
+            continue
+        data += convert_to_bytes(value, size, mock)
+    return data
+
+
+def get_estop_packet(torque_enable_addr: int) -> bytes:
+    """Broadcast write of Torque_Enable=0, built without any backend so that it can be sent from any thread."""
+    body = [BROADCAST_ID, 4, INST_WRITE, torque_enable_addr, 0]
+    return bytes([0xFF, 0xFF, *body, ~sum(body) & 0xFF])
+
+
+def get_action_packet() -> bytes:
+    """Broadcast ACTION, applying the values registered by REG_WRITE on all the motors of the bus at once."""
+    body = [BROADCAST_ID, 2, INST_ACTION]
+    return bytes([0xFF, 0xFF, *body, ~sum(body) & 0xFF])
+
+
+ACTION_PACKET = get_action_packet()
+
+
+def get_contiguous_runs(ctrl_table, data_names) -> list[list[str]]:
+    """Split `data_names` into runs of registers which are adjacent in the control table, by increasing address."""
+    runs = []
+    end = None
+    for data_name in sorted(data_names, key=lambda name: ctrl_table[name][0]):
+        addr, bytes = ctrl_table[data_name]
+        if addr == end:
+            runs[-1].append(data_name)
+        else:
+            runs.append([data_name])
+        end = addr + bytes
+    return runs
+
+
 def get_group_sync_key(data_name, motor_names):
     group_key = f"{data_name}_" + "_".join(motor_names)
     return group_key
@@ -206,6 +329,60 @@ def get_log_name(var_name, fn_name, data_name, motor_names):
     return log_name
 
 
+def get_block_address(ctrl_table, data_names):
+    """Return the `(address, size_byte)` of the smallest block of the control table covering `data_names`."""
+    start = min(ctrl_table[name][0] for name in data_names)
+    end = max(ctrl_table[name][0] + ctrl_table[name][1] for name in data_names)
+    return start, end - start
+
+
+def get_state_dtype(data_names, calibrated=False):
+    """Structured dtype with one field per register. Calibrated positions are float32 degrees."""
+    return np.dtype(
+        [
+            (name, np.float32 if calibrated and name in CALIBRATION_REQUIRED else np.int32)
+            for name in data_names
+        ]
+    )
+
+
+def decode_block(raw, block_addr, ctrl_table, data_names, dtype):
+    """Decode the registers `data_names` from the raw bytes of a block read starting at `block_addr`.
+
+    `raw` is an array of shape (num_motors, block_bytes). Feetech STS motors store multi-byte registers
+    in little-endian order.
+    """
+    raw = raw.astype(np.uint32)
+    state = np.empty(len(raw), dtype=dtype)
+    for name in data_names:
+        addr, bytes = ctrl_table[name]
+        offset = addr - block_addr
+        value = raw[:, offset].copy()
+        for i in range(1, bytes):
+            value |= raw[:, offset + i] << (8 * i)
+        state[name] = value
+    return state
+
+
+def get_motor_indices(all_motor_names: list[str], motor_names: list[str] | None, cache: dict) -> slice | np.ndarray:
+    """Positions of `motor_names` in per-motor arrays ordered like `all_motor_names`, memoized in `cache`.
+
+    All the motors in their original order map to a plain slice, so that indexing returns views.
+    """
+    if motor_names is None:
+        return slice(None)
+
+    key = tuple(motor_names)
+    indices = cache.get(key)
+    if indices is None:
+        if list(key) == all_motor_names:
+            indices = slice(None)
+        else:
+            indices = np.array([all_motor_names.index(name) for name in key], dtype=np.intp)
+        cache[key] = indices
+    return indices
+
+
 def assert_same_address(model_ctrl_table, motor_models, data_name):
     all_addr = []
     all_bytes = []
@@ -225,6 +402,62 @@ def assert_same_address(model_ctrl_table, motor_models, data_name):
         )
 
 
+class GroupSyncCache(OrderedDict):
+    """Bounded LRU cache of prepared sync read/write handles, keyed by `(data_name, motor_names)`.
+
+    A handle is created once with all its motor ids added, then reused as is on every call. Looking up a
+    handle marks it as most recently used, and inserting a new one evicts the least recently used handle
+    once `maxsize` is reached.
+    """
+
+    def __init__(self, maxsize=GROUP_SYNC_CACHE_SIZE):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def get(self, key, default=None):
+        group = super().get(key, default)
+        if group is not default:
+            self.move_to_end(key)
+        return group
+
+    def __setitem__(self, key, group):
+        super().__setitem__(key, group)
+        self.move_to_end(key)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+class PartialRead:
+    """Latest values of `data_name` received from a group of motors, updated in place by `read_partial`.
+
+    `valid[i]` is True when `values[i]` was received during the last call. Otherwise `values[i]` is the latest value
+    received from the motor, `age[i]` calls ago, at the `time.perf_counter()` `timestamps[i]` (0 if never received).
+    """
+
+    def __init__(self, data_name, motor_names, dtype):
+        num_motors = len(motor_names)
+        self.data_name = data_name
+        self.motor_names = list(motor_names)
+        self.values = np.zeros(num_motors, dtype=dtype)
+        self.valid = np.zeros(num_motors, dtype=bool)
+        self.age = np.zeros(num_motors, dtype=np.int64)
+        self.timestamps = np.zeros(num_motors)
+
+    def update(self, valid, values, timestamp):
+        """Store the `values` of the motors where `valid` is True, and age the others."""
+        self.valid[:] = valid
+        self.values[valid] = values
+        self.age += 1
+        self.age[valid] = 0
+        self.timestamps[valid] = timestamp
+
+    def update_motor(self, i, value, timestamp):
+        self.valid[i] = True
+        self.values[i] = value
+        self.age[i] = 0
+        self.timestamps[i] = timestamp
+
+
 class TorqueMode(enum.Enum):
     ENABLED = 1
     DISABLED = 0
@@ -248,6 +481,237 @@ class JointOutOfRangeError(Exception):
         super().__init__(self.message)
 
 
+class CompiledCalibration:
+    """Calibration of a bus compiled into per-motor arrays, ordered like the motors of the bus.
+
+    Each calibrated motor is reduced to an affine transform `calibrated = raw * scale + bias`: for
+    `CalibrationMode.DEGREE` the scale holds the drive mode and the resolution, and the bias holds the homing
+    offset; for `CalibrationMode.LINEAR` they map [start_pos, end_pos] to [0, 100] %. Motors absent from the
+    calibration are left untouched. Applying, reverting and range checking the calibration of any subset of
+    motors are then single NumPy expressions.
+    """
+
+    def __init__(self, calibration: dict[str, list], motors: dict[str, tuple[int, str]], model_resolution):
+        self.calibration = calibration
+        self.motor_names = list(motors)
+
+        num_motors = len(self.motor_names)
+        self.resolution = np.array([model_resolution[model] for _, model in motors.values()], dtype=np.int64)
+        self.calib_idx = np.full(num_motors, -1)
+        self.degree_mask = np.zeros(num_motors, dtype=bool)
+        self.linear_mask = np.zeros(num_motors, dtype=bool)
+        self.drive_sign = np.ones(num_motors)
+        self.homing_offset = np.zeros(num_motors)
+        self.start_pos = np.zeros(num_motors)
+        self.end_pos = np.zeros(num_motors)
+
+        for i, name in enumerate(self.motor_names):
+            if name not in calibration["motor_names"]:
+                continue
+            calib_idx = calibration["motor_names"].index(name)
+            self.calib_idx[i] = calib_idx
+
+            calib_mode = CalibrationMode[calibration["calib_mode"][calib_idx]]
+            if calib_mode == CalibrationMode.DEGREE:
+                self.degree_mask[i] = True
+                # Any non zero drive mode inverts the direction of rotation of the motor
+                self.drive_sign[i] = -1 if calibration["drive_mode"][calib_idx] else 1
+                self.homing_offset[i] = calibration["homing_offset"][calib_idx]
+            elif calib_mode == CalibrationMode.LINEAR:
+                self.linear_mask[i] = True
+                self.start_pos[i] = calibration["start_pos"][calib_idx]
+                self.end_pos[i] = calibration["end_pos"][calib_idx]
+
+        self.lower_bound = np.select(
+            [self.degree_mask, self.linear_mask], [LOWER_BOUND_DEGREE, LOWER_BOUND_LINEAR], -np.inf
+        )
+        self.upper_bound = np.select(
+            [self.degree_mask, self.linear_mask], [UPPER_BOUND_DEGREE, UPPER_BOUND_LINEAR], np.inf
+        )
+
+        self._indices = {}
+        self.update_transforms()
+
+    def update_transforms(self):
+        """Recompute `scale` and `bias` from the per-motor calibration arrays."""
+        deg, lin = self.degree_mask, self.linear_mask
+        half_turn = self.resolution[deg] // 2
+
+        self.scale = np.ones(len(self.motor_names))
+        self.bias = np.zeros(len(self.motor_names))
+
+        # ((raw * drive_sign) + homing_offset) / (resolution // 2) * HALF_TURN_DEGREE
+        self.scale[deg] = self.drive_sign[deg] / half_turn * HALF_TURN_DEGREE
+        self.bias[deg] = self.homing_offset[deg] / half_turn * HALF_TURN_DEGREE
+
+        # (raw - start_pos) / (end_pos - start_pos) * 100
+        span = self.end_pos[lin] - self.start_pos[lin]
+        self.scale[lin] = 100 / span
+        self.bias[lin] = -self.start_pos[lin] / span * 100
+
+    def get_indices(self, motor_names: list[str] | None) -> slice | np.ndarray:
+        return get_motor_indices(self.motor_names, motor_names, self._indices)
+
+    def apply(self, values: np.ndarray | list, idx: slice | np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        return (values * self.scale[idx] + self.bias[idx]).astype(np.float32)
+
+    def revert(self, values: np.ndarray | list, idx: slice | np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        return np.round((values - self.bias[idx]) / self.scale[idx]).astype(np.int32)
+
+    def out_of_range(self, calibrated: np.ndarray, idx: slice | np.ndarray) -> np.ndarray:
+        return (calibrated < self.lower_bound[idx]) | (calibrated > self.upper_bound[idx])
+
+    def out_of_range_message(self, calibrated: np.ndarray, idx: slice | np.ndarray, out_of_range: np.ndarray):
+        motor_names = np.array(self.motor_names)[idx]
+        details = []
+        for name, deg, value in zip(
+            motor_names[out_of_range], self.degree_mask[idx][out_of_range], calibrated[out_of_range], strict=True
+        ):
+            details.append(f"{name}={value} {'degree' if deg else '%'}")
+        return (
+            f"Wrong motor position range detected for {', '.join(details)}. "
+            f"Expected to be in nominal range of [-{HALF_TURN_DEGREE}, {HALF_TURN_DEGREE}] degrees (a full rotation), "
+            f"with a maximum range of [{LOWER_BOUND_DEGREE}, {UPPER_BOUND_DEGREE}] degrees to account for joints that can rotate a bit more, "
+            f"or in nominal range of [0, 100] % (a full linear translation), "
+            f"with a maximum range of [{LOWER_BOUND_LINEAR}, {UPPER_BOUND_LINEAR}] % to account for some imprecision during calibration. "
+            "This might be due to a cable connection issue creating an artificial jump in motor values. "
+            "You need to recalibrate by running: `python lerobot/scripts/control_robot.py calibrate`"
+        )
+
+    def autocorrect(self, values: np.ndarray | list, idx: slice | np.ndarray):
+        """Shift by a whole number of turns the homing offset of every motor out of range. See
+        `FeetechMotorsBus.autocorrect_calibration`."""
+        values = np.asarray(values, dtype=np.float64)
+        calibrated = self.apply(values, idx)
+        out_of_range = self.out_of_range(calibrated, idx)
+        if not out_of_range.any():
+            return
+
+        deg = self.degree_mask[idx]
+        resolution = self.resolution[idx]
+        half_turn = resolution // 2
+        homing_offset = self.homing_offset[idx]
+        signed_values = values * self.drive_sign[idx]
+
+        # Solve these inequalities to find the factor to shift the range into [-180, 180] degrees or [0, 100] %
+        # - HALF_TURN_DEGREE <= (values * drive_sign + homing_offset + resolution * factor) / (resolution // 2) * HALF_TURN_DEGREE <= HALF_TURN_DEGREE
+        # 0 <= (values - start_pos + resolution * factor) / (end_pos - start_pos) * 100 <= 100
+        low_factor = np.where(
+            deg,
+            (-half_turn - signed_values - homing_offset) / resolution,
+            (self.start_pos[idx] - values) / resolution,
+        )
+        upp_factor = np.where(
+            deg,
+            (half_turn - signed_values - homing_offset) / resolution,
+            (self.end_pos[idx] - values) / resolution,
+        )
+
+        # Get first integer between the two bounds
+        factor = np.ceil(np.minimum(low_factor, upp_factor))
+        no_integer = out_of_range & (factor > np.maximum(low_factor, upp_factor))
+        if no_integer.any():
+            raise ValueError(
+                f"No integer found between bounds [{low_factor[no_integer]=}, {upp_factor[no_integer]=}]"
+            )
+
+        motor_indices = np.arange(len(self.motor_names))[idx]
+        for i in np.flatnonzero(out_of_range):
+            motor_idx = motor_indices[i]
+            shift = int(resolution[i] * factor[i])
+            self.homing_offset[motor_idx] += shift
+            # Keep the calibration dict in sync, since it is the one being saved
+            self.calibration["homing_offset"][self.calib_idx[motor_idx]] += shift
+
+        self.update_transforms()
+        corrected = self.apply(values, idx)
+
+        for i in np.flatnonzero(out_of_range):
+            unit = "degrees" if deg[i] else "%"
+            lower, upper = self.lower_bound[idx][i], self.upper_bound[idx][i]
+            logging.warning(
+                f"Auto-correct calibration of motor '{self.motor_names[motor_indices[i]]}' by shifting value by {abs(int(factor[i]))} full turns, "
+                f"from '{lower} < {calibrated[i]} < {upper} {unit}' to '{lower} < {corrected[i]} < {upper} {unit}'."
+            )
+
+
+class MultiTurnTracker:
+    """Unwraps motor positions across full rotations, with all state in preallocated int32 arrays.
+
+    A jump of more than half a turn between two consecutive raw positions of a motor is interpreted as the
+    position wrapping around its resolution (e.g. from 4095 to 0 for a resolution of 4096), and counted as
+    a full turn. The unwrapped position is `raw + turns * resolution`. Unwrapping all the motors at once
+    does not allocate; unwrapping a subset of motors only allocates its gathered state.
+    """
+
+    def __init__(self, resolution: np.ndarray):
+        num_motors = len(resolution)
+        self.resolution = np.asarray(resolution, dtype=np.int32)
+        self.half_turn = self.resolution // 2
+        self.neg_half_turn = -self.half_turn
+        self.prev = np.zeros(num_motors, dtype=np.int32)
+        self.turns = np.zeros(num_motors, dtype=np.int32)
+        self.initialized = np.zeros(num_motors, dtype=bool)
+
+        self._delta = np.empty(num_motors, dtype=np.int32)
+        self._wrapped = np.empty(num_motors, dtype=bool)
+
+    def unwrap(self, values: np.ndarray, idx: slice | np.ndarray = slice(None)) -> np.ndarray:
+        """Unwrap in place the int32 raw positions `values` of the motors at `idx`."""
+        if isinstance(idx, slice):
+            self._unwrap(
+                values,
+                self.prev[idx],
+                self.turns[idx],
+                self.initialized[idx],
+                self.resolution[idx],
+                self.half_turn[idx],
+                self.neg_half_turn[idx],
+            )
+        else:
+            prev, turns, initialized = self.prev[idx], self.turns[idx], self.initialized[idx]
+            self._unwrap(
+                values,
+                prev,
+                turns,
+                initialized,
+                self.resolution[idx],
+                self.half_turn[idx],
+                self.neg_half_turn[idx],
+            )
+            self.prev[idx] = prev
+            self.turns[idx] = turns
+            self.initialized[idx] = initialized
+        return values
+
+    def _unwrap(self, values, prev, turns, initialized, resolution, half_turn, neg_half_turn):
+        num = len(values)
+        delta, wrapped = self._delta[:num], self._wrapped[:num]
+
+        np.subtract(values, prev, out=delta)
+        # The first position of a motor is taken as is
+        np.multiply(delta, initialized, out=delta)
+
+        # Position went above the resolution and got reset to 0, so we add a full rotation
+        np.less(delta, neg_half_turn, out=wrapped)
+        np.add(turns, wrapped, out=turns)
+        # Position went below 0 and got reset to the resolution, so we remove a full rotation
+        np.greater(delta, half_turn, out=wrapped)
+        np.subtract(turns, wrapped, out=turns)
+
+        prev[:] = values
+        initialized[:] = True
+
+        np.multiply(turns, resolution, out=delta)
+        np.add(values, delta, out=values)
+
+    def reset(self):
+        self.turns[:] = 0
+        self.initialized[:] = False
+
+
 class FeetechMotorsBus:
     """
     The FeetechMotorsBus class allows to efficiently read and write to the attached motors. It relies on
@@ -294,7 +758,14 @@ class FeetechMotorsBus:
     ):
         self.port = config.port
         self.motors = config.motors
-        self.mock = config.mock
+        self.backend = "mock" if config.mock else getattr(config, "backend", "scservo_sdk")
+        self.mock = self.backend == "mock"
+        if self.backend not in AVAILABLE_BACKENDS:
+            raise ValueError(f"Backend '{self.backend}' is not available. Available backends: {AVAILABLE_BACKENDS}")
+        # Module of the backend, imported on first use by `scs`
+        self._scs = None
+        # Emulated servos of the "emulator" backend, started on connect
+        self.emulator = None
 
         self.model_ctrl_table = deepcopy(MODEL_CONTROL_TABLE)
         self.model_resolution = deepcopy(MODEL_RESOLUTION)
@@ -302,12 +773,62 @@ class FeetechMotorsBus:
         self.port_handler = None
         self.packet_handler = None
         self.calibration = None
+        self.compiled_calibration = None
         self.is_connected = False
-        self.group_readers = {}
-        self.group_writers = {}
-        self.logs = {}
+        self.group_readers = GroupSyncCache()
+        self.group_writers = GroupSyncCache()
+        self.group_reg_writers = GroupSyncCache()
+        self.partial_reads = {}
+
+        # Opt-in, see `enable_telemetry`
+        self.telemetry = None
+        # Opt-in, see `share_state` and `share_commands`
+        self.shared_state = None
+        self.shared_commands = None
+        # Opt-in, see `start_recording`
+        self.record_path = getattr(config, "record_path", None)
+        self.recorder = None
+
+        # See `max_v1.motors.retry`
+        self.retry_policy = getattr(config, "retry_policy", None) or RetryPolicy()
+        self.rtt_estimators = {}
+        self.failure_stats = FailureStats(self.motor_names)
+
+        # Write coalescing, see `write_registers`. Tolerances are in motor steps, e.g. {"Goal_Position": 0}.
+        self.write_tolerances = dict(getattr(config, "write_tolerances", None) or {})
+        self.last_written = {}
+        # Only to be enabled when no other motor than `self.motors` is connected to the bus
+        self.broadcast_writes = getattr(config, "broadcast_writes", False)
+
+        # See `emergency_stop`
+        self.estop_active = False
+        self.estop_latencies_s = []
+
+        # Registers pre-loaded with `stage_write`, applied by `commit_staged`
+        self.staged_data_names = set()
 
         self.track_positions = {}
+        self._motor_indices = {}
+
+    @property
+    def scs(self):
+        """Module of `self.backend`, with the interface of `scservo_sdk`. Imported once per bus."""
+        if self._scs is None:
+            self._scs = load_backend(self.backend)
+        return self._scs
+
+    @property
+    def is_native(self) -> bool:
+        return self.backend in NATIVE_BACKENDS
+
+    def start_emulator(self):
+        """Start emulated servos for the motors of the bus with the "emulator" backend, and connect to them."""
+        if self.backend != "emulator" or self.emulator is not None:
+            return
+        from max_v1.motors.emulator import BusEmulator
+
+        self.emulator = BusEmulator(self.motor_indices)
+        self.port = self.emulator.start()
 
     def connect(self):
         if self.is_connected:
@@ -315,13 +836,9 @@ class FeetechMotorsBus:
                 f"FeetechMotorsBus({self.port}) is already connected. Do not call `motors_bus.connect()` twice."
             )
 
-        if self.mock:
-            import tests.motors.mock_scservo_sdk as scs
-        else:
-            import scservo_sdk as scs
-
-        self.port_handler = scs.PortHandler(self.port)
-        self.packet_handler = scs.PacketHandler(PROTOCOL_VERSION)
+        self.start_emulator()
+        self.port_handler = self.scs.PortHandler(self.port)
+        self.packet_handler = self.scs.PacketHandler(PROTOCOL_VERSION)
 
         try:
             if not self.port_handler.openPort():
@@ -337,18 +854,22 @@ class FeetechMotorsBus:
         self.is_connected = True
 
         self.port_handler.setPacketTimeoutMillis(TIMEOUT_MS)
+        if self.record_path is not None:
+            self.start_recording(self.record_path)
 
     def reconnect(self):
-        if self.mock:
-            import tests.motors.mock_scservo_sdk as scs
-        else:
-            import scservo_sdk as scs
-
-        self.port_handler = scs.PortHandler(self.port)
-        self.packet_handler = scs.PacketHandler(PROTOCOL_VERSION)
+        # The prepared handles hold the previous port handler
+        self.clear_port_state()
+        self.start_emulator()
+        self.port_handler = self.scs.PortHandler(self.port)
+        self.packet_handler = self.scs.PacketHandler(PROTOCOL_VERSION)
 
         if not self.port_handler.openPort():
             raise OSError(f"Failed to open port '{self.port}'.")
+        if self.recorder is not None:
+            from max_v1.motors.recording import RecordingTransport
+
+            self.port_handler.ser = RecordingTransport(self.port_handler.ser, self.recorder)
 
         self.is_connected = True
 
@@ -365,6 +886,11 @@ class FeetechMotorsBus:
         if possible_ids is None:
             possible_ids = range(MAX_ID_RANGE)
 
+        if not self.mock:
+            return self.discover_motor_indices(possible_ids, num_retry)
+
+        import tqdm
+
         indices = []
         for idx in tqdm.tqdm(possible_ids):
             try:
@@ -381,6 +907,40 @@ class FeetechMotorsBus:
 
         return indices
 
+    def discover_motor_indices(self, possible_ids, num_tries=2) -> list[int]:
+        """Indices of `possible_ids` present on the bus, found with broadcast pings (see `max_v1.motors.discovery`),
+        then sync reads of the Model register for the IDs which did not reply, since broadcast replies may collide."""
+        from max_v1.motors.discovery import broadcast_ping, ping_ids
+
+        possible_ids = list(possible_ids)
+        indices = set()
+        for _ in range(num_tries):
+            missing_ids = set(possible_ids) - indices
+            indices |= set(broadcast_ping(self.port_handler, expected_ids=missing_ids)) & missing_ids
+            if indices == set(possible_ids):
+                break
+
+        missing_ids = set(possible_ids) - indices
+        if missing_ids:
+            # Replies to the broadcast pings may have collided, or some firmwares do not answer them
+            indices |= set(ping_ids(self.port_handler, sorted(missing_ids)))
+
+        return sorted(indices)
+
+    def scan_baudrates(self, expected_ids=None, baudrates=None) -> list:
+        """Inventory of the motors found at each baud rate, as a list of `DiscoveredMotor` (ID, baud rate, model).
+        Stops once all `expected_ids` were found. The bus is left at its current baud rate."""
+        from max_v1.motors.discovery import scan_baudrates
+
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"FeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+
+        if baudrates is None:
+            baudrates = list(SCS_SERIES_BAUDRATE_TABLE.values())
+        return scan_baudrates(self.port_handler, baudrates, expected_ids)
+
     def set_bus_baudrate(self, baudrate):
         present_bus_baudrate = self.port_handler.getBaudRate()
         if present_bus_baudrate != baudrate:
@@ -404,19 +964,30 @@ class FeetechMotorsBus:
 
     def set_calibration(self, calibration: dict[str, list]):
         self.calibration = calibration
+        self.compiled_calibration = CompiledCalibration(calibration, self.motors, self.model_resolution)
+
+    def get_compiled_calibration(self) -> "CompiledCalibration":
+        # `self.calibration` can also be assigned directly, in which case it gets compiled on first use.
+        if self.compiled_calibration is None or self.compiled_calibration.calibration is not self.calibration:
+            self.compiled_calibration = CompiledCalibration(
+                self.calibration, self.motors, self.model_resolution
+            )
+        return self.compiled_calibration
 
     def apply_calibration_autocorrect(self, values: np.ndarray | list, motor_names: list[str] | None):
         """This function apply the calibration, automatically detects out of range errors for motors values and attempt to correct.
 
         For more info, see docstring of `apply_calibration` and `autocorrect_calibration`.
         """
-        try:
-            values = self.apply_calibration(values, motor_names)
-        except JointOutOfRangeError as e:
-            print(e)
+        calib = self.get_compiled_calibration()
+        idx = calib.get_indices(motor_names)
+        calibrated = calib.apply(values, idx)
+        out_of_range = calib.out_of_range(calibrated, idx)
+        if out_of_range.any():
+            print(calib.out_of_range_message(calibrated, idx, out_of_range))
             self.autocorrect_calibration(values, motor_names)
-            values = self.apply_calibration(values, motor_names)
-        return values
+            calibrated = self.apply_calibration(values, motor_names)
+        return calibrated
 
     def apply_calibration(self, values: np.ndarray | list, motor_names: list[str] | None):
         """Convert from unsigned int32 joint position range [0, 2**32[ to the universal float32 nominal degree range ]-180.0, 180.0[ with
@@ -431,67 +1002,25 @@ class FeetechMotorsBus:
         or anticlockwise by moving to 52638. The position in the original range is arbitrary and might change a lot between each motor.
         To harmonize between motors of the same model, different robots, or even models of different brands, we propose to work
         in the centered nominal degree range ]-180, 180[.
+
+        The calibration of all motors is applied at once by `CompiledCalibration`. A `JointOutOfRangeError` listing every
+        motor outside of its maximum range is raised, use `calibration_out_of_range` to get a mask instead.
         """
-        if motor_names is None:
-            motor_names = self.motor_names
+        calib = self.get_compiled_calibration()
+        idx = calib.get_indices(motor_names)
+        values = calib.apply(values, idx)
 
-        # Convert from unsigned int32 original range [0, 2**32] to signed float32 range
-        values = values.astype(np.float32)
-
-        for i, name in enumerate(motor_names):
-            calib_idx = self.calibration["motor_names"].index(name)
-            calib_mode = self.calibration["calib_mode"][calib_idx]
-
-            if CalibrationMode[calib_mode] == CalibrationMode.DEGREE:
-                drive_mode = self.calibration["drive_mode"][calib_idx]
-                homing_offset = self.calibration["homing_offset"][calib_idx]
-                _, model = self.motors[name]
-                resolution = self.model_resolution[model]
-
-                # Update direction of rotation of the motor to match between leader and follower.
-                # In fact, the motor of the leader for a given joint can be assembled in an
-                # opposite direction in term of rotation than the motor of the follower on the same joint.
-                if drive_mode:
-                    values[i] *= -1
-
-                # Convert from range [-2**31, 2**31[ to
-                # nominal range ]-resolution, resolution[ (e.g. ]-2048, 2048[)
-                values[i] += homing_offset
-
-                # Convert from range ]-resolution, resolution[ to
-                # universal float32 centered degree range ]-180, 180[
-                values[i] = values[i] / (resolution // 2) * HALF_TURN_DEGREE
-
-                if (values[i] < LOWER_BOUND_DEGREE) or (values[i] > UPPER_BOUND_DEGREE):
-                    raise JointOutOfRangeError(
-                        f"Wrong motor position range detected for {name}. "
-                        f"Expected to be in nominal range of [-{HALF_TURN_DEGREE}, {HALF_TURN_DEGREE}] degrees (a full rotation), "
-                        f"with a maximum range of [{LOWER_BOUND_DEGREE}, {UPPER_BOUND_DEGREE}] degrees to account for joints that can rotate a bit more, "
-                        f"but present value is {values[i]} degree. "
-                        "This might be due to a cable connection issue creating an artificial 360 degrees jump in motor values. "
-                        "You need to recalibrate by running: `python lerobot/scripts/control_robot.py calibrate`"
-                    )
-
-            elif CalibrationMode[calib_mode] == CalibrationMode.LINEAR:
-                start_pos = self.calibration["start_pos"][calib_idx]
-                end_pos = self.calibration["end_pos"][calib_idx]
-
-                # Rescale the present position to a nominal range [0, 100] %,
-                # useful for joints with linear motions like Aloha gripper
-                values[i] = (values[i] - start_pos) / (end_pos - start_pos) * 100
-
-                if (values[i] < LOWER_BOUND_LINEAR) or (values[i] > UPPER_BOUND_LINEAR):
-                    raise JointOutOfRangeError(
-                        f"Wrong motor position range detected for {name}. "
-                        f"Expected to be in nominal range of [0, 100] % (a full linear translation), "
-                        f"with a maximum range of [{LOWER_BOUND_LINEAR}, {UPPER_BOUND_LINEAR}] % to account for some imprecision during calibration, "
-                        f"but present value is {values[i]} %. "
-                        "This might be due to a cable connection issue creating an artificial jump in motor values. "
-                        "You need to recalibrate by running: `python lerobot/scripts/control_robot.py calibrate`"
-                    )
+        out_of_range = calib.out_of_range(values, idx)
+        if out_of_range.any():
+            raise JointOutOfRangeError(calib.out_of_range_message(values, idx, out_of_range))
 
         return values
 
+    def calibration_out_of_range(self, values: np.ndarray | list, motor_names: list[str] | None) -> np.ndarray:
+        """Return a boolean mask of the motors whose calibrated `values` are outside of their maximum range."""
+        calib = self.get_compiled_calibration()
+        return calib.out_of_range(values, calib.get_indices(motor_names))
+
     def autocorrect_calibration(self, values: np.ndarray | list, motor_names: list[str] | None):
         """This function automatically detects issues with values of motors after calibration, and correct for these issues.
 
@@ -511,165 +1040,40 @@ class FeetechMotorsBus:
 
         Note: A full turn corresponds to 360 degrees but also to 4096 steps for a motor resolution of 4096.
         """
-        if motor_names is None:
-            motor_names = self.motor_names
-
-        # Convert from unsigned int32 original range [0, 2**32] to signed float32 range
-        values = values.astype(np.float32)
-
-        for i, name in enumerate(motor_names):
-            calib_idx = self.calibration["motor_names"].index(name)
-            calib_mode = self.calibration["calib_mode"][calib_idx]
-
-            if CalibrationMode[calib_mode] == CalibrationMode.DEGREE:
-                drive_mode = self.calibration["drive_mode"][calib_idx]
-                homing_offset = self.calibration["homing_offset"][calib_idx]
-                _, model = self.motors[name]
-                resolution = self.model_resolution[model]
-
-                if drive_mode:
-                    values[i] *= -1
-
-                # Convert from initial range to range [-180, 180] degrees
-                calib_val = (values[i] + homing_offset) / (resolution // 2) * HALF_TURN_DEGREE
-                in_range = (calib_val > LOWER_BOUND_DEGREE) and (calib_val < UPPER_BOUND_DEGREE)
-
-                # Solve this inequality to find the factor to shift the range into [-180, 180] degrees
-                # values[i] = (values[i] + homing_offset + resolution * factor) / (resolution // 2) * HALF_TURN_DEGREE
-                # - HALF_TURN_DEGREE <= (values[i] + homing_offset + resolution * factor) / (resolution // 2) * HALF_TURN_DEGREE <= HALF_TURN_DEGREE
-                # (- HALF_TURN_DEGREE / HALF_TURN_DEGREE * (resolution // 2) - values[i] - homing_offset) / resolution <= factor <= (HALF_TURN_DEGREE / 180 * (resolution // 2) - values[i] - homing_offset) / resolution
-                low_factor = (
-                    -HALF_TURN_DEGREE / HALF_TURN_DEGREE * (resolution // 2) - values[i] - homing_offset
-                ) / resolution
-                upp_factor = (
-                    HALF_TURN_DEGREE / HALF_TURN_DEGREE * (resolution // 2) - values[i] - homing_offset
-                ) / resolution
-
-            elif CalibrationMode[calib_mode] == CalibrationMode.LINEAR:
-                start_pos = self.calibration["start_pos"][calib_idx]
-                end_pos = self.calibration["end_pos"][calib_idx]
-
-                # Convert from initial range to range [0, 100] in %
-                calib_val = (values[i] - start_pos) / (end_pos - start_pos) * 100
-                in_range = (calib_val > LOWER_BOUND_LINEAR) and (calib_val < UPPER_BOUND_LINEAR)
-
-                # Solve this inequality to find the factor to shift the range into [0, 100] %
-                # values[i] = (values[i] - start_pos + resolution * factor) / (end_pos + resolution * factor - start_pos - resolution * factor) * 100
-                # values[i] = (values[i] - start_pos + resolution * factor) / (end_pos - start_pos) * 100
-                # 0 <= (values[i] - start_pos + resolution * factor) / (end_pos - start_pos) * 100 <= 100
-                # (start_pos - values[i]) / resolution <= factor <= (end_pos - values[i]) / resolution
-                low_factor = (start_pos - values[i]) / resolution
-                upp_factor = (end_pos - values[i]) / resolution
-
-            if not in_range:
-                # Get first integer between the two bounds
-                if low_factor < upp_factor:
-                    factor = math.ceil(low_factor)
-
-                    if factor > upp_factor:
-                        raise ValueError(f"No integer found between bounds [{low_factor=}, {upp_factor=}]")
-                else:
-                    factor = math.ceil(upp_factor)
-
-                    if factor > low_factor:
-                        raise ValueError(f"No integer found between bounds [{low_factor=}, {upp_factor=}]")
-
-                if CalibrationMode[calib_mode] == CalibrationMode.DEGREE:
-                    out_of_range_str = f"{LOWER_BOUND_DEGREE} < {calib_val} < {UPPER_BOUND_DEGREE} degrees"
-                    in_range_str = f"{LOWER_BOUND_DEGREE} < {calib_val} < {UPPER_BOUND_DEGREE} degrees"
-                elif CalibrationMode[calib_mode] == CalibrationMode.LINEAR:
-                    out_of_range_str = f"{LOWER_BOUND_LINEAR} < {calib_val} < {UPPER_BOUND_LINEAR} %"
-                    in_range_str = f"{LOWER_BOUND_LINEAR} < {calib_val} < {UPPER_BOUND_LINEAR} %"
-
-                logging.warning(
-                    f"Auto-correct calibration of motor '{name}' by shifting value by {abs(factor)} full turns, "
-                    f"from '{out_of_range_str}' to '{in_range_str}'."
-                )
-
-                # A full turn corresponds to 360 degrees but also to 4096 steps for a motor resolution of 4096.
-                self.calibration["homing_offset"][calib_idx] += resolution * factor
+        calib = self.get_compiled_calibration()
+        calib.autocorrect(values, calib.get_indices(motor_names))
 
     def revert_calibration(self, values: np.ndarray | list, motor_names: list[str] | None):
         """Inverse of `apply_calibration`."""
-        if motor_names is None:
-            motor_names = self.motor_names
-
-        for i, name in enumerate(motor_names):
-            calib_idx = self.calibration["motor_names"].index(name)
-            calib_mode = self.calibration["calib_mode"][calib_idx]
-
-            if CalibrationMode[calib_mode] == CalibrationMode.DEGREE:
-                drive_mode = self.calibration["drive_mode"][calib_idx]
-                homing_offset = self.calibration["homing_offset"][calib_idx]
-                _, model = self.motors[name]
-                resolution = self.model_resolution[model]
-
-                # Convert from nominal 0-centered degree range [-180, 180] to
-                # 0-centered resolution range (e.g. [-2048, 2048] for resolution=4096)
-                values[i] = values[i] / HALF_TURN_DEGREE * (resolution // 2)
-
-                # Subtract the homing offsets to come back to actual motor range of values
-                # which can be arbitrary.
-                values[i] -= homing_offset
-
-                # Remove drive mode, which is the rotation direction of the motor, to come back to
-                # actual motor rotation direction which can be arbitrary.
-                if drive_mode:
-                    values[i] *= -1
-
-            elif CalibrationMode[calib_mode] == CalibrationMode.LINEAR:
-                start_pos = self.calibration["start_pos"][calib_idx]
-                end_pos = self.calibration["end_pos"][calib_idx]
-
-                # Convert from nominal lnear range of [0, 100] % to
-                # actual motor range of values which can be arbitrary.
-                values[i] = values[i] / 100 * (end_pos - start_pos) + start_pos
-
-        values = np.round(values).astype(np.int32)
-        return values
+        calib = self.get_compiled_calibration()
+        return calib.revert(values, calib.get_indices(motor_names))
 
     def avoid_rotation_reset(self, values, motor_names, data_name):
-        if data_name not in self.track_positions:
-            self.track_positions[data_name] = {
-                "prev": [None] * len(self.motor_names),
-                # Assume False at initialization
-                "below_zero": [False] * len(self.motor_names),
-                "above_max": [False] * len(self.motor_names),
-            }
-
-        track = self.track_positions[data_name]
-
-        if motor_names is None:
-            motor_names = self.motor_names
-
-        for i, name in enumerate(motor_names):
-            idx = self.motor_names.index(name)
-
-            if track["prev"][idx] is None:
-                track["prev"][idx] = values[i]
-                continue
-
-            # Detect a full rotation occurred
-            if abs(track["prev"][idx] - values[i]) > 2048:
-                # Position went below 0 and got reset to 4095
-                if track["prev"][idx] < values[i]:
-                    # So we set negative value by adding a full rotation
-                    values[i] -= 4096
-
-                # Position went above 4095 and got reset to 0
-                elif track["prev"][idx] > values[i]:
-                    # So we add a full rotation
-                    values[i] += 4096
-
-            track["prev"][idx] = values[i]
-
-        return values
-
-    def read_with_motor_ids(self, motor_models, motor_ids, data_name, num_retry=NUM_READ_RETRY):
-        if self.mock:
-            import tests.motors.mock_scservo_sdk as scs
-        else:
-            import scservo_sdk as scs
+        """Unwrap the positions `values` of `data_name` so they keep increasing or decreasing past a full turn,
+        instead of being reset to 0 or to the motor resolution. See `MultiTurnTracker`. `values` is left unchanged."""
+        return self.unwrap_positions(np.array(values, dtype=np.int32), motor_names, data_name)
+
+    def unwrap_positions(self, values: np.ndarray, motor_names, data_name) -> np.ndarray:
+        """Same as `avoid_rotation_reset`, unwrapping in place the int32 array `values` without allocating. Used on the
+        fresh arrays of the reads."""
+        tracker = self.track_positions.get(data_name)
+        if tracker is None:
+            resolution = [self.model_resolution[model] for model in self.motor_models]
+            tracker = self.track_positions[data_name] = MultiTurnTracker(np.array(resolution))
+
+        idx = get_motor_indices(self.motor_names, motor_names, self._motor_indices)
+        return tracker.unwrap(values, idx)
+
+    def get_turn_counts(self, data_name="Present_Position", motor_names: list[str] | None = None) -> np.ndarray:
+        """Number of full turns accumulated by each motor since the first read of `data_name`."""
+        idx = get_motor_indices(self.motor_names, motor_names, self._motor_indices)
+        tracker = self.track_positions.get(data_name)
+        if tracker is None:
+            return np.zeros(len(self.motor_names), dtype=np.int32)[idx]
+        return tracker.turns[idx].copy()
+
+    def read_with_motor_ids(self, motor_models, motor_ids, data_name, num_retry=NUM_READ_RETRY, budget_s=None):
+        scs = self.scs
 
         return_list = True
         if not isinstance(motor_ids, list):
@@ -682,10 +1086,7 @@ class FeetechMotorsBus:
         for idx in motor_ids:
             group.addParam(idx)
 
-        for _ in range(num_retry):
-            comm = group.txRxPacket()
-            if comm == scs.COMM_SUCCESS:
-                break
+        comm, _, _ = self.txrx_group(scs, group, bytes, motor_ids, budget_s, num_retry)
 
         if comm != scs.COMM_SUCCESS:
             raise ConnectionError(
@@ -703,19 +1104,8 @@ class FeetechMotorsBus:
         else:
             return values[0]
 
-    def read(self, data_name, motor_names: str | list[str] | None = None):
-        if self.mock:
-            import tests.motors.mock_scservo_sdk as scs
-        else:
-            import scservo_sdk as scs
-
-        if not self.is_connected:
-            raise RobotDeviceNotConnectedError(
-                f"FeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
-            )
-
-        start_time = time.perf_counter()
-
+    def resolve_motors(self, motor_names: str | list[str] | None) -> tuple[list[str], list[int], list[str]]:
+        """Return the names, indices and models of the motors designated by `motor_names` (all by default)."""
         if motor_names is None:
             motor_names = self.motor_names
 
@@ -729,65 +1119,411 @@ class FeetechMotorsBus:
             motor_ids.append(motor_idx)
             models.append(model)
 
-        assert_same_address(self.model_ctrl_table, models, data_name)
-        addr, bytes = self.model_ctrl_table[model][data_name]
-        group_key = get_group_sync_key(data_name, motor_names)
+        return motor_names, motor_ids, models
 
-        if data_name not in self.group_readers:
-            # Very Important to flush the buffer!
-            self.port_handler.ser.reset_output_buffer()
+    def get_group_reader(self, scs, group_key, addr, bytes, motor_ids):
+        group = self.group_readers.get(group_key)
+        if group is None:
+            # Very Important to flush the buffer! Only the input one: flushing the output would discard the bytes of the
+            # previous write which are not sent yet
             self.port_handler.ser.reset_input_buffer()
 
-            # create new group reader
-            self.group_readers[group_key] = scs.GroupSyncRead(
-                self.port_handler, self.packet_handler, addr, bytes
-            )
+            # create new group reader, it is then reused as is for every following read
+            group = scs.GroupSyncRead(self.port_handler, self.packet_handler, addr, bytes)
             for idx in motor_ids:
-                self.group_readers[group_key].addParam(idx)
+                group.addParam(idx)
+            self.group_readers[group_key] = group
+        return group
+
+    def get_rtt_estimator(self, data_length: int, num_motors: int) -> RttEstimator:
+        # The round trip time mostly depends on the number of bytes on the wire
+        key = (data_length, num_motors)
+        estimator = self.rtt_estimators.get(key)
+        if estimator is None:
+            estimator = self.rtt_estimators[key] = RttEstimator()
+        return estimator
+
+    def txrx_group(self, scs, group, bytes, motor_ids, budget_s=None, num_retry=None):
+        """Run the sync read transaction of `group`, retrying according to `self.retry_policy` for at most
+        `budget_s` seconds. At least one try is made.
+
+        Returns the result of the last try, the number of tries and the number of failed tries of each motor.
+        Without a per-motor reply mask (i.e. with `scservo_sdk`) or when the transmit fails, every motor is counted as
+        failed in a failed try.
+        """
+        policy = self.retry_policy
+        budget_s = policy.budget_s if budget_s is None else budget_s
+        num_retry = policy.num_retry if num_retry is None else num_retry
+        estimator = self.get_rtt_estimator(bytes, len(motor_ids))
+        motor_failures = np.zeros(len(motor_ids), dtype=np.int64)
+
+        deadline = time.perf_counter() + budget_s
+        num_tries = 0
+        while True:
+            if self.estop_active:
+                raise EmergencyStopError()
+            remaining = deadline - time.perf_counter()
+            tx_time = time.perf_counter()
+            comm = group.txPacket()
+            sent = comm == scs.COMM_SUCCESS
+            if sent:
+                timeout_s = max(min(policy.get_timeout(estimator, num_tries), remaining), policy.min_timeout_s)
+                self.port_handler.setPacketTimeoutMillis(timeout_s * 1000)
+                comm = group.rxPacket()
+            num_tries += 1
 
-        for _ in range(NUM_READ_RETRY):
-            comm = self.group_readers[group_key].txRxPacket()
             if comm == scs.COMM_SUCCESS:
+                estimator.update(time.perf_counter() - tx_time)
+                break
+
+            # After a failed transmit, `group.valid` is still the mask of the previous read
+            valid = getattr(group, "valid", None)
+            motor_failures += 1 if valid is None or not sent else ~valid
+            if num_tries >= num_retry or time.perf_counter() >= deadline:
+                break
+
+        return comm, num_tries, motor_failures
+
+    def tx_group(self, scs, group, num_motors, budget_s=None, num_retry=None):
+        """Send the sync write packet of `group`, retrying according to `self.retry_policy` for at most `budget_s`
+        seconds. Returns the result of the last try, the number of tries and the number of failed tries of each motor.
+        """
+        policy = self.retry_policy
+        budget_s = policy.budget_s if budget_s is None else budget_s
+        num_retry = policy.num_retry if num_retry is None else num_retry
+
+        deadline = time.perf_counter() + budget_s
+        num_tries = 0
+        while True:
+            if self.estop_active:
+                raise EmergencyStopError()
+            comm = group.txPacket()
+            num_tries += 1
+            if comm == scs.COMM_SUCCESS or num_tries >= num_retry or time.perf_counter() >= deadline:
                 break
 
+        motor_failures = np.full(num_motors, num_tries - (comm == scs.COMM_SUCCESS), dtype=np.int64)
+        return comm, num_tries, motor_failures
+
+    def record_failures(self, data_name, motor_names, comm_success, num_tries, motor_failures):
+        idx = get_motor_indices(self.motor_names, motor_names, self._motor_indices)
+        self.failure_stats.record(data_name, idx, motor_failures, num_tries - 1, not comm_success)
+
+    def read(self, data_name, motor_names: str | list[str] | None = None, budget_s: float | None = None):
+        scs = self.scs
+
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"FeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+
+        start_time = time.perf_counter()
+
+        motor_names, motor_ids, models = self.resolve_motors(motor_names)
+
+        assert_same_address(self.model_ctrl_table, models, data_name)
+        addr, bytes = self.model_ctrl_table[models[0]][data_name]
+        group_key = (data_name, tuple(motor_names))
+        group = self.get_group_reader(scs, group_key, addr, bytes, motor_ids)
+
+        comm, num_tries, motor_failures = self.txrx_group(scs, group, bytes, motor_ids, budget_s)
+        self.record_failures(data_name, motor_names, comm == scs.COMM_SUCCESS, num_tries, motor_failures)
+
         if comm != scs.COMM_SUCCESS:
             raise ConnectionError(
-                f"Read failed due to communication error on port {self.port} for group_key {group_key}: "
+                f"Read failed due to communication error on port {self.port} for group_key {get_group_sync_key(data_name, motor_names)} "
+                f"after {num_tries} tries in {time.perf_counter() - start_time:.4f}s: "
                 f"{self.packet_handler.getTxRxResult(comm)}"
             )
 
+        return self.decode_read(
+            group, data_name, motor_names, motor_ids, addr, bytes, start_time, num_tries - 1, group_key
+        )
+
+    def decode_read(
+        self, group, data_name, motor_names, motor_ids, addr, bytes, start_time, retries=0, group_key=None
+    ):
+        """Get the values of `data_name` from a group reader after a successful transaction, and post-process them.
+        `group_key`, if given, is the `(data_name, tuple(motor_names))` of the group reader, reused by the telemetry.
+        """
+        values = self.get_raw_values(group, motor_ids, addr, bytes)
+        values = self.postprocess_values(values, data_name, motor_names)
+
+        if self.telemetry is not None:
+            self.telemetry.record(
+                "read",
+                (data_name, tuple(motor_names)) if group_key is None else group_key,
+                capture_timestamp_utc(),
+                time.perf_counter() - start_time,
+                retries,
+                values,
+            )
+
+        if self.shared_state is not None and data_name in SHARED_STATE_FIELDS:
+            idx = get_motor_indices(self.motor_names, motor_names, self._motor_indices)
+            self.shared_state.publish({SHARED_STATE_FIELDS[data_name]: values}, idx)
+
+        return values
+
+    def get_raw_values(self, group, motor_ids, addr, bytes) -> np.ndarray:
+        if self.is_native:
+            return group.getValues(addr, bytes).astype(np.int64)
+
         values = []
         for idx in motor_ids:
-            value = self.group_readers[group_key].getData(idx, addr, bytes)
+            value = group.getData(idx, addr, bytes)
             values.append(value)
+        return np.array(values)
 
-        values = np.array(values)
-
+    def postprocess_values(self, values, data_name, motor_names):
         # Convert to signed int to use range [-2048, 2048] for our motor positions.
         if data_name in CONVERT_UINT32_TO_INT32_REQUIRED:
             values = values.astype(np.int32)
 
         if data_name in CALIBRATION_REQUIRED:
-            values = self.avoid_rotation_reset(values, motor_names, data_name)
+            # `values` is the new int32 array of `astype` above
+            values = self.unwrap_positions(values, motor_names, data_name)
 
         if data_name in CALIBRATION_REQUIRED and self.calibration is not None:
             values = self.apply_calibration_autocorrect(values, motor_names)
 
-        # log the number of seconds it took to read the data from the motors
-        delta_ts_name = get_log_name("delta_timestamp_s", "read", data_name, motor_names)
-        self.logs[delta_ts_name] = time.perf_counter() - start_time
+        return values
 
-        # log the utc time at which the data was received
-        ts_utc_name = get_log_name("timestamp_utc", "read", data_name, motor_names)
-        self.logs[ts_utc_name] = capture_timestamp_utc()
+    def read_state(self, motor_names: str | list[str] | None = None, budget_s: float | None = None) -> np.ndarray:
+        """Read all the registers of `STATE_DATA_NAMES` in a single sync read transaction.
 
-        return values
+        Since these registers are contiguous in the control table, they are fetched as one block for all
+        motors and decoded into a structured array with one field per register, e.g. `state["Present_Speed"]`.
+        Present_Position goes through the same rotation reset and calibration as in `read`.
+        """
+        scs = self.scs
 
-    def write_with_motor_ids(self, motor_models, motor_ids, data_name, values, num_retry=NUM_WRITE_RETRY):
-        if self.mock:
-            import tests.motors.mock_scservo_sdk as scs
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"FeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+
+        start_time = time.perf_counter()
+
+        motor_names, motor_ids, models = self.resolve_motors(motor_names)
+
+        for data_name in STATE_DATA_NAMES:
+            assert_same_address(self.model_ctrl_table, models, data_name)
+        ctrl_table = self.model_ctrl_table[models[0]]
+        addr, bytes = get_block_address(ctrl_table, STATE_DATA_NAMES)
+        group_key = (tuple(STATE_DATA_NAMES), tuple(motor_names))
+        group = self.get_group_reader(scs, group_key, addr, bytes, motor_ids)
+
+        comm, num_tries, motor_failures = self.txrx_group(scs, group, bytes, motor_ids, budget_s)
+        self.record_failures("State", motor_names, comm == scs.COMM_SUCCESS, num_tries, motor_failures)
+
+        if comm != scs.COMM_SUCCESS:
+            raise ConnectionError(
+                f"Read failed due to communication error on port {self.port} for group_key {get_group_sync_key('State', motor_names)} "
+                f"after {num_tries} tries in {time.perf_counter() - start_time:.4f}s: "
+                f"{self.packet_handler.getTxRxResult(comm)}"
+            )
+
+        return self.decode_read_state(
+            group, motor_names, motor_ids, addr, ctrl_table, start_time, num_tries - 1, group_key
+        )
+
+    def decode_read_state(
+        self, group, motor_names, motor_ids, addr, ctrl_table, start_time, retries=0, group_key=None
+    ):
+        """Decode the state block from a group reader after a successful transaction, and post-process it.
+        `group_key`, if given, is the key of the group reader, whose tuple of motor names is reused by the telemetry.
+        """
+        raw = self.get_raw_block(group, motor_ids)
+        state = self.postprocess_block(raw, motor_names, addr, ctrl_table)
+
+        if self.telemetry is not None:
+            self.telemetry.record(
+                "read",
+                ("State", tuple(motor_names) if group_key is None else group_key[1]),
+                capture_timestamp_utc(),
+                time.perf_counter() - start_time,
+                retries,
+                state,
+            )
+
+        if self.shared_state is not None:
+            idx = get_motor_indices(self.motor_names, motor_names, self._motor_indices)
+            self.shared_state.publish({field: state[name] for name, field in SHARED_STATE_FIELDS.items()}, idx)
+
+        return state
+
+    def get_valid_mask(self, group, comm, num_motors) -> np.ndarray:
+        """Motors whose reply was received. Without a per-motor mask (i.e. with `scservo_sdk`), all or none.
+
+        `group.valid` is only used when the last try received something: after a failed transmit, it is still the
+        mask of the previous read.
+        """
+        scs = self.scs
+        if comm == scs.COMM_SUCCESS:
+            return np.ones(num_motors, dtype=bool)
+        valid = getattr(group, "valid", None)
+        if valid is None or comm not in (scs.COMM_RX_TIMEOUT, scs.COMM_RX_CORRUPT):
+            return np.zeros(num_motors, dtype=bool)
+        return valid.copy()
+
+    def get_values_dtype(self, data_name):
+        if data_name in CALIBRATION_REQUIRED and self.calibration is not None:
+            return np.float32
+        if data_name in CONVERT_UINT32_TO_INT32_REQUIRED:
+            return np.int32
+        return np.int64
+
+    def get_partial_read(self, group_key, data_name, motor_names, dtype) -> PartialRead:
+        partial = self.partial_reads.get(group_key)
+        # Also recreated when the values change type, e.g. once the calibration is set
+        if partial is None or partial.values.dtype != dtype:
+            partial = self.partial_reads[group_key] = PartialRead(data_name, motor_names, dtype)
+        return partial
+
+    def read_partial(
+        self, data_name, motor_names: str | list[str] | None = None, budget_s: float | None = None
+    ) -> PartialRead:
+        """Read `data_name` without failing the whole group when some motors do not reply.
+
+        A single sync read is sent, and the values of the motors which replied are stored in the returned
+        `PartialRead`. The motors which did not reply are then read one by one with the rest of `budget_s`, instead of
+        sending the whole group again. Those which still fail keep their previous value, flagged as invalid, and are
+        retried on the next call or by `retry_stale_motors`. The `PartialRead` is reused by the next calls.
+        """
+        scs = self.scs
+
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"FeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+
+        start_time = time.perf_counter()
+        budget_s = self.retry_policy.budget_s if budget_s is None else budget_s
+
+        motor_names, motor_ids, models = self.resolve_motors(motor_names)
+
+        assert_same_address(self.model_ctrl_table, models, data_name)
+        addr, bytes = self.model_ctrl_table[models[0]][data_name]
+        group_key = (data_name, tuple(motor_names))
+        group = self.get_group_reader(scs, group_key, addr, bytes, motor_ids)
+
+        comm, num_tries, motor_failures = self.txrx_group(scs, group, bytes, motor_ids, budget_s, num_retry=1)
+        self.record_failures(data_name, motor_names, comm == scs.COMM_SUCCESS, num_tries, motor_failures)
+
+        partial = self.update_partial_read(group, comm, data_name, motor_names, motor_ids, addr, bytes, group_key)
+        self.retry_partial_read(partial, start_time + budget_s)
+        return partial
+
+    def update_partial_read(
+        self, group, comm, data_name, motor_names, motor_ids, addr, bytes, group_key
+    ) -> PartialRead:
+        """Store in the `PartialRead` of `group_key` the values of the motors which replied to `group`."""
+        valid = self.get_valid_mask(group, comm, len(motor_ids))
+        partial = self.get_partial_read(group_key, data_name, motor_names, self.get_values_dtype(data_name))
+        values = self.get_raw_values(group, motor_ids, addr, bytes)[valid]
+        if valid.any():
+            valid_names = [name for name, is_valid in zip(motor_names, valid, strict=True) if is_valid]
+            values = self.postprocess_values(values, data_name, valid_names)
+        partial.update(valid, values, time.perf_counter())
+        return partial
+
+    def read_state_partial(
+        self, motor_names: str | list[str] | None = None, budget_s: float | None = None
+    ) -> PartialRead:
+        """Same as `read_partial` for the registers of `read_state`. `PartialRead.values` is a structured array."""
+        scs = self.scs
+
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"FeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+
+        start_time = time.perf_counter()
+        budget_s = self.retry_policy.budget_s if budget_s is None else budget_s
+
+        motor_names, motor_ids, models = self.resolve_motors(motor_names)
+
+        for data_name in STATE_DATA_NAMES:
+            assert_same_address(self.model_ctrl_table, models, data_name)
+        ctrl_table = self.model_ctrl_table[models[0]]
+        addr, bytes = get_block_address(ctrl_table, STATE_DATA_NAMES)
+        group_key = (tuple(STATE_DATA_NAMES), tuple(motor_names))
+        group = self.get_group_reader(scs, group_key, addr, bytes, motor_ids)
+
+        comm, num_tries, motor_failures = self.txrx_group(scs, group, bytes, motor_ids, budget_s, num_retry=1)
+        self.record_failures("State", motor_names, comm == scs.COMM_SUCCESS, num_tries, motor_failures)
+
+        partial = self.update_partial_read_state(group, comm, motor_names, motor_ids, addr, ctrl_table, group_key)
+        self.retry_partial_read(partial, start_time + budget_s)
+        return partial
+
+    def update_partial_read_state(
+        self, group, comm, motor_names, motor_ids, addr, ctrl_table, group_key
+    ) -> PartialRead:
+        """Same as `update_partial_read` for the registers of `read_state`."""
+        valid = self.get_valid_mask(group, comm, len(motor_ids))
+        dtype = get_state_dtype(STATE_DATA_NAMES, calibrated=self.calibration is not None)
+        partial = self.get_partial_read(group_key, "State", motor_names, dtype)
+        if valid.any():
+            valid_names = [name for name, is_valid in zip(motor_names, valid, strict=True) if is_valid]
+            state = self.postprocess_block(self.get_raw_block(group, motor_ids)[valid], valid_names, addr, ctrl_table)
+            partial.update(valid, state, time.perf_counter())
         else:
-            import scservo_sdk as scs
+            partial.update(valid, partial.values[valid], time.perf_counter())
+        return partial
+
+    def retry_partial_read(self, partial: PartialRead, deadline: float):
+        """Read the invalid motors of `partial` one by one until the `time.perf_counter()` `deadline`."""
+        stale = np.flatnonzero(~partial.valid)
+        for num_done, i in enumerate(stale):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+
+            # Share the remaining time, so that a disconnected motor does not starve the others
+            budget_s = remaining / (len(stale) - num_done)
+            name = partial.motor_names[i]
+            try:
+                if partial.data_name == "State":
+                    value = self.read_state(name, budget_s=budget_s)[0]
+                else:
+                    value = self.read(partial.data_name, name, budget_s=budget_s)[0]
+            except ConnectionError:
+                continue
+            partial.update_motor(i, value, time.perf_counter())
+
+    def retry_stale_motors(self, budget_s: float):
+        """Read one by one the motors which failed during the last `read_partial` or `read_state_partial` calls,
+        for at most `budget_s` seconds. Meant to use the idle time of a control loop, e.g. as `ControlLoop.idle_fn`.
+        """
+        deadline = time.perf_counter() + budget_s
+        for partial in self.partial_reads.values():
+            if time.perf_counter() >= deadline:
+                break
+            if not partial.valid.all():
+                self.retry_partial_read(partial, deadline)
+
+    def get_raw_block(self, group, motor_ids) -> np.ndarray:
+        if self.is_native:
+            return group.getBlock()
+        return np.array([group.data_dict[idx] for idx in motor_ids], dtype=np.uint8)
+
+    def postprocess_block(self, raw, motor_names, addr, ctrl_table) -> np.ndarray:
+        dtype = get_state_dtype(STATE_DATA_NAMES, calibrated=self.calibration is not None)
+        state = decode_block(raw, addr, ctrl_table, STATE_DATA_NAMES, dtype)
+
+        positions = state["Present_Position"].astype(np.int32)
+        positions = self.unwrap_positions(positions, motor_names, "Present_Position")
+        if self.calibration is not None:
+            positions = self.apply_calibration_autocorrect(positions, motor_names)
+        state["Present_Position"] = positions
+        return state
+
+    def write_with_motor_ids(
+        self, motor_models, motor_ids, data_name, values, num_retry=NUM_WRITE_RETRY, budget_s=None
+    ):
+        scs = self.scs
 
         if not isinstance(motor_ids, list):
             motor_ids = [motor_ids]
@@ -797,14 +1533,18 @@ class FeetechMotorsBus:
         assert_same_address(self.model_ctrl_table, motor_models, data_name)
         addr, bytes = self.model_ctrl_table[motor_models[0]][data_name]
         group = scs.GroupSyncWrite(self.port_handler, self.packet_handler, addr, bytes)
-        for idx, value in zip(motor_ids, values, strict=True):
-            data = convert_to_bytes(value, bytes, self.mock)
-            group.addParam(idx, data)
+        if self.is_native:
+            for idx in motor_ids:
+                group.addParam(idx)
+            group.setValues(values)
+        else:
+            for idx, value in zip(motor_ids, values, strict=True):
+                data = convert_to_bytes(value, bytes, self.mock)
+                group.addParam(idx, data)
 
-        for _ in range(num_retry):
-            comm = group.txPacket()
-            if comm == scs.COMM_SUCCESS:
-                break
+        # Bypasses the write coalescing of `write_registers`
+        self.invalidate_writes([data_name])
+        comm, _, _ = self.tx_group(scs, group, len(motor_ids), budget_s, num_retry)
 
         if comm != scs.COMM_SUCCESS:
             raise ConnectionError(
@@ -812,7 +1552,28 @@ class FeetechMotorsBus:
                 f"{self.packet_handler.getTxRxResult(comm)}"
             )
 
-    def write(self, data_name, values: int | float | np.ndarray, motor_names: str | list[str] | None = None):
+    def write(
+        self,
+        data_name,
+        values: int | float | np.ndarray,
+        motor_names: str | list[str] | None = None,
+        budget_s: float | None = None,
+    ):
+        self.write_registers({data_name: values}, motor_names, budget_s)
+
+    def write_registers(
+        self,
+        registers: dict[str, int | float | np.ndarray],
+        motor_names: str | list[str] | None = None,
+        budget_s: float | None = None,
+    ):
+        """Write the values of several registers, e.g. `{"Goal_Position": ..., "Goal_Time": ..., "Goal_Speed": ...}`.
+
+        Registers which are adjacent in the control table are merged into a single sync write. Values of the
+        registers of `self.write_tolerances` which did not change by more than the tolerance since the last write
+        are not sent again. If `self.broadcast_writes` is set and all the motors of the bus get the same values,
+        a single broadcast write is sent instead of a sync write.
+        """
         if not self.is_connected:
             raise RobotDeviceNotConnectedError(
                 f"FeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
@@ -820,66 +1581,410 @@ class FeetechMotorsBus:
 
         start_time = time.perf_counter()
 
-        if self.mock:
-            import tests.motors.mock_scservo_sdk as scs
-        else:
-            import scservo_sdk as scs
+        scs = self.scs
 
-        if motor_names is None:
-            motor_names = self.motor_names
+        motor_names, motor_ids, models = self.resolve_motors(motor_names)
 
-        if isinstance(motor_names, str):
-            motor_names = [motor_names]
+        raw_values = {}
+        for data_name, values in registers.items():
+            assert_same_address(self.model_ctrl_table, models, data_name)
 
-        if isinstance(values, (int, float, np.integer)):
-            values = [int(values)] * len(motor_names)
+            if np.ndim(values) == 0:
+                values = [int(values)] * len(motor_names)
 
-        values = np.array(values)
+            values = np.array(values)
 
-        motor_ids = []
-        models = []
-        for name in motor_names:
-            motor_idx, model = self.motors[name]
-            motor_ids.append(motor_idx)
-            models.append(model)
+            if data_name in CALIBRATION_REQUIRED and self.calibration is not None:
+                values = self.revert_calibration(values, motor_names)
 
-        if data_name in CALIBRATION_REQUIRED and self.calibration is not None:
-            values = self.revert_calibration(values, motor_names)
+            raw_values[data_name] = values
 
-        values = values.tolist()
+        # Only the motors with at least one changed value are written
+        changed = self.get_changed_motors(raw_values, motor_names)
+        if not changed.any():
+            return
+        if not changed.all():
+            motor_names = [name for name, is_changed in zip(motor_names, changed, strict=True) if is_changed]
+            motor_ids = [idx for idx, is_changed in zip(motor_ids, changed, strict=True) if is_changed]
+            raw_values = {data_name: values[changed] for data_name, values in raw_values.items()}
+        # Motor names of the telemetry keys, shared by all the runs
+        motor_key = tuple(motor_names) if self.telemetry is not None else None
 
-        assert_same_address(self.model_ctrl_table, models, data_name)
-        addr, bytes = self.model_ctrl_table[model][data_name]
-        group_key = get_group_sync_key(data_name, motor_names)
+        ctrl_table = self.model_ctrl_table[models[0]]
+        for data_names in get_contiguous_runs(ctrl_table, list(raw_values)):
+            addr, bytes = get_block_address(ctrl_table, data_names)
+            run_values = [raw_values[data_name] for data_name in data_names]
+            run_name = "+".join(data_names)
 
-        init_group = data_name not in self.group_readers
+            if self.can_broadcast(motor_names, run_values):
+                comm, num_tries, motor_failures = self.broadcast_write(
+                    scs, addr, bytes, ctrl_table, data_names, run_values, budget_s
+                )
+            else:
+                group = self.get_group_writer(scs, ctrl_table, data_names, run_values, motor_names, motor_ids)
+                comm, num_tries, motor_failures = self.tx_group(scs, group, len(motor_ids), budget_s)
+            self.record_failures(run_name, motor_names, comm == scs.COMM_SUCCESS, num_tries, motor_failures)
+
+            if comm != scs.COMM_SUCCESS:
+                # The motors may or may not have received the values, so they are sent again on the next write
+                self.invalidate_writes(data_names)
+                raise ConnectionError(
+                    f"Write failed due to communication error on port {self.port} for group_key {get_group_sync_key(run_name, motor_names)} "
+                    f"after {num_tries} tries: "
+                    f"{self.packet_handler.getTxRxResult(comm)}"
+                )
+
+            for data_name, values in zip(data_names, run_values, strict=True):
+                self.update_last_written(data_name, motor_names, values)
+
+            if self.telemetry is not None:
+                # The values are recorded as sent to the motors, i.e. after reverting the calibration
+                self.telemetry.record(
+                    "write",
+                    (data_names[0] if len(data_names) == 1 else tuple(data_names), motor_key),
+                    capture_timestamp_utc(),
+                    time.perf_counter() - start_time,
+                    num_tries - 1,
+                    run_values[0] if len(data_names) == 1 else np.stack(run_values),
+                )
+
+    def get_group_writer(self, scs, ctrl_table, data_names, run_values, motor_names, motor_ids):
+        """Prepared sync write of the contiguous registers `data_names`, with the values of `run_values` packed."""
+        addr, bytes = get_block_address(ctrl_table, data_names)
+        group_key = (data_names[0] if len(data_names) == 1 else tuple(data_names), tuple(motor_names))
+
+        group = self.group_writers.get(group_key)
+        init_group = group is None
         if init_group:
-            self.group_writers[group_key] = scs.GroupSyncWrite(
-                self.port_handler, self.packet_handler, addr, bytes
-            )
+            group = scs.GroupSyncWrite(self.port_handler, self.packet_handler, addr, bytes)
+            self.group_writers[group_key] = group
 
-        for idx, value in zip(motor_ids, values, strict=True):
-            data = convert_to_bytes(value, bytes, self.mock)
+        if self.is_native:
             if init_group:
-                self.group_writers[group_key].addParam(idx, data)
+                for idx in motor_ids:
+                    group.addParam(idx)
+            # Values are packed at once into the prepared sync write packet
+            if len(data_names) == 1:
+                group.setValues(run_values[0])
             else:
-                self.group_writers[group_key].changeParam(idx, data)
+                group.setBlockValues(
+                    [
+                        (ctrl_table[data_name][0] - addr, ctrl_table[data_name][1], values)
+                        for data_name, values in zip(data_names, run_values, strict=True)
+                    ]
+                )
+        else:
+            sizes = [ctrl_table[data_name][1] for data_name in data_names]
+            for i, idx in enumerate(motor_ids):
+                data = pack_registers([values[i].item() for values in run_values], sizes, self.mock)
+                if init_group:
+                    group.addParam(idx, data)
+                else:
+                    group.changeParam(idx, data)
+        return group
+
+    def can_broadcast(self, motor_names, run_values) -> bool:
+        if not self.broadcast_writes or len(motor_names) != len(self.motors):
+            return False
+        return all((values == values[0]).all() for values in run_values)
+
+    def broadcast_write(self, scs, addr, bytes, ctrl_table, data_names, run_values, budget_s=None):
+        """Write the same values to all the motors of the bus with a single broadcast write, which gets no reply."""
+        sizes = [ctrl_table[data_name][1] for data_name in data_names]
+        data = pack_registers(
+            [values[0].item() for values in run_values], sizes, self.mock, self.is_native
+        )
+
+        policy = self.retry_policy
+        budget_s = policy.budget_s if budget_s is None else budget_s
+        deadline = time.perf_counter() + budget_s
+        num_tries = 0
+        while True:
+            if self.estop_active:
+                raise EmergencyStopError()
+            comm = self.packet_handler.writeTxOnly(self.port_handler, BROADCAST_ID, addr, bytes, data)
+            num_tries += 1
+            if comm == scs.COMM_SUCCESS or num_tries >= policy.num_retry or time.perf_counter() >= deadline:
+                break
+
+        motor_failures = np.full(len(self.motors), num_tries - (comm == scs.COMM_SUCCESS), dtype=np.int64)
+        return comm, num_tries, motor_failures
+
+    def get_changed_motors(self, raw_values: dict[str, np.ndarray], motor_names) -> np.ndarray:
+        """Mask of the motors with at least one value differing from the last one written, for the registers of
+        `self.write_tolerances`. The values of the other registers are always considered changed."""
+        changed = np.zeros(len(motor_names), dtype=bool)
+        idx = get_motor_indices(self.motor_names, motor_names, self._motor_indices)
+        for data_name, values in raw_values.items():
+            tolerance = self.write_tolerances.get(data_name)
+            last_written = self.last_written.get(data_name)
+            if tolerance is None or last_written is None:
+                return np.ones(len(motor_names), dtype=bool)
+            # Never written values are NaN, and thus changed
+            changed |= ~(np.abs(values - last_written[idx]) <= tolerance)
+        return changed
+
+    def update_last_written(self, data_name, motor_names, values):
+        if data_name not in self.write_tolerances:
+            return
+        last_written = self.last_written.get(data_name)
+        if last_written is None:
+            last_written = self.last_written[data_name] = np.full(len(self.motor_names), np.nan)
+        last_written[get_motor_indices(self.motor_names, motor_names, self._motor_indices)] = values
+
+    def invalidate_writes(self, data_names=None):
+        """Forget the values written to `data_names` (all by default), so that they are sent on the next write."""
+        if data_names is None:
+            self.last_written = {}
+            return
+        for data_name in data_names:
+            self.last_written.pop(data_name, None)
+
+    def enable_telemetry(self, capacity: int = DEFAULT_CAPACITY):
+        """Record the last `capacity` reads and writes of each register group, see `max_v1.motors.telemetry`."""
+        self.telemetry = TelemetryRecorder(capacity)
+        return self.telemetry
+
+    def disable_telemetry(self):
+        self.telemetry = None
+
+    def share_state(self, name: str):
+        """Publish the positions, speeds and loads of every `read` and `read_state` into the shared memory block
+        `name`, for other processes to attach with `SharedJointState.attach(name)`, see `max_v1.motors.shared_state`.
+        """
+        from max_v1.motors.shared_state import SharedJointState
+
+        self.stop_sharing_state()
+        self.shared_state = SharedJointState(name, self.motor_names)
+        return self.shared_state
+
+    def stop_sharing_state(self):
+        if self.shared_state is not None:
+            self.shared_state.close()
+            self.shared_state = None
+
+    def share_commands(self, name: str, capacity: int | None = None):
+        """Create the shared memory ring `name` of goal commands, one goal per motor of `motor_names`, for another
+        process to attach with `SharedCommandRing.attach(name)` and push goals. See `apply_shared_commands`."""
+        from max_v1.motors.shared_state import DEFAULT_RING_CAPACITY, SharedCommandRing
+
+        self.stop_sharing_commands()
+        self.shared_commands = SharedCommandRing(name, len(self.motors), capacity or DEFAULT_RING_CAPACITY)
+        return self.shared_commands
+
+    def stop_sharing_commands(self):
+        if self.shared_commands is not None:
+            self.shared_commands.close()
+            self.shared_commands = None
+
+    def apply_shared_commands(self, data_name: str = "Goal_Position") -> bool:
+        """Write the latest goals pushed into the ring of `share_commands`, if any, to the motors they command.
+        Meant to be called once per tick of the control loop. Returns whether goals were written."""
+        shared_goals = self.pop_shared_goals()
+        if shared_goals is None:
+            return False
+        self.write(data_name, *shared_goals)
+        return True
+
+    def pop_shared_goals(self) -> tuple[np.ndarray, list[str] | None] | None:
+        """Merge the goals pushed into the ring of `share_commands`. Returns the goals and the names of the motors
+        they command (None for all), or None if no motor is commanded."""
+        goals = self.shared_commands.pop_latest()
+        if goals is None:
+            return None
+        commanded = ~np.isnan(goals)
+        if not commanded.any():
+            return None
+        if commanded.all():
+            return goals, None
+        motor_names = [name for name, is_commanded in zip(self.motor_names, commanded) if is_commanded]
+        return goals[commanded], motor_names
+
+    def stage_write(
+        self,
+        data_name,
+        values: int | float | np.ndarray,
+        motor_names: str | list[str] | None = None,
+        budget_s: float | None = None,
+    ):
+        """Pre-load `values` of `data_name` into the motors with REG_WRITE, without applying them: the motors only
+        apply their registered values on the next `commit_staged`, all at once.
+
+        Each motor acknowledges its REG_WRITE, so that once this returns the values are known to be registered by all
+        the motors. The motors which did not acknowledge are retried according to `self.retry_policy`. With the
+        native backends all the REG_WRITE packets are sent in a single write, otherwise one motor after the other.
+        """
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"FeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+
+        scs = self.scs
+        motor_names, motor_ids, models = self.resolve_motors(motor_names)
+        assert_same_address(self.model_ctrl_table, models, data_name)
+        addr, bytes = self.model_ctrl_table[models[0]][data_name]
+
+        if np.ndim(values) == 0:
+            values = [int(values)] * len(motor_names)
+        values = np.array(values)
+        if data_name in CALIBRATION_REQUIRED and self.calibration is not None:
+            values = self.revert_calibration(values, motor_names)
+
+        if self.is_native:
+            group_key = (data_name, tuple(motor_names))
+            group = self.group_reg_writers.get(group_key)
+            if group is None:
+                group = scs.GroupRegWrite(self.port_handler, self.packet_handler, addr, bytes, motor_ids)
+                self.group_reg_writers[group_key] = group
+            group.setValues(values)
+            # The acknowledgements carry no data, like a sync read of 0 bytes
+            comm, num_tries, motor_failures = self.txrx_group(scs, group, 0, motor_ids, budget_s)
+        else:
+            comm, num_tries, motor_failures = self.reg_write_motors(scs, addr, bytes, values, motor_ids, budget_s)
+        self.record_failures(data_name, motor_names, comm == scs.COMM_SUCCESS, num_tries, motor_failures)
 
-        comm = self.group_writers[group_key].txPacket()
         if comm != scs.COMM_SUCCESS:
             raise ConnectionError(
-                f"Write failed due to communication error on port {self.port} for group_key {group_key}: "
+                f"Stage write failed due to communication error on port {self.port} for group_key "
+                f"{get_group_sync_key(data_name, motor_names)} after {num_tries} tries: "
                 f"{self.packet_handler.getTxRxResult(comm)}"
             )
+        self.staged_data_names.add(data_name)
+
+    def reg_write_motors(self, scs, addr, bytes, values, motor_ids, budget_s=None):
+        """REG_WRITE of `values` to each motor of `motor_ids` in turn, for the backends without `GroupRegWrite`.
+        Returns the result of the last try, the number of tries and the number of failed tries of each motor."""
+        policy = self.retry_policy
+        budget_s = policy.budget_s if budget_s is None else budget_s
+        deadline = time.perf_counter() + budget_s
+        motor_failures = np.zeros(len(motor_ids), dtype=np.int64)
+        comm = scs.COMM_SUCCESS
+        num_tries = 0
+        for i, (motor_id, value) in enumerate(zip(motor_ids, values, strict=True)):
+            data = pack_registers([value.item()], [bytes], self.mock, self.is_native)
+            motor_tries = 0
+            while True:
+                if self.estop_active:
+                    raise EmergencyStopError()
+                comm, _ = self.packet_handler.regWriteTxRx(self.port_handler, motor_id, addr, bytes, data)
+                motor_tries += 1
+                if comm == scs.COMM_SUCCESS:
+                    break
+                motor_failures[i] += 1
+                if motor_tries >= policy.num_retry or time.perf_counter() >= deadline:
+                    break
+            num_tries = max(num_tries, motor_tries)
+            if comm != scs.COMM_SUCCESS:
+                break
+        return comm, num_tries, motor_failures
 
-        # log the number of seconds it took to write the data to the motors
-        delta_ts_name = get_log_name("delta_timestamp_s", "write", data_name, motor_names)
-        self.logs[delta_ts_name] = time.perf_counter() - start_time
+    def commit_staged(self) -> float:
+        """Broadcast ACTION, so that all the motors apply the values pre-loaded with `stage_write` at once.
 
-        # TODO(rcadene): should we log the time before sending the write command?
-        # log the utc time when the write has been completed
-        ts_utc_name = get_log_name("timestamp_utc", "write", data_name, motor_names)
-        self.logs[ts_utc_name] = capture_timestamp_utc()
+        The packet is written straight to the port, to be sent as early as possible: no transaction of the bus must
+        be in flight. Returns the `time.perf_counter()` at which it was handed to the port.
+        """
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"FeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+        if self.estop_active:
+            raise EmergencyStopError()
+
+        if self.mock:
+            self.packet_handler.action(self.port_handler, BROADCAST_ID)
+        else:
+            self.port_handler.ser.write(ACTION_PACKET)
+        sent = time.perf_counter()
+
+        # The motors do not hold the values last written anymore
+        self.invalidate_writes(list(self.staged_data_names))
+        self.staged_data_names.clear()
+        return sent
+
+    def emergency_stop(self, num_repeats: int = ESTOP_REPEATS) -> float:
+        """Disable the torque of all the motors of the bus as fast as possible, from any thread.
+
+        The transaction in flight, possibly retrying in another thread, is aborted: with the native backend its
+        wait for replies returns at once, otherwise it ends with its current receive window. The port is flushed,
+        then a broadcast write of Torque_Enable=0 is sent `num_repeats` times without waiting for any lock, so that
+        a packet cut by the aborted transaction cannot swallow it. All the transactions then raise an
+        `EmergencyStopError` until `clear_emergency_stop`.
+
+        Returns the latency from the call until the packets were sent, also kept in `estop_latencies_s`.
+        """
+        start = time.perf_counter()
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"FeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+        self.estop_active = True
+        port_handler = self.port_handler
+        if hasattr(port_handler, "abort"):
+            port_handler.abort()
+
+        addr, bytes = self.model_ctrl_table[self.motor_models[0]]["Torque_Enable"]
+        if self.mock:
+            self.packet_handler.writeTxOnly(port_handler, BROADCAST_ID, addr, bytes, [0])
+        else:
+            ser = port_handler.ser
+            ser.reset_output_buffer()
+            ser.reset_input_buffer()
+            packet = get_estop_packet(addr)
+            for _ in range(num_repeats):
+                ser.write(packet)
+            # Wait for the packets to leave the port, when the port supports it
+            if hasattr(ser, "flush"):
+                ser.flush()
+
+        latency_s = time.perf_counter() - start
+        self.estop_latencies_s.append(latency_s)
+        return latency_s
+
+    def clear_emergency_stop(self):
+        """Allow transactions again after `emergency_stop`. The torque stays disabled until written again."""
+        if hasattr(self.port_handler, "clear_abort"):
+            self.port_handler.clear_abort()
+        if self.port_handler is not None and not self.mock:
+            self.port_handler.ser.reset_input_buffer()
+        # The motors do not hold the values last written anymore
+        self.invalidate_writes()
+        self.estop_active = False
+
+    def get_estop_stats(self) -> dict:
+        """Latencies of the `emergency_stop` calls, to validate the worst case on each robot."""
+        latencies = np.array(self.estop_latencies_s)
+        if len(latencies) == 0:
+            return {"count": 0}
+        return {
+            "count": len(latencies),
+            "last_s": float(latencies[-1]),
+            "mean_s": float(latencies.mean()),
+            "max_s": float(latencies.max()),
+        }
+
+    def start_recording(self, path: str):
+        """Append every packet sent and received on the port to the binary log `path`, to be replayed with the port
+        "replay://path", see `max_v1.motors.recording`. Not available with the mock backend, which has no wire."""
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"FeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+        from max_v1.motors.recording import BusRecorder, RecordingTransport
+
+        self.stop_recording()
+        self.recorder = BusRecorder(path)
+        self.port_handler.ser = RecordingTransport(self.port_handler.ser, self.recorder)
+        return self.recorder
+
+    def stop_recording(self):
+        """Write the pending records and close the log of `start_recording`."""
+        if self.recorder is None:
+            return
+        if self.port_handler is not None and hasattr(self.port_handler.ser, "recorder"):
+            self.port_handler.ser = self.port_handler.ser.ser
+        self.recorder.close()
+        self.recorder = None
 
     def disconnect(self):
         if not self.is_connected:
@@ -887,15 +1992,30 @@ class FeetechMotorsBus:
                 f"FeetechMotorsBus({self.port}) is not connected. Try running `motors_bus.connect()` first."
             )
 
+        self.stop_recording()
+        self.stop_sharing_state()
+        self.stop_sharing_commands()
         if self.port_handler is not None:
             self.port_handler.closePort()
             self.port_handler = None
 
         self.packet_handler = None
-        self.group_readers = {}
-        self.group_writers = {}
+        if self.emulator is not None:
+            self.emulator.stop()
+            self.emulator = None
+        self.clear_port_state()
         self.is_connected = False
 
+    def clear_port_state(self):
+        """Forget the prepared handles, round trip estimates and values last read or written on the port."""
+        self.group_readers.clear()
+        self.group_writers.clear()
+        self.group_reg_writers.clear()
+        self.staged_data_names = set()
+        self.rtt_estimators = {}
+        self.partial_reads = {}
+        self.last_written = {}
+
     def __del__(self):
         if getattr(self, "is_connected", False):
             self.disconnect()
@@ -0,0 +1,324 @@
+"""asyncio variant of `FeetechMotorsBus`.
+
+`AsyncFeetechMotorsBus` shares the control tables, prepared sync read/write handles, calibration and rotation
+tracking of `FeetechMotorsBus`, and talks to the motors with the native packet codec of `max_v1.motors.codec`.
+Instead of blocking the calling thread until the motors reply, reads wait for the serial port with the event
+loop, so that one process can multiplex several buses with the rest of the robot stack without threads:
+
+```python
+front_bus = AsyncFeetechMotorsBus(FeetechMotorsBusConfig(port=front_port, motors=front_motors, backend="native"))
+rear_bus = AsyncFeetechMotorsBus(FeetechMotorsBusConfig(port=rear_port, motors=rear_motors, backend="native"))
+front_bus.connect()
+rear_bus.connect()
+
+front_state, rear_state = await asyncio.gather(front_bus.read_state(), rear_bus.read_state())
+await front_bus.write("Goal_Position", front_state["Present_Position"] + 10)
+```
+"""
+
+import asyncio
+import time
+
+import numpy as np
+
+import max_v1.motors.codec as scs
+from max_v1.motors.feetech import (
+    STATE_DATA_NAMES,
+    EmergencyStopError,
+    FeetechMotorsBus,
+    PartialRead,
+    RobotDeviceNotConnectedError,
+    assert_same_address,
+    get_block_address,
+    get_group_sync_key,
+)
+
+
+class AsyncSerialReader:
+    """Reads the non-blocking serial port of a `codec.PortHandler` by waiting on its file descriptor with the
+    event loop."""
+
+    def __init__(self, port_handler: scs.PortHandler):
+        self.port_handler = port_handler
+
+    async def read_into(self, buffer: bytearray, timeout_s: float) -> int:
+        """Read into `buffer` until it is full or `timeout_s` elapsed. Returns the number of bytes read."""
+        loop = asyncio.get_running_loop()
+        ser = self.port_handler.ser
+        view = memoryview(buffer)
+        num_bytes = 0
+        deadline = loop.time() + timeout_s
+        while num_bytes < len(buffer) and not self.port_handler.aborted:
+            chunk = ser.read(len(buffer) - num_bytes)
+            if chunk:
+                view[num_bytes : num_bytes + len(chunk)] = chunk
+                num_bytes += len(chunk)
+                continue
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+
+            readable = loop.create_future()
+            # The abort pipe wakes up the wait on `emergency_stop`
+            fds = [ser.fileno(), self.port_handler.abort_fds[0]]
+            for fd in fds:
+                loop.add_reader(fd, _set_readable, readable)
+            try:
+                await asyncio.wait_for(readable, remaining)
+            except asyncio.TimeoutError:
+                break
+            finally:
+                for fd in fds:
+                    loop.remove_reader(fd)
+        return num_bytes
+
+
+def _set_readable(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AsyncFeetechMotorsBus(FeetechMotorsBus):
+    """`FeetechMotorsBus` whose `read`, `read_state` and `write` are coroutines, as well as the partial reads
+    (`read_partial`, `read_state_partial` and `retry_stale_motors`) and `apply_shared_commands` built on them.
+
+    It needs the "native" backend, or the "emulator" one. Transactions on the same bus are serialized with an
+    `asyncio.Lock`, while transactions on different buses overlap. Writes run on the default executor of the loop.
+    `connect` and `disconnect` stay synchronous, or the bus can be used as an async context manager.
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
+        if self.mock:
+            raise ValueError("AsyncFeetechMotorsBus does not support mocked motors.")
+        if not self.is_native:
+            raise ValueError(
+                f"AsyncFeetechMotorsBus needs a native backend, e.g. 'native' or 'emulator', not '{self.backend}'."
+            )
+        self.reader = None
+        self.lock = asyncio.Lock()
+
+    def connect(self):
+        super().connect()
+        self.reader = AsyncSerialReader(self.port_handler)
+
+    async def __aenter__(self):
+        self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.disconnect()
+
+    async def are_motors_configured(self):
+        try:
+            return (self.motor_indices == await self.read("ID")).all()
+        except ConnectionError as e:
+            print(e)
+            return False
+
+    async def txrx_group(self, scs, group: scs.GroupSyncRead, bytes, motor_ids, budget_s=None, num_retry=None):
+        """Same as `FeetechMotorsBus.txrx_group`, waiting for the replies with the event loop."""
+        policy = self.retry_policy
+        budget_s = policy.budget_s if budget_s is None else budget_s
+        num_retry = policy.num_retry if num_retry is None else num_retry
+        estimator = self.get_rtt_estimator(bytes, len(motor_ids))
+        motor_failures = np.zeros(len(motor_ids), dtype=np.int64)
+
+        deadline = time.perf_counter() + budget_s
+        num_tries = 0
+        while True:
+            if self.estop_active:
+                raise EmergencyStopError()
+            remaining = deadline - time.perf_counter()
+            tx_time = time.perf_counter()
+            comm = group.txPacket()
+            sent = comm == scs.COMM_SUCCESS
+            if sent:
+                timeout_s = max(min(policy.get_timeout(estimator, num_tries), remaining), policy.min_timeout_s)
+                num_bytes = await self.reader.read_into(group.packet.response, timeout_s)
+                comm = group.decodeResponse(num_bytes)
+            num_tries += 1
+
+            if comm == scs.COMM_SUCCESS:
+                estimator.update(time.perf_counter() - tx_time)
+                break
+
+            # After a failed transmit, `group.valid` is still the mask of the previous read
+            motor_failures += ~group.valid if sent else 1
+            if num_tries >= num_retry or time.perf_counter() >= deadline:
+                break
+
+        return comm, num_tries, motor_failures
+
+    async def read(self, data_name, motor_names: str | list[str] | None = None, budget_s: float | None = None):
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"AsyncFeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+
+        start_time = time.perf_counter()
+
+        motor_names, motor_ids, models = self.resolve_motors(motor_names)
+
+        assert_same_address(self.model_ctrl_table, models, data_name)
+        addr, bytes = self.model_ctrl_table[models[0]][data_name]
+        group_key = (data_name, tuple(motor_names))
+
+        async with self.lock:
+            group = self.get_group_reader(scs, group_key, addr, bytes, motor_ids)
+            comm, num_tries, motor_failures = await self.txrx_group(scs, group, bytes, motor_ids, budget_s)
+
+            self.record_failures(data_name, motor_names, comm == scs.COMM_SUCCESS, num_tries, motor_failures)
+
+            if comm != scs.COMM_SUCCESS:
+                raise ConnectionError(
+                    f"Read failed due to communication error on port {self.port} for group_key {get_group_sync_key(data_name, motor_names)} "
+                    f"after {num_tries} tries in {time.perf_counter() - start_time:.4f}s: "
+                    f"{self.packet_handler.getTxRxResult(comm)}"
+                )
+
+            return self.decode_read(
+                group, data_name, motor_names, motor_ids, addr, bytes, start_time, num_tries - 1, group_key
+            )
+
+    async def read_state(
+        self, motor_names: str | list[str] | None = None, budget_s: float | None = None
+    ) -> np.ndarray:
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"AsyncFeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+
+        start_time = time.perf_counter()
+
+        motor_names, motor_ids, models = self.resolve_motors(motor_names)
+
+        for data_name in STATE_DATA_NAMES:
+            assert_same_address(self.model_ctrl_table, models, data_name)
+        ctrl_table = self.model_ctrl_table[models[0]]
+        addr, bytes = get_block_address(ctrl_table, STATE_DATA_NAMES)
+        group_key = (tuple(STATE_DATA_NAMES), tuple(motor_names))
+
+        async with self.lock:
+            group = self.get_group_reader(scs, group_key, addr, bytes, motor_ids)
+            comm, num_tries, motor_failures = await self.txrx_group(scs, group, bytes, motor_ids, budget_s)
+
+            self.record_failures("State", motor_names, comm == scs.COMM_SUCCESS, num_tries, motor_failures)
+
+            if comm != scs.COMM_SUCCESS:
+                raise ConnectionError(
+                    f"Read failed due to communication error on port {self.port} for group_key {get_group_sync_key('State', motor_names)} "
+                    f"after {num_tries} tries in {time.perf_counter() - start_time:.4f}s: "
+                    f"{self.packet_handler.getTxRxResult(comm)}"
+                )
+
+            return self.decode_read_state(
+                group, motor_names, motor_ids, addr, ctrl_table, start_time, num_tries - 1, group_key
+            )
+
+    async def read_partial(
+        self, data_name, motor_names: str | list[str] | None = None, budget_s: float | None = None
+    ) -> PartialRead:
+        """Same as `FeetechMotorsBus.read_partial`, waiting for the replies with the event loop."""
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"AsyncFeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+
+        start_time = time.perf_counter()
+        budget_s = self.retry_policy.budget_s if budget_s is None else budget_s
+
+        motor_names, motor_ids, models = self.resolve_motors(motor_names)
+
+        assert_same_address(self.model_ctrl_table, models, data_name)
+        addr, bytes = self.model_ctrl_table[models[0]][data_name]
+        group_key = (data_name, tuple(motor_names))
+
+        async with self.lock:
+            group = self.get_group_reader(scs, group_key, addr, bytes, motor_ids)
+            comm, num_tries, motor_failures = await self.txrx_group(scs, group, bytes, motor_ids, budget_s, num_retry=1)
+            self.record_failures(data_name, motor_names, comm == scs.COMM_SUCCESS, num_tries, motor_failures)
+            partial = self.update_partial_read(group, comm, data_name, motor_names, motor_ids, addr, bytes, group_key)
+
+        await self.retry_partial_read(partial, start_time + budget_s)
+        return partial
+
+    async def read_state_partial(
+        self, motor_names: str | list[str] | None = None, budget_s: float | None = None
+    ) -> PartialRead:
+        """Same as `FeetechMotorsBus.read_state_partial`, waiting for the replies with the event loop."""
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                f"AsyncFeetechMotorsBus({self.port}) is not connected. You need to run `motors_bus.connect()`."
+            )
+
+        start_time = time.perf_counter()
+        budget_s = self.retry_policy.budget_s if budget_s is None else budget_s
+
+        motor_names, motor_ids, models = self.resolve_motors(motor_names)
+
+        for data_name in STATE_DATA_NAMES:
+            assert_same_address(self.model_ctrl_table, models, data_name)
+        ctrl_table = self.model_ctrl_table[models[0]]
+        addr, bytes = get_block_address(ctrl_table, STATE_DATA_NAMES)
+        group_key = (tuple(STATE_DATA_NAMES), tuple(motor_names))
+
+        async with self.lock:
+            group = self.get_group_reader(scs, group_key, addr, bytes, motor_ids)
+            comm, num_tries, motor_failures = await self.txrx_group(scs, group, bytes, motor_ids, budget_s, num_retry=1)
+            self.record_failures("State", motor_names, comm == scs.COMM_SUCCESS, num_tries, motor_failures)
+            partial = self.update_partial_read_state(group, comm, motor_names, motor_ids, addr, ctrl_table, group_key)
+
+        await self.retry_partial_read(partial, start_time + budget_s)
+        return partial
+
+    async def retry_partial_read(self, partial: PartialRead, deadline: float):
+        """Same as `FeetechMotorsBus.retry_partial_read`, awaiting the reads of the invalid motors."""
+        stale = np.flatnonzero(~partial.valid)
+        for num_done, i in enumerate(stale):
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+
+            budget_s = remaining / (len(stale) - num_done)
+            name = partial.motor_names[i]
+            try:
+                if partial.data_name == "State":
+                    value = (await self.read_state(name, budget_s=budget_s))[0]
+                else:
+                    value = (await self.read(partial.data_name, name, budget_s=budget_s))[0]
+            except ConnectionError:
+                continue
+            partial.update_motor(i, value, time.perf_counter())
+
+    async def retry_stale_motors(self, budget_s: float):
+        """Same as `FeetechMotorsBus.retry_stale_motors`, awaiting the reads of the stale motors."""
+        deadline = time.perf_counter() + budget_s
+        for partial in list(self.partial_reads.values()):
+            if time.perf_counter() >= deadline:
+                break
+            if not partial.valid.all():
+                await self.retry_partial_read(partial, deadline)
+
+    async def apply_shared_commands(self, data_name: str = "Goal_Position") -> bool:
+        """Same as `FeetechMotorsBus.apply_shared_commands`, awaiting the write of the goals."""
+        shared_goals = self.pop_shared_goals()
+        if shared_goals is None:
+            return False
+        await self.write(data_name, *shared_goals)
+        return True
+
+    async def write(
+        self,
+        data_name,
+        values: int | float | np.ndarray,
+        motor_names: str | list[str] | None = None,
+        budget_s: float | None = None,
+    ):
+        # The motors do not reply to sync writes, but a write may still block: on a full output buffer, and while
+        # retrying for up to the budget of `self.retry_policy`. It runs on a worker thread to keep the event loop
+        # free, still serialized with the other transactions of the bus by the lock.
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            await loop.run_in_executor(None, super().write, data_name, values, motor_names, budget_s)
@@ -0,0 +1,189 @@
+"""Microbenchmarks of the pure Python functions of `FeetechMotorsBus` called on every tick, which never touch the wire.
+
+Each function is timed for 6, 12 and 48 motors, with and without calibration, on a bus which is not connected. The
+time of a call is the best of several repeats of many calls, in nanoseconds, which is the least sensitive to the
+noise of the machine. The functions slower than the baseline are timed again before being reported as regressions,
+since a single run can be slowed down by another process.
+
+Results are compared against the baseline committed in `microbenchmark_baseline.json`, and the command fails if a
+function got slower than the baseline by more than `--threshold`. The baseline is only meaningful on the machine it
+was measured on: after an intended change of performance, or on a new reference machine, run with
+`--update-baseline`.
+
+Example of usage:
+```bash
+python -m max_v1.motors.microbenchmark
+python -m max_v1.motors.microbenchmark --update-baseline
+```
+"""
+
+import argparse
+import json
+import platform
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+from max_v1.motors.feetech import (
+    FeetechMotorsBus,
+    FeetechMotorsBusConfig,
+    assert_same_address,
+    convert_to_bytes,
+    get_group_sync_key,
+    get_log_name,
+    pack_registers,
+)
+
+BASELINE_PATH = Path(__file__).parent / "microbenchmark_baseline.json"
+
+MOTOR_COUNTS = [6, 12, 48]
+
+# Results slower than the baseline by more than this fraction are regressions
+DEFAULT_THRESHOLD = 0.25
+
+# Each repeat runs the function for about this long
+REPEAT_S = 0.01
+NUM_REPEATS = 7
+
+
+def make_bus(num_motors: int, calibrated: bool) -> FeetechMotorsBus:
+    motors = {f"motor_{i}": (i, "sts3215") for i in range(1, num_motors + 1)}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port="/dev/null", motors=motors))
+    if calibrated:
+        motors_bus.set_calibration(
+            {
+                "homing_offset": [-2048] * num_motors,
+                "drive_mode": [0] * num_motors,
+                "start_pos": [0] * num_motors,
+                "end_pos": [0] * num_motors,
+                "calib_mode": ["DEGREE"] * num_motors,
+                "motor_names": motors_bus.motor_names,
+            }
+        )
+    return motors_bus
+
+
+def get_cases(motors_bus: FeetechMotorsBus) -> dict:
+    """Functions to time on `motors_bus`, by name."""
+    motor_names = motors_bus.motor_names
+    positions = np.full(len(motor_names), 3072, dtype=np.int32)
+
+    cases = {
+        "avoid_rotation_reset": lambda: motors_bus.avoid_rotation_reset(positions, None, "Present_Position"),
+        "get_group_sync_key": lambda: get_group_sync_key("Present_Position", motor_names),
+        "get_log_name": lambda: get_log_name("timestamp_utc", "read", "Present_Position", motor_names),
+        "assert_same_address": lambda: assert_same_address(
+            motors_bus.model_ctrl_table, motors_bus.motor_models, "Present_Position"
+        ),
+        "motor_names": lambda: motors_bus.motor_names,
+        "motor_models": lambda: motors_bus.motor_models,
+        "motor_indices": lambda: motors_bus.motor_indices,
+        # Packing of the values of a sync write, one motor at a time like the scservo_sdk backend
+        "pack_registers": lambda: [pack_registers([value], [2], native=True) for value in positions.tolist()],
+        # Through the bundled mock of scservo_sdk, which has the same byte helpers, so that it is always benchmarked
+        "convert_to_bytes": lambda: [convert_to_bytes(value, 2, mock=True) for value in positions.tolist()],
+    }
+
+    if motors_bus.calibration is not None:
+        calibrated = motors_bus.apply_calibration(positions, None)
+        cases["apply_calibration"] = lambda: motors_bus.apply_calibration(positions, None)
+        cases["revert_calibration"] = lambda: motors_bus.revert_calibration(calibrated, None)
+        cases["autocorrect_calibration"] = lambda: motors_bus.autocorrect_calibration(positions, None)
+    return cases
+
+
+def time_call(fn) -> float:
+    """Best time of a call of `fn` over `NUM_REPEATS` repeats, in nanoseconds."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while (duration := timer.timeit(number)) < REPEAT_S / 10:
+        number *= 10
+    number = max(1, int(number * REPEAT_S / duration))
+    return min(timer.repeat(repeat=NUM_REPEATS, number=number)) / number * 1e9
+
+
+def get_result_key(name: str, num_motors: int, calibrated: bool) -> str:
+    return f"{name}/{num_motors}/{'calibrated' if calibrated else 'raw'}"
+
+
+def run_microbenchmarks(motor_counts=MOTOR_COUNTS, keys=None) -> dict[str, float]:
+    """Time of a call of each function in nanoseconds, by `name/num_motors/calibrated|raw`. If given, only the
+    results of `keys` are measured."""
+    results = {}
+    for num_motors in motor_counts:
+        for calibrated in [False, True]:
+            motors_bus = make_bus(num_motors, calibrated)
+            for name, fn in get_cases(motors_bus).items():
+                key = get_result_key(name, num_motors, calibrated)
+                if keys is None or key in keys:
+                    results[key] = time_call(fn)
+    return results
+
+
+def get_regressions(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[str]:
+    return [key for key, time_ns in results.items() if key in baseline and time_ns / baseline[key] - 1 > threshold]
+
+
+def confirm_regressions(
+    results: dict[str, float], baseline: dict[str, float], threshold: float, num_retries: int = 2
+) -> dict[str, float]:
+    """Time again the functions slower than the baseline, keeping the best time of each."""
+    motor_counts = sorted({int(key.split("/")[1]) for key in results})
+    for _ in range(num_retries):
+        regressions = get_regressions(results, baseline, threshold)
+        if not regressions:
+            break
+        for key, time_ns in run_microbenchmarks(motor_counts, set(regressions)).items():
+            results[key] = min(results[key], time_ns)
+    return results
+
+
+def compare_results(results: dict[str, float], baseline: dict[str, float], threshold: float = DEFAULT_THRESHOLD):
+    """Print the change of time of each result present in `baseline`. Returns the descriptions of the regressions."""
+    regressions = []
+    for key, time_ns in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        change = time_ns / reference - 1
+        description = f"{key}: {reference:.0f} -> {time_ns:.0f} ns ({change:+.1%})"
+        print(description)
+        if change > threshold:
+            regressions.append(description)
+    return regressions
+
+
+def save_results(path, results: dict[str, float]):
+    report = {
+        "meta": {"platform": platform.platform(), "python": platform.python_version(), "numpy": np.__version__},
+        "results_ns": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+
+
+def load_results(path) -> dict[str, float]:
+    with open(path) as f:
+        return json.load(f)["results_ns"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--motors", type=int, nargs="+", default=MOTOR_COUNTS, help="Numbers of motors")
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH, help="JSON baseline to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Tolerated slowdown")
+    parser.add_argument("--update-baseline", action="store_true", help="Save the results as the new baseline")
+    args = parser.parse_args()
+
+    results = run_microbenchmarks(args.motors)
+    if args.update_baseline:
+        save_results(args.baseline, results)
+        print(f"Baseline of {len(results)} results saved to '{args.baseline}'")
+    else:
+        baseline = load_results(args.baseline)
+        results = confirm_regressions(results, baseline, args.threshold)
+        regressions = compare_results(results, baseline, args.threshold)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} regression(s) above {args.threshold:.0%}:\n" + "\n".join(regressions))
@@ -0,0 +1,201 @@
+"""
+This script provisions all the Feetech servos of the robot in one pass, following the layout of `servo_config.json`
+(IDs of the front and rear buses, and their baud rate).
+
+Servos which are not found yet at their target ID and baud rate are added to the bus one at a time: plug the next
+servo into the daisy chain (the servos already provisioned stay connected), press Enter, and it is found with a
+broadcast ping over all the baud rates and given its ID and baud rate. Servos which already have their ID, e.g. when
+re-provisioning a robot or when using a jig where they are all connected at once, are moved to the target baud rate
+with one sync write per baud rate. Then all the servos of the bus are configured with sync writes and verified with
+sync reads, and centered at once.
+
+On a new robot, start with no servo connected: factory servos all have the ID 1, so a single one already connected
+would be taken for the servo of ID 1.
+
+Example of usage:
+```bash
+python max_v1/motors/provision_robot.py --bus front
+```
+"""
+
+import argparse
+import json
+import time
+
+from max_v1.motors.configs import FeetechMotorsBusConfig
+from max_v1.motors.feetech import SCS_SERIES_BAUDRATE_TABLE, FeetechMotorsBus
+from max_v1.motors.quadruped_bus import BUS_NAMES, SERVO_CONFIG_PATH, get_motor_name
+
+# Registers written to every servo once it has its ID, and read back to verify them. Maximum_Acceleration is set to
+# 254 to speed up acceleration and deceleration of the motors, like in `configure_motor.py`.
+SETTINGS = {
+    "Offset": 0,
+    "Maximum_Acceleration": 254,
+}
+
+CENTER_POSITION = 2048
+CENTER_TIMEOUT_S = 5
+
+
+def load_layout(config_path: str) -> dict[str, tuple[str | None, list[int], int]]:
+    """Port, servo IDs and baud rate of each bus of `servo_config.json`."""
+    with open(config_path) as f:
+        servo_config = json.load(f)
+
+    return {
+        bus_name: (
+            servo_config.get(f"{bus_name}_servo_port"),
+            servo_config[f"{bus_name}_servo_ids"],
+            servo_config.get("baudrate", SCS_SERIES_BAUDRATE_TABLE[0]),
+        )
+        for bus_name in BUS_NAMES
+    }
+
+
+def get_baudrate_index(baudrate: int) -> int:
+    return list(SCS_SERIES_BAUDRATE_TABLE.values()).index(baudrate)
+
+
+def move_to_baudrate(motor_bus, motor_ids, baudrate, target_baudrate):
+    """Set the Baud_Rate register of `motor_ids`, currently at `baudrate`, with a single sync write."""
+    models = [motor_bus.motor_models[0]] * len(motor_ids)
+    motor_bus.set_bus_baudrate(baudrate)
+    motor_bus.write_with_motor_ids(models, motor_ids, "Lock", [0] * len(motor_ids))
+    motor_bus.write_with_motor_ids(
+        models, motor_ids, "Baud_Rate", [get_baudrate_index(target_baudrate)] * len(motor_ids)
+    )
+    motor_bus.set_bus_baudrate(target_baudrate)
+
+
+def assign_id(motor_bus, motor, target_id, target_baudrate):
+    """Give its target ID and baud rate to the newly connected `motor`, a `DiscoveredMotor`."""
+    models = motor_bus.motor_models[:1]
+    motor_bus.set_bus_baudrate(motor.baudrate)
+    motor_bus.write_with_motor_ids(models, motor.id, "Lock", 0)
+    if motor.id != target_id:
+        motor_bus.write_with_motor_ids(models, motor.id, "ID", target_id)
+    if motor.baudrate != target_baudrate:
+        # The baud rate comes last, since the servo stops answering at the current baud rate afterwards
+        motor_bus.write_with_motor_ids(models, target_id, "Baud_Rate", get_baudrate_index(target_baudrate))
+    motor_bus.set_bus_baudrate(target_baudrate)
+
+
+def add_servos_one_by_one(motor_bus, missing_ids, provisioned_ids, target_baudrate):
+    """Ask to plug the servos of `missing_ids` one at a time, and provision each of them as it appears."""
+    provisioned_ids = set(provisioned_ids)
+    # Factory servos have the ID 1, so the target ID 1 is assigned last to never have two servos with the ID 1
+    # on the bus at the same time.
+    for target_id in sorted(missing_ids, reverse=True):
+        input(f"Connect the servo for ID {target_id} to the bus, then press Enter...")
+
+        inventory = motor_bus.scan_baudrates()
+        new_motors = [
+            motor
+            for motor in inventory
+            if not (motor.baudrate == target_baudrate and motor.id in provisioned_ids)
+        ]
+        if len(new_motors) != 1:
+            raise ValueError(
+                f"Expected exactly one new servo on the bus, but found {len(new_motors)}: {new_motors}. "
+                "Make sure that only one servo was added."
+            )
+
+        motor = new_motors[0]
+        print(f"Found servo ID {motor.id} at {motor.baudrate} baud, model {motor.model or motor.model_number}")
+        assign_id(motor_bus, motor, target_id, target_baudrate)
+        provisioned_ids.add(target_id)
+        print(f"Servo set to ID {target_id} at {target_baudrate} baud")
+
+
+def configure_and_verify(motor_bus, target_ids, target_baudrate):
+    """Write `SETTINGS` to all the servos with one sync write per register, then read back the IDs, baud rates and
+    settings with one sync read per register."""
+    models = [motor_bus.motor_models[0]] * len(target_ids)
+    motor_bus.write_with_motor_ids(models, target_ids, "Lock", [0] * len(target_ids))
+    for data_name, value in SETTINGS.items():
+        motor_bus.write_with_motor_ids(models, target_ids, data_name, [value] * len(target_ids))
+
+    expected = {"ID": target_ids, "Baud_Rate": [get_baudrate_index(target_baudrate)] * len(target_ids)}
+    expected.update({data_name: [value] * len(target_ids) for data_name, value in SETTINGS.items()})
+
+    errors = []
+    for data_name, expected_values in expected.items():
+        values = motor_bus.read_with_motor_ids(models, target_ids, data_name)
+        for motor_id, value, expected_value in zip(target_ids, values, expected_values, strict=True):
+            if value != expected_value:
+                errors.append(f"servo {motor_id}: {data_name}={value} instead of {expected_value}")
+
+    if errors:
+        raise OSError("Provisioning could not be verified:\n" + "\n".join(errors))
+
+
+def center_servos(motor_bus, timeout_s=CENTER_TIMEOUT_S):
+    """Move all the servos to the middle of their range at once, and wait until they stopped."""
+    motor_bus.write("Goal_Position", CENTER_POSITION)
+    deadline = time.perf_counter() + timeout_s
+    while time.perf_counter() < deadline:
+        time.sleep(0.05)
+        if not motor_bus.read("Moving").any():
+            return
+    print(f"Warning: some servos are still moving after {timeout_s}s: {motor_bus.read('Moving')}")
+
+
+def provision_bus(port, target_ids, target_baudrate, model="sts3215", backend="scservo_sdk"):
+    motors = {get_motor_name(motor_id): (motor_id, model) for motor_id in target_ids}
+    config = FeetechMotorsBusConfig(port=port, motors=motors, backend=backend)
+    motor_bus = FeetechMotorsBus(config=config)
+    motor_bus.connect()
+    print(f"Connected on port {motor_bus.port}")
+
+    try:
+        start = time.perf_counter()
+
+        # Servos which already have their target ID, possibly at another baud rate
+        inventory = motor_bus.scan_baudrates(expected_ids=target_ids)
+        found_by_baudrate = {}
+        for motor in inventory:
+            if motor.id in target_ids:
+                found_by_baudrate.setdefault(motor.baudrate, []).append(motor.id)
+        for baudrate, motor_ids in found_by_baudrate.items():
+            if baudrate != target_baudrate:
+                print(f"Moving servos {motor_ids} from {baudrate} to {target_baudrate} baud")
+                move_to_baudrate(motor_bus, motor_ids, baudrate, target_baudrate)
+        motor_bus.set_bus_baudrate(target_baudrate)
+
+        found_ids = {motor_id for motor_ids in found_by_baudrate.values() for motor_id in motor_ids}
+        missing_ids = [motor_id for motor_id in target_ids if motor_id not in found_ids]
+        if found_ids:
+            print(f"Servos already provisioned: {sorted(found_ids)}")
+        if missing_ids:
+            add_servos_one_by_one(motor_bus, missing_ids, found_ids, target_baudrate)
+
+        configure_and_verify(motor_bus, target_ids, target_baudrate)
+        center_servos(motor_bus)
+        print(f"Provisioned servos {target_ids} in {time.perf_counter() - start:.1f}s")
+    finally:
+        motor_bus.disconnect()
+        print("Disconnected from motor bus.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", type=str, default=SERVO_CONFIG_PATH, help="Path to servo_config.json")
+    parser.add_argument(
+        "--bus", type=str, nargs="+", default=BUS_NAMES, choices=BUS_NAMES, help="Buses to provision"
+    )
+    parser.add_argument("--port", type=str, default=None, help="Override the port of the bus from the config")
+    parser.add_argument("--model", type=str, default="sts3215", help="Motor model (e.g. sts3215)")
+    parser.add_argument("--backend", type=str, default="scservo_sdk", help="Bus backend (scservo_sdk or native)")
+    args = parser.parse_args()
+
+    layout = load_layout(args.config)
+    for bus_name in args.bus:
+        port, target_ids, target_baudrate = layout[bus_name]
+        port = args.port or port
+        if port is None:
+            raise ValueError(
+                f"No port configured for the {bus_name} servo bus in '{args.config}'. "
+                "Run `python max_v1/motors/servo_config.py` to detect it, or pass `--port`."
+            )
+        print(f"=== Provisioning the {bus_name} servo bus ===")
+        provision_bus(port, target_ids, target_baudrate, args.model, args.backend)
@@ -0,0 +1,267 @@
+"""Front and rear servo buses of the robot driven together behind one 12-joint interface.
+
+The front (IDs 1-6) and rear (IDs 7-12) servos are on two independent buses, as described by `servo_config.json`
+(see `servo_config.py` to detect the ports). `QuadrupedBus` issues every read and write to both buses
+concurrently, each on its own dedicated I/O thread, so that a full-body transaction takes about one bus round trip
+instead of two.
+
+A write to both buses still lands on the rear motors up to a bus transaction after the front ones. For motions which
+must start on all the legs at once, `write_synchronized` pre-loads the goals on both buses with REG_WRITE, then
+commits them by sending the broadcast ACTION to both ports back to back, and keeps the front/rear commit skew.
+
+Example of usage:
+```python
+quadruped = QuadrupedBus()
+quadruped.connect()
+
+state = quadruped.read_state()
+print(state["Present_Position"], state["timestamp"])
+quadruped.write("Goal_Position", state["Present_Position"] + 10)
+skew_s = quadruped.write_synchronized("Goal_Position", state["Present_Position"])
+print(quadruped.get_commit_stats())
+
+quadruped.disconnect()
+```
+"""
+
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from max_v1.motors.feetech import (
+    FeetechMotorsBus,
+    FeetechMotorsBusConfig,
+    RobotDeviceAlreadyConnectedError,
+    RobotDeviceNotConnectedError,
+)
+
+SERVO_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "servo_config.json")
+
+BUS_NAMES = ["front", "rear"]
+
+# Number of the last commit skews kept for `get_commit_stats`
+COMMIT_STATS_WINDOW = 1000
+
+
+def get_motor_name(motor_id: int) -> str:
+    return f"servo_{motor_id}"
+
+
+class QuadrupedBus:
+    """One `FeetechMotorsBus` per bus of `servo_config.json`, each with a dedicated I/O thread.
+
+    Values are exchanged as 12-element arrays ordered like `motor_names`: front servos first, then rear servos.
+    `read_state` adds a "timestamp" field holding, for each motor, the `time.monotonic()` at which the state of
+    its bus was received. The timestamps of the last transaction of each bus are also kept in `self.timestamps`.
+    """
+
+    def __init__(
+        self,
+        config_path: str = SERVO_CONFIG_PATH,
+        motor_model: str = "sts3215",
+        backend: str = "scservo_sdk",
+        mock: bool = False,
+    ):
+        with open(config_path) as f:
+            servo_config = json.load(f)
+
+        self.buses = {}
+        for bus_name in BUS_NAMES:
+            port = servo_config.get(f"{bus_name}_servo_port")
+            if port is None:
+                raise ValueError(
+                    f"No port configured for the {bus_name} servo bus in '{config_path}'. "
+                    "Run `python max_v1/motors/servo_config.py` to detect it."
+                )
+            motors = {
+                get_motor_name(motor_id): (motor_id, motor_model)
+                for motor_id in servo_config[f"{bus_name}_servo_ids"]
+            }
+            config = FeetechMotorsBusConfig(port=port, motors=motors, mock=mock, backend=backend)
+            self.buses[bus_name] = FeetechMotorsBus(config)
+
+        self.baudrate = servo_config.get("baudrate")
+        self.executors = {}
+        self.timestamps = np.zeros(len(self.buses))
+        self.commit_skews_s = deque(maxlen=COMMIT_STATS_WINDOW)
+        self.is_connected = False
+
+        # Position of the motors of each bus in the 12-element arrays
+        self.bus_slices = {}
+        start = 0
+        for bus_name, bus in self.buses.items():
+            self.bus_slices[bus_name] = slice(start, start + len(bus.motors))
+            start += len(bus.motors)
+
+    @property
+    def motor_names(self) -> list[str]:
+        return [name for bus in self.buses.values() for name in bus.motor_names]
+
+    @property
+    def motor_indices(self) -> list[int]:
+        return [idx for bus in self.buses.values() for idx in bus.motor_indices]
+
+    def connect(self):
+        if self.is_connected:
+            raise RobotDeviceAlreadyConnectedError(
+                "QuadrupedBus is already connected. Do not call `quadruped.connect()` twice."
+            )
+
+        try:
+            for bus_name, bus in self.buses.items():
+                bus.connect()
+                self.executors[bus_name] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{bus_name}_bus")
+                if self.baudrate is not None:
+                    bus.set_bus_baudrate(self.baudrate)
+        except Exception:
+            # Do not leave the buses opened before the failure connected
+            self.release_buses()
+            raise
+
+        self.is_connected = True
+
+    def set_calibration(self, calibration: dict[str, list]):
+        # Each bus only compiles the calibration of its own motors
+        for bus in self.buses.values():
+            bus.set_calibration(calibration)
+
+    def run_on_buses(self, fn, *args) -> dict:
+        """Run `fn(bus_name, bus, *args)` on every bus concurrently, and return the results by bus name."""
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                "QuadrupedBus is not connected. You need to run `quadruped.connect()`."
+            )
+
+        futures = {
+            bus_name: self.executors[bus_name].submit(fn, bus_name, bus, *args)
+            for bus_name, bus in self.buses.items()
+        }
+        return {bus_name: future.result() for bus_name, future in futures.items()}
+
+    def _read(self, bus_name, bus, data_name):
+        values = bus.read(data_name)
+        return values, time.monotonic()
+
+    def _read_state(self, bus_name, bus):
+        state = bus.read_state()
+        return state, time.monotonic()
+
+    def _write(self, bus_name, bus, data_name, values):
+        if isinstance(values, np.ndarray):
+            values = values[self.bus_slices[bus_name]]
+        bus.write(data_name, values)
+
+    def _stage_write(self, bus_name, bus, data_name, values):
+        if isinstance(values, np.ndarray):
+            values = values[self.bus_slices[bus_name]]
+        bus.stage_write(data_name, values)
+
+    def read(self, data_name) -> np.ndarray:
+        results = self.run_on_buses(self._read, data_name)
+        for i, (_, timestamp) in enumerate(results.values()):
+            self.timestamps[i] = timestamp
+        return np.concatenate([values for values, _ in results.values()])
+
+    def read_state(self) -> np.ndarray:
+        results = self.run_on_buses(self._read_state)
+
+        bus_dtype = next(iter(results.values()))[0].dtype
+        dtype = np.dtype(bus_dtype.descr + [("timestamp", np.float64)])
+        state = np.empty(len(self.motor_names), dtype=dtype)
+        for i, (bus_name, (bus_state, timestamp)) in enumerate(results.items()):
+            self.timestamps[i] = timestamp
+            bus_slice = self.bus_slices[bus_name]
+            for name in bus_dtype.names:
+                state[name][bus_slice] = bus_state[name]
+            state["timestamp"][bus_slice] = timestamp
+        return state
+
+    def write(self, data_name, values: int | float | np.ndarray):
+        values = np.asarray(values)
+        if values.ndim == 0:
+            # The same value is written to all the motors
+            values = values.item()
+        self.run_on_buses(self._write, data_name, values)
+
+    def stage_write(self, data_name, values: int | float | np.ndarray):
+        """Pre-load the values on both buses concurrently, without applying them, see `FeetechMotorsBus.stage_write`."""
+        values = np.asarray(values)
+        if values.ndim == 0:
+            values = values.item()
+        self.run_on_buses(self._stage_write, data_name, values)
+
+    def commit(self) -> float:
+        """Apply the staged values on all the motors, by sending the broadcast ACTION to each port back to back from
+        the calling thread. The I/O threads are idle once `stage_write` returned, and handing the packets over from
+        them would add their wake-up latency to the skew.
+
+        Returns the skew between the commits of the buses, i.e. the time between the ACTION packets handed to the
+        ports, also kept for `get_commit_stats`. The USB-serial adapters add their own latency on top of it.
+        """
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                "QuadrupedBus is not connected. You need to run `quadruped.connect()`."
+            )
+        sent = [bus.commit_staged() for bus in self.buses.values()]
+        skew_s = max(sent) - min(sent)
+        self.commit_skews_s.append(skew_s)
+        return skew_s
+
+    def write_synchronized(self, data_name, values: int | float | np.ndarray) -> float:
+        """Write the values so that they are applied by the motors of both buses at the same time. Returns the
+        commit skew, see `commit`."""
+        self.stage_write(data_name, values)
+        return self.commit()
+
+    def get_commit_stats(self) -> dict:
+        """Front/rear skews of the last `COMMIT_STATS_WINDOW` commits, to verify the synchronization on each robot."""
+        skews = np.array(self.commit_skews_s)
+        if len(skews) == 0:
+            return {"count": 0}
+        return {
+            "count": len(skews),
+            "last_s": float(skews[-1]),
+            "mean_s": float(skews.mean()),
+            "p99_s": float(np.percentile(skews, 99)),
+            "max_s": float(skews.max()),
+        }
+
+    def emergency_stop(self) -> float:
+        """Disable the torque of all the motors of both buses, see `FeetechMotorsBus.emergency_stop`. Called from the
+        calling thread rather than the I/O threads of the buses, which may be busy with a transaction. Returns the
+        latency until the packets were sent on all the buses."""
+        start = time.perf_counter()
+        for bus in self.buses.values():
+            bus.emergency_stop()
+        return time.perf_counter() - start
+
+    def clear_emergency_stop(self):
+        for bus in self.buses.values():
+            bus.clear_emergency_stop()
+
+    def disconnect(self):
+        if not self.is_connected:
+            raise RobotDeviceNotConnectedError(
+                "QuadrupedBus is not connected. Try running `quadruped.connect()` first."
+            )
+
+        self.release_buses()
+        self.is_connected = False
+
+    def release_buses(self):
+        """Shut down the I/O threads, and disconnect the buses which are connected."""
+        for executor in self.executors.values():
+            executor.shutdown()
+        self.executors = {}
+
+        for bus in self.buses.values():
+            if bus.is_connected:
+                bus.disconnect()
+
+    def __del__(self):
+        if getattr(self, "is_connected", False):
+            self.disconnect()
@@ -0,0 +1,268 @@
+"""Record and replay of the traffic of a `FeetechMotorsBus`, to reproduce field issues and compare performance offline.
+
+`BusRecorder` appends every packet sent and every chunk of bytes received on the port of the bus to a compact binary
+log. Records are queued on the calling thread and written to the file by a background thread, so that recording can
+stay enabled in the control loop. The log starts with a header, followed by records laid out little-endian as:
+```
+header: b"FTRC" VERSION (uint16)
+record: KIND (uint8) TRANSACTION_ID (uint32) TIMESTAMP_NS (int64) LENGTH (uint16) PAYLOAD
+```
+where the timestamp is monotonic and relative to the start of the recording, `KIND` is one of `TX`, `RX` or `BAUD`
+(payload: the new baud rate as uint32), and each sent packet starts a new transaction: received bytes belong to the
+transaction of the last sent packet.
+
+`ReplayTransport` serves the port "replay://path" of the native backend: each packet sent by the bus consumes the
+next recorded transaction, and its recorded responses are received either with their recorded delays (`speed=1`, by
+default, or faster with e.g. `speed=2`) or as fast as possible (`speed=0`). Sent packets which differ from the
+recording are counted in `mismatches`, or raise a `ReplayMismatchError` with `strict=1`.
+
+Example of usage:
+```python
+config = FeetechMotorsBusConfig(port="/dev/ttyACM0", motors=motors, backend="native", record_path="field.ftrc")
+motors_bus = FeetechMotorsBus(config)
+motors_bus.connect()  # or `motors_bus.start_recording("field.ftrc")` once connected
+...
+config = FeetechMotorsBusConfig(port="replay://field.ftrc?speed=0", motors=motors, backend="native")
+```
+
+Or from the command line, to print a log:
+```bash
+python -m max_v1.motors.recording field.ftrc
+```
+"""
+
+import argparse
+import queue
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import parse_qs
+
+from max_v1.motors.transport import SocketTransport
+
+MAGIC = b"FTRC"
+VERSION = 1
+HEADER = struct.Struct("<4sH")
+RECORD = struct.Struct("<BIqH")
+
+TX = 0
+RX = 1
+BAUD = 2
+KIND_NAMES = {TX: "tx", RX: "rx", BAUD: "baud"}
+
+
+class ReplayMismatchError(Exception):
+    """A packet sent during a strict replay differs from the recorded one."""
+
+
+class BusRecorder:
+    """Binary log of the traffic of a bus, written by a background thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION))
+        self.start_ns = time.monotonic_ns()
+        self.transaction_id = 0
+        self.num_records = 0
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.write_records, name="BusRecorder", daemon=True)
+        self.thread.start()
+
+    def record(self, kind: int, payload):
+        if kind == TX:
+            self.transaction_id += 1
+        # Copy the payload, since packet buffers are reused by the codec
+        self.queue.put((kind, self.transaction_id, time.monotonic_ns() - self.start_ns, bytes(payload)))
+        self.num_records += 1
+
+    def record_baudrate(self, baudrate: int):
+        self.record(BAUD, struct.pack("<I", baudrate))
+
+    def write_records(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            kind, transaction_id, timestamp_ns, payload = item
+            self.file.write(RECORD.pack(kind, transaction_id, timestamp_ns, len(payload)))
+            self.file.write(payload)
+            if self.queue.empty():
+                # Keep the log usable if the process dies, without a system call per record
+                self.file.flush()
+        self.file.close()
+
+    def close(self):
+        """Write the queued records and close the log."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+
+@dataclass
+class Record:
+    kind: int
+    transaction_id: int
+    timestamp_ns: int
+    payload: bytes
+
+    def __str__(self):
+        kind = KIND_NAMES[self.kind]
+        return f"{self.timestamp_ns / 1e6:10.3f} ms #{self.transaction_id:<6} {kind:>4} {self.payload.hex(' ')}"
+
+
+def read_recording(path: str) -> list[Record]:
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"'{path}' is not a bus recording of version {VERSION}.")
+
+    records = []
+    pos = HEADER.size
+    # A log cut by a crash may end with a truncated record, which is ignored
+    while pos + RECORD.size <= len(data):
+        kind, transaction_id, timestamp_ns, length = RECORD.unpack_from(data, pos)
+        pos += RECORD.size
+        if pos + length > len(data):
+            break
+        records.append(Record(kind, transaction_id, timestamp_ns, data[pos : pos + length]))
+        pos += length
+    return records
+
+
+class RecordingTransport:
+    """Port of a bus recording what goes through it in a `BusRecorder`."""
+
+    def __init__(self, ser, recorder: BusRecorder):
+        self.ser = ser
+        self.recorder = recorder
+        recorder.record_baudrate(ser.baudrate)
+
+    @property
+    def baudrate(self) -> int:
+        return self.ser.baudrate
+
+    @baudrate.setter
+    def baudrate(self, baudrate: int):
+        self.ser.baudrate = baudrate
+        self.recorder.record_baudrate(baudrate)
+
+    def write(self, data):
+        self.recorder.record(TX, data)
+        return self.ser.write(data)
+
+    def read(self, size=1):
+        data = self.ser.read(size)
+        if data:
+            self.recorder.record(RX, data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.ser, name)
+
+
+@dataclass
+class Transaction:
+    timestamp_ns: int
+    request: bytes
+    # (delay after the request in ns, bytes received)
+    responses: list[tuple[int, bytes]] = field(default_factory=list)
+
+
+def get_transactions(records: list[Record]) -> list[Transaction]:
+    transactions = {}
+    for record in records:
+        if record.kind == TX:
+            transactions[record.transaction_id] = Transaction(record.timestamp_ns, record.payload)
+        elif record.kind == RX and record.transaction_id in transactions:
+            transaction = transactions[record.transaction_id]
+            transaction.responses.append((record.timestamp_ns - transaction.timestamp_ns, record.payload))
+    return list(transactions.values())
+
+
+class ReplayTransport(SocketTransport):
+    """Port serving the responses of a recording, see the module docstring. The address is the path of the log,
+    optionally followed by `?speed=...&strict=...`."""
+
+    def __init__(self, address: str, baudrate: int):
+        path, _, query = address.partition("?")
+        options = {key: values[-1] for key, values in parse_qs(query).items()}
+        self.speed = float(options.get("speed", 1.0))
+        self.strict = options.get("strict", "0") not in ("0", "false")
+
+        self.transactions = get_transactions(read_recording(path))
+        self.next_transaction = 0
+        self.mismatches = []
+
+        sock, self.device_sock = socket.socketpair()
+        super().__init__(path, baudrate, sock=sock)
+        # Responses to deliver with their recorded delays: (monotonic due time, bytes)
+        self.scheduled = queue.SimpleQueue()
+        self.thread = None
+        if self.speed > 0:
+            self.thread = threading.Thread(target=self.deliver_responses, name="ReplayTransport", daemon=True)
+            self.thread.start()
+
+    def write(self, data) -> int:
+        if self.next_transaction >= len(self.transactions):
+            raise EOFError("End of the recording, no response left to replay.")
+        transaction = self.transactions[self.next_transaction]
+        if bytes(data) != transaction.request:
+            if self.strict:
+                raise ReplayMismatchError(
+                    f"Transaction {self.next_transaction + 1}: sent {bytes(data).hex(' ')}, "
+                    f"recorded {transaction.request.hex(' ')}"
+                )
+            self.mismatches.append(self.next_transaction + 1)
+        self.next_transaction += 1
+
+        if self.speed > 0:
+            now = time.monotonic()
+            for delay_ns, payload in transaction.responses:
+                self.scheduled.put((now + delay_ns / 1e9 / self.speed, payload))
+        else:
+            for _, payload in transaction.responses:
+                self.device_sock.sendall(payload)
+        return len(data)
+
+    def deliver_responses(self):
+        while True:
+            item = self.scheduled.get()
+            if item is None:
+                break
+            due, payload = item
+            remaining = due - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            try:
+                self.device_sock.sendall(payload)
+            except OSError:
+                break
+
+    @property
+    def num_remaining(self) -> int:
+        return len(self.transactions) - self.next_transaction
+
+    def close(self):
+        if self.thread is not None:
+            self.scheduled.put(None)
+            self.thread.join()
+            self.thread = None
+        self.device_sock.close()
+        super().close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", type=str, help="Path of the bus recording")
+    parser.add_argument("--limit", type=int, default=None, help="Number of records to print")
+    args = parser.parse_args()
+
+    records = read_recording(args.path)
+    for record in records[: args.limit]:
+        print(record)
+    num_transactions = len({record.transaction_id for record in records if record.kind == TX})
+    print(f"{len(records)} records, {num_transactions} transactions")
@@ -0,0 +1,133 @@
+"""Time-bounded retries of the transactions of `FeetechMotorsBus`, and failure statistics of its motors.
+
+Every transaction gets a time budget, and each try waits for the motors for a packet timeout derived from the
+round trip times measured on the previous transactions of the same size, the same way TCP derives its
+retransmission timeout (RFC 6298). A missing reply is therefore detected after a few round trips instead of a
+fixed second, and a disconnected motor fails the transaction once the budget is spent instead of stalling the
+robot for `num_retry` full timeouts.
+
+Example of usage:
+```python
+config = FeetechMotorsBusConfig(port=port, motors=motors, retry_policy=RetryPolicy(budget_s=0.004))
+motors_bus = FeetechMotorsBus(config)
+motors_bus.connect()
+
+# The budget of a single transaction can also be given explicitly
+position = motors_bus.read("Present_Position", budget_s=0.002)
+print(motors_bus.failure_stats.summary())
+```
+"""
+
+import numpy as np
+
+
+class RttEstimator:
+    """Smoothed round trip time `srtt` and its mean deviation `rttvar`, in seconds."""
+
+    # Gains of RFC 6298
+    ALPHA = 0.125
+    BETA = 0.25
+
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = 0.0
+
+    def update(self, rtt_s: float):
+        if self.srtt is None:
+            self.srtt = rtt_s
+            self.rttvar = rtt_s / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt_s)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt_s
+
+
+class RetryPolicy:
+    """At most `num_retry` tries within `budget_s` seconds. The packet timeout of a try is
+    `srtt + rtt_margin * rttvar`, or `initial_timeout_s` before any round trip was measured, multiplied by
+    `backoff` after each failed try and clamped to `[min_timeout_s, max_timeout_s]`."""
+
+    def __init__(
+        self,
+        num_retry: int = 20,
+        budget_s: float = 0.25,
+        initial_timeout_s: float = 0.02,
+        min_timeout_s: float = 0.002,
+        max_timeout_s: float = 0.1,
+        rtt_margin: float = 4.0,
+        backoff: float = 2.0,
+    ):
+        self.num_retry = num_retry
+        self.budget_s = budget_s
+        self.initial_timeout_s = initial_timeout_s
+        self.min_timeout_s = min_timeout_s
+        self.max_timeout_s = max_timeout_s
+        self.rtt_margin = rtt_margin
+        self.backoff = backoff
+
+    def get_timeout(self, estimator: RttEstimator, retries: int) -> float:
+        if estimator.srtt is None:
+            timeout = self.initial_timeout_s
+        else:
+            timeout = estimator.srtt + self.rtt_margin * estimator.rttvar
+        timeout *= self.backoff**retries
+        return min(max(timeout, self.min_timeout_s), self.max_timeout_s)
+
+
+class FailureStats:
+    """Counters of the transactions of a bus, per motor and per register.
+
+    For each motor: the transactions it took part in, the tries in which its reply was missing or corrupted, and
+    the current number of consecutive failed tries. For each register: the transactions, the retried tries and the
+    transactions which failed altogether.
+    """
+
+    def __init__(self, motor_names: list[str]):
+        self.motor_names = list(motor_names)
+        num_motors = len(self.motor_names)
+        self.motor_transactions = np.zeros(num_motors, dtype=np.int64)
+        self.motor_failures = np.zeros(num_motors, dtype=np.int64)
+        self.motor_consecutive_failures = np.zeros(num_motors, dtype=np.int64)
+        self.register_transactions = {}
+        self.register_retries = {}
+        self.register_failures = {}
+
+    def record(self, data_name: str, idx, motor_failures: np.ndarray, retries: int, failed: bool):
+        """Record a transaction on `data_name` for the motors at `idx`, given the number of failed tries of each."""
+        self.motor_transactions[idx] += 1
+        self.motor_failures[idx] += motor_failures
+        consecutive = self.motor_consecutive_failures[idx]
+        consecutive += motor_failures
+        consecutive[motor_failures < retries + 1] = 0
+        self.motor_consecutive_failures[idx] = consecutive
+
+        self.register_transactions[data_name] = self.register_transactions.get(data_name, 0) + 1
+        self.register_retries[data_name] = self.register_retries.get(data_name, 0) + retries
+        self.register_failures[data_name] = self.register_failures.get(data_name, 0) + int(failed)
+
+    def summary(self) -> dict:
+        return {
+            "motors": {
+                name: {
+                    "transactions": int(self.motor_transactions[i]),
+                    "failures": int(self.motor_failures[i]),
+                    "consecutive_failures": int(self.motor_consecutive_failures[i]),
+                }
+                for i, name in enumerate(self.motor_names)
+            },
+            "registers": {
+                name: {
+                    "transactions": transactions,
+                    "retries": self.register_retries[name],
+                    "failures": self.register_failures[name],
+                }
+                for name, transactions in self.register_transactions.items()
+            },
+        }
+
+    def reset(self):
+        self.motor_transactions[:] = 0
+        self.motor_failures[:] = 0
+        self.motor_consecutive_failures[:] = 0
+        self.register_transactions.clear()
+        self.register_retries.clear()
+        self.register_failures.clear()
@@ -0,0 +1,247 @@
+"""Scheduler of the transactions of a `FeetechMotorsBus`, mixing control traffic with lower priority polling, e.g.
+positions at 200 Hz for the controller and Present_Temperature at 2 Hz for health monitoring.
+
+Streams are declared with `add_stream`, each reading a register (or the state block of `read_state` with
+`STATE_STREAM`) at a rate, with a priority: 0 for control streams, higher values for less urgent ones. Each tick of
+the control loop is split in two phases:
+- `poll_control` reads the control streams due on the tick, without ever delaying them,
+- `poll_background` reads the other due streams, by priority, in the slack of the tick: within the byte budget of a
+  tick left by the control reads and `write`s, and within the idle time before the next tick if given.
+
+The byte budget of a tick is the number of bytes the line carries in one tick at the baud rate of the port, times
+`max_utilization`, which leaves room for the turnaround of the servos and the latency of the USB-serial adapter.
+Background streams which do not fit are deferred to the next ticks, and reported in `get_utilization`.
+
+Example of usage:
+```python
+scheduler = BusScheduler(motors_bus, tick_hz=200)
+scheduler.add_stream("state", STATE_STREAM, rate_hz=200)
+scheduler.add_stream("temperature", "Present_Temperature", rate_hz=2, priority=1)
+scheduler.add_stream("voltage", "Present_Voltage", rate_hz=1, priority=2)
+
+loop = ControlLoop(
+    motors_bus,
+    step,
+    rate_hz=200,
+    read_fn=lambda bus: scheduler.poll_control()["state"],
+    write_fn=lambda bus, action: scheduler.write("Goal_Position", action),
+    idle_fn=lambda bus, budget_s: scheduler.poll_background(budget_s),
+)
+loop.run(duration_s=10)
+print(scheduler.results["temperature"], scheduler.get_utilization())
+```
+"""
+
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from max_v1.motors.codec import DEFAULT_BAUDRATE, PACKET_OVERHEAD
+from max_v1.motors.discovery import REPLY_DELAY_S, get_byte_time
+from max_v1.motors.feetech import STATE_DATA_NAMES, FeetechMotorsBus, get_block_address
+
+# Data name of the streams reading the state block of `read_state`
+STATE_STREAM = "State"
+
+CONTROL_PRIORITY = 0
+
+# Fraction of the bytes the line can carry in a tick which are given to the transactions
+DEFAULT_MAX_UTILIZATION = 0.8
+
+# Weight of the last transaction in the estimate of the duration of the transactions of a stream
+DURATION_SMOOTHING = 0.2
+
+
+@dataclass
+class Stream:
+    name: str
+    data_name: str
+    rate_hz: float
+    priority: int
+    motor_names: list[str]
+    period_ticks: int
+    # Bytes on the wire of a transaction, and the duration of the transactions, first estimated then measured
+    num_bytes: int
+    duration_s: float
+    next_tick: int = 0
+    num_reads: int = 0
+    num_deferred: int = 0
+    num_failures: int = 0
+
+    @property
+    def is_control(self) -> bool:
+        return self.priority == CONTROL_PRIORITY
+
+
+class BusScheduler:
+    """Schedules the reads of the declared streams on the ticks of a control loop running at `tick_hz`."""
+
+    def __init__(
+        self, motors_bus: FeetechMotorsBus, tick_hz: float, max_utilization: float = DEFAULT_MAX_UTILIZATION
+    ):
+        self.motors_bus = motors_bus
+        self.tick_hz = tick_hz
+        self.max_utilization = max_utilization
+        self.streams = {}
+        # Last values read by each stream, and the `time.monotonic()` of their read
+        self.results = {}
+        self.timestamps = {}
+
+        self.tick = -1
+        self.tick_bytes = 0
+        self.start = None
+        self.control_bytes = 0
+        self.background_bytes = 0
+        self.write_bytes = 0
+        self.busy_s = 0.0
+
+    @property
+    def baudrate(self) -> int:
+        port_handler = self.motors_bus.port_handler
+        return port_handler.getBaudRate() if port_handler is not None else DEFAULT_BAUDRATE
+
+    @property
+    def budget_bytes(self) -> int:
+        """Bytes which can be exchanged in a tick."""
+        return int(self.baudrate / 10 / self.tick_hz * self.max_utilization)
+
+    def get_register(self, data_name: str, motor_names: list[str]) -> tuple[int, int]:
+        ctrl_table = self.motors_bus.model_ctrl_table[self.motors_bus.motors[motor_names[0]][1]]
+        if data_name == STATE_STREAM:
+            return get_block_address(ctrl_table, STATE_DATA_NAMES)
+        return ctrl_table[data_name]
+
+    def get_read_bytes(self, data_name: str, motor_names: list[str]) -> int:
+        """Bytes on the wire of a sync read, counting the turnaround of each servo as the bytes it could carry."""
+        _, data_length = self.get_register(data_name, motor_names)
+        turnaround_bytes = REPLY_DELAY_S / get_byte_time(self.baudrate)
+        request_bytes = PACKET_OVERHEAD + 2 + len(motor_names)
+        return int(request_bytes + len(motor_names) * (PACKET_OVERHEAD + data_length + turnaround_bytes))
+
+    def get_write_bytes(self, data_name: str, motor_names: list[str]) -> int:
+        _, data_length = self.get_register(data_name, motor_names)
+        return PACKET_OVERHEAD + 2 + len(motor_names) * (1 + data_length)
+
+    def add_stream(
+        self,
+        name: str,
+        data_name: str,
+        rate_hz: float,
+        priority: int = CONTROL_PRIORITY,
+        motor_names: list[str] | None = None,
+    ):
+        """Read `data_name` of `motor_names` (all by default) at `rate_hz`, rounded to a whole number of ticks."""
+        if rate_hz > self.tick_hz:
+            raise ValueError(f"The rate of stream '{name}' ({rate_hz} Hz) is above the tick rate ({self.tick_hz} Hz).")
+        motor_names = list(self.motors_bus.motor_names if motor_names is None else motor_names)
+        num_bytes = self.get_read_bytes(data_name, motor_names)
+        self.streams[name] = Stream(
+            name,
+            data_name,
+            rate_hz,
+            priority,
+            motor_names,
+            period_ticks=max(1, round(self.tick_hz / rate_hz)),
+            num_bytes=num_bytes,
+            duration_s=num_bytes * get_byte_time(self.baudrate),
+        )
+        # Control streams run first, then by priority
+        self.streams = dict(sorted(self.streams.items(), key=lambda item: item[1].priority))
+        return self.streams[name]
+
+    def read_stream(self, stream: Stream):
+        start = time.perf_counter()
+        try:
+            if stream.data_name == STATE_STREAM:
+                values = self.motors_bus.read_state(stream.motor_names)
+            else:
+                values = self.motors_bus.read(stream.data_name, stream.motor_names)
+        finally:
+            duration_s = time.perf_counter() - start
+            stream.duration_s += DURATION_SMOOTHING * (duration_s - stream.duration_s)
+            self.busy_s += duration_s
+            self.tick_bytes += stream.num_bytes
+            stream.next_tick = self.tick + stream.period_ticks
+
+        stream.num_reads += 1
+        self.results[stream.name] = values
+        self.timestamps[stream.name] = time.monotonic()
+        return values
+
+    def poll_control(self) -> dict:
+        """Start a new tick, and read the control streams due on it. Returns their values by stream name."""
+        self.tick += 1
+        self.tick_bytes = 0
+        if self.start is None:
+            self.start = time.perf_counter()
+
+        results = {}
+        for stream in self.streams.values():
+            if stream.is_control and stream.next_tick <= self.tick:
+                results[stream.name] = self.read_stream(stream)
+        self.control_bytes += self.tick_bytes
+        return results
+
+    def write(self, data_name, values, motor_names: str | list[str] | None = None):
+        """`motors_bus.write`, counted in the bytes of the tick. Writes are control traffic and never deferred."""
+        if isinstance(motor_names, str):
+            motor_names = [motor_names]
+        start = time.perf_counter()
+        self.motors_bus.write(data_name, values, motor_names)
+        self.busy_s += time.perf_counter() - start
+        num_bytes = self.get_write_bytes(data_name, motor_names or self.motors_bus.motor_names)
+        self.tick_bytes += num_bytes
+        self.write_bytes += num_bytes
+
+    def poll_background(self, budget_s: float | None = None) -> dict:
+        """Read the due background streams, by priority, which fit in the bytes left in the tick and in `budget_s`
+        seconds if given. The others are deferred. Failed reads are counted, not raised. Returns the values read
+        by stream name."""
+        deadline = None if budget_s is None else time.perf_counter() + budget_s
+        budget_bytes = self.budget_bytes
+        results = {}
+        for stream in self.streams.values():
+            if stream.is_control or stream.next_tick > self.tick:
+                continue
+            fits_bytes = self.tick_bytes + stream.num_bytes <= budget_bytes
+            fits_time = deadline is None or time.perf_counter() + stream.duration_s <= deadline
+            if not (fits_bytes and fits_time):
+                stream.num_deferred += 1
+                continue
+            num_bytes = self.tick_bytes
+            try:
+                results[stream.name] = self.read_stream(stream)
+            except ConnectionError:
+                stream.num_failures += 1
+            self.background_bytes += self.tick_bytes - num_bytes
+        return results
+
+    def get_utilization(self) -> dict:
+        """Use of the bus since the first tick: bytes per tick by traffic class, against what the line can carry,
+        fraction of the time spent in transactions, and achieved rate of each stream."""
+        num_ticks = self.tick + 1
+        elapsed_s = time.perf_counter() - self.start if self.start is not None else 0.0
+        capacity_bytes = self.baudrate / 10 / self.tick_hz
+        per_tick = np.array([self.control_bytes, self.write_bytes, self.background_bytes]) / max(num_ticks, 1)
+        return {
+            "num_ticks": num_ticks,
+            "budget_bytes_per_tick": self.budget_bytes,
+            "control_bytes_per_tick": float(per_tick[0]),
+            "write_bytes_per_tick": float(per_tick[1]),
+            "background_bytes_per_tick": float(per_tick[2]),
+            "utilization": float(per_tick.sum() / capacity_bytes),
+            "busy_fraction": self.busy_s / elapsed_s if elapsed_s > 0 else 0.0,
+            "streams": {
+                stream.name: {
+                    "priority": stream.priority,
+                    "target_hz": stream.rate_hz,
+                    "rate_hz": stream.num_reads / elapsed_s if elapsed_s > 0 else 0.0,
+                    "num_reads": stream.num_reads,
+                    "num_deferred": stream.num_deferred,
+                    "num_failures": stream.num_failures,
+                    "duration_s": stream.duration_s,
+                }
+                for stream in self.streams.values()
+            },
+        }
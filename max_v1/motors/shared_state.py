@@ -0,0 +1,231 @@
+"""Shared-memory channels between the process owning a `FeetechMotorsBus` and the other processes of the robot stack,
+e.g. a planner, a logger or a policy, without pickling nor sockets.
+
+`SharedJointState` is a block of shared memory holding the last position, velocity and load read for each motor, and
+the monotonic time of each read, as NumPy views. The bus owner publishes every `read` and `read_state` into it, see
+`FeetechMotorsBus.share_state`. It is protected by a seqlock: the single writer makes the sequence number odd while
+it updates the block, and readers copy the block and retry until they saw the same even sequence number before and
+after their copy, for at most a timeout in case the writer died mid-update. Readers never block the writer.
+
+`SharedCommandRing` is a lock-free single-producer/single-consumer ring of goal commands in shared memory: one
+process pushes goals, the bus owner pops them, see `FeetechMotorsBus.share_commands`. Each command holds a goal per
+motor, NaN for the motors it does not command. The head is only written by the producer and the tail only by the
+consumer, each on its own cache line.
+
+The stores of NumPy are not fenced: the ordering of the seqlock and the ring relies on the stores of a process being
+seen in order by the others, which holds on x86 and in practice for these small blocks on the ARM boards of the robot.
+
+Example of usage:
+```python
+# Process owning the bus
+state = motors_bus.share_state("robot_state")
+commands = motors_bus.share_commands("robot_goals")
+while True:
+    motors_bus.read_state()
+    motors_bus.apply_shared_commands()
+
+# Any other process
+state = SharedJointState.attach("robot_state")
+snapshot = state.read()
+print(state.motor_names, snapshot["position"], time.monotonic() - snapshot["timestamp"])
+commands = SharedCommandRing.attach("robot_goals")
+commands.push(goal_positions)
+```
+"""
+
+import json
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# Fields of `SharedJointState` besides the timestamps, see `feetech.SHARED_STATE_FIELDS` for their registers
+STATE_FIELDS = ["position", "velocity", "load"]
+
+CACHE_LINE = 64
+DEFAULT_RING_CAPACITY = 64
+# Time a reader waits for a publish to complete, far above the microseconds it takes unless the writer died mid-way
+DEFAULT_READ_TIMEOUT_S = 1.0
+
+
+def align(offset: int, alignment: int = CACHE_LINE) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def create_or_attach(name: str, size: int | None) -> shared_memory.SharedMemory:
+    """Create the block `name` of `size` bytes, or attach to it if `size` is None."""
+    if size is not None:
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # Before Python 3.13, attaching also registers the block to be unlinked at exit, which is up to its creator
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SharedJointState:
+    """Seqlock-protected joint state of a bus in shared memory. Created by the bus owner, attached by the others.
+
+    Layout: sequence number (uint64), then the JSON list of motor names, then one float64 array per field of
+    `STATE_FIELDS` and the `timestamp` array, each starting on a cache line.
+    """
+
+    def __init__(self, name: str, motor_names: list[str] | None = None):
+        self.name = name
+        self.is_owner = motor_names is not None
+        if self.is_owner:
+            names = json.dumps(motor_names).encode()
+            num_motors = len(motor_names)
+            self.shm = create_or_attach(name, self.get_size(len(names), num_motors))
+            self.shm.buf[8:16] = np.array([len(names), num_motors], dtype=np.uint32).tobytes()
+            self.shm.buf[16 : 16 + len(names)] = names
+        else:
+            self.shm = create_or_attach(name, None)
+            names_length, num_motors = np.frombuffer(self.shm.buf, dtype=np.uint32, count=2, offset=8)
+            names = bytes(self.shm.buf[16 : 16 + names_length])
+            motor_names = json.loads(names)
+
+        self.motor_names = motor_names
+        self.seq = np.ndarray((1,), dtype=np.uint64, buffer=self.shm.buf)
+        # Views of the block, only consistent when read through `read`
+        self.fields = {}
+        offset = align(16 + len(names))
+        for field in [*STATE_FIELDS, "timestamp"]:
+            self.fields[field] = np.ndarray((num_motors,), dtype=np.float64, buffer=self.shm.buf, offset=offset)
+            offset = align(offset + num_motors * 8)
+        if self.is_owner:
+            for values in self.fields.values():
+                values[:] = np.nan
+
+    @staticmethod
+    def get_size(names_length: int, num_motors: int) -> int:
+        return align(16 + names_length) + (len(STATE_FIELDS) + 1) * align(num_motors * 8)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedJointState":
+        return cls(name)
+
+    def publish(self, values: dict[str, np.ndarray], idx: slice | np.ndarray = slice(None), timestamp=None):
+        """Write the fields `values` of the motors `idx`. Only to be called by the single writer."""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self.seq[0] += 1
+        for field, field_values in values.items():
+            self.fields[field][idx] = field_values
+        self.fields["timestamp"][idx] = timestamp
+        self.seq[0] += 1
+
+    def read(
+        self, out: dict[str, np.ndarray] | None = None, timeout_s: float = DEFAULT_READ_TIMEOUT_S
+    ) -> dict[str, np.ndarray]:
+        """Consistent copy of the block, by field. Pass the result of a previous call as `out` to copy into it
+        without allocating. Raises `TimeoutError` if no consistent copy could be made within `timeout_s`."""
+        if out is None:
+            out = {field: np.empty_like(values) for field, values in self.fields.items()}
+        deadline = time.monotonic() + timeout_s
+        while True:
+            seq = int(self.seq[0])
+            if not seq & 1:
+                for field, values in self.fields.items():
+                    np.copyto(out[field], values)
+                if int(self.seq[0]) == seq:
+                    return out
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"The joint state '{self.name}' is still being published after {timeout_s}s, its writer may have "
+                    "died during a publish."
+                )
+
+    @property
+    def num_updates(self) -> int:
+        return int(self.seq[0]) // 2
+
+    def close(self):
+        """Detach from the block, and remove it if this is its creator."""
+        self.seq = None
+        self.fields = {}
+        self.shm.close()
+        if self.is_owner:
+            self.shm.unlink()
+
+
+class SharedCommandRing:
+    """Single-producer/single-consumer ring of goal commands in shared memory. Created by the bus owner (consumer),
+    attached by the producer.
+
+    Layout: head (uint64) and tail (uint64) on their own cache lines, number of motors and capacity (uint64), then
+    `capacity` slots of one float64 goal per motor.
+    """
+
+    def __init__(self, name: str, num_motors: int | None = None, capacity: int = DEFAULT_RING_CAPACITY):
+        self.name = name
+        self.is_owner = num_motors is not None
+        if self.is_owner:
+            self.shm = create_or_attach(name, 3 * CACHE_LINE + capacity * align(num_motors * 8))
+            self.shm.buf[2 * CACHE_LINE : 2 * CACHE_LINE + 16] = np.array([num_motors, capacity], np.uint64).tobytes()
+        else:
+            self.shm = create_or_attach(name, None)
+            num_motors, capacity = np.frombuffer(self.shm.buf, dtype=np.uint64, count=2, offset=2 * CACHE_LINE)
+
+        self.num_motors = int(num_motors)
+        self.capacity = int(capacity)
+        self.head = np.ndarray((1,), dtype=np.uint64, buffer=self.shm.buf, offset=0)
+        self.tail = np.ndarray((1,), dtype=np.uint64, buffer=self.shm.buf, offset=CACHE_LINE)
+        self.slot_size = align(self.num_motors * 8)
+        self.slots = np.ndarray(
+            (self.capacity, self.num_motors),
+            dtype=np.float64,
+            buffer=self.shm.buf,
+            offset=3 * CACHE_LINE,
+            strides=(self.slot_size, 8),
+        )
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedCommandRing":
+        return cls(name)
+
+    def __len__(self):
+        return int(self.head[0] - self.tail[0])
+
+    def push(self, goals) -> bool:
+        """Append a command, NaN for the motors it does not command. Returns False if the ring is full. Only to be
+        called by the producer."""
+        head = int(self.head[0])
+        if head - int(self.tail[0]) >= self.capacity:
+            return False
+        self.slots[head % self.capacity] = goals
+        # Publish the slot only once it is written
+        self.head[0] = head + 1
+        return True
+
+    def pop(self, out: np.ndarray | None = None) -> np.ndarray | None:
+        """Oldest command, or None if the ring is empty. Only to be called by the consumer."""
+        tail = int(self.tail[0])
+        if tail == int(self.head[0]):
+            return None
+        if out is None:
+            out = np.empty(self.num_motors, dtype=np.float64)
+        np.copyto(out, self.slots[tail % self.capacity])
+        self.tail[0] = tail + 1
+        return out
+
+    def pop_latest(self) -> np.ndarray | None:
+        """Merge all the pending commands, the latest goal of each motor winning. None if the ring is empty."""
+        goals = self.pop()
+        if goals is None:
+            return None
+        command = np.empty_like(goals)
+        while self.pop(command) is not None:
+            commanded = ~np.isnan(command)
+            goals[commanded] = command[commanded]
+        return goals
+
+    def close(self):
+        """Detach from the ring, and remove it if this is its creator."""
+        self.head = self.tail = self.slots = None
+        self.shm.close()
+        if self.is_owner:
+            self.shm.unlink()
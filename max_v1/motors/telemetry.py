@@ -0,0 +1,147 @@
+"""Opt-in telemetry of the transactions of a `FeetechMotorsBus`, kept in preallocated NumPy ring buffers.
+
+Each (operation, register group) pair, e.g. `("read", ("Present_Position", ("servo_1", "servo_2")))`, gets its own
+`TelemetryChannel` holding the last `capacity` transactions: UTC timestamp, duration, number of retries and values.
+Buffers are allocated on the first transaction of a channel, then recording only copies into them, so that it can
+stay enabled in the control loop.
+
+Example of usage:
+```python
+motors_bus.enable_telemetry(capacity=10_000)
+for _ in range(100):
+    motors_bus.read("Present_Position")
+
+channel = motors_bus.telemetry.get_channel("read", "Present_Position")
+print(channel.snapshot()["duration_s"].mean())
+motors_bus.telemetry.export("telemetry.npz")
+```
+"""
+
+import numpy as np
+
+DEFAULT_CAPACITY = 4096
+
+
+class TelemetryChannel:
+    """Ring buffers of the last `capacity` transactions of one operation on one register group."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.timestamp_utc = np.zeros(capacity, dtype=np.float64)
+        self.duration_s = np.zeros(capacity, dtype=np.float64)
+        self.retries = np.zeros(capacity, dtype=np.int32)
+        # Allocated on the first record, since their shape and dtype come from the values
+        self.values = None
+        self.num_records = 0
+
+    def __len__(self):
+        return min(self.num_records, self.capacity)
+
+    def record(self, timestamp_utc: float, duration_s: float, retries: int, values: np.ndarray | None = None):
+        if values is not None:
+            values = np.asarray(values)
+            if (
+                self.values is None
+                or values.shape != self.values.shape[1:]
+                or (values.dtype != self.values.dtype and not np.can_cast(values.dtype, self.values.dtype))
+            ):
+                self.allocate_values(values)
+
+        i = self.num_records % self.capacity
+        self.timestamp_utc[i] = timestamp_utc
+        self.duration_s[i] = duration_s
+        self.retries[i] = retries
+        if values is not None:
+            self.values[i] = values
+        self.num_records += 1
+
+    def allocate_values(self, values: np.ndarray):
+        """(Re)allocate the buffer of the values when `values` does not fit in it, e.g. raw int32 steps followed by
+        float32 degrees once `set_calibration` is called. The previous values are kept in a dtype holding both
+        when possible, otherwise the previous records of the channel are dropped."""
+        if self.values is not None and values.shape == self.values.shape[1:]:
+            try:
+                dtype = np.promote_types(self.values.dtype, values.dtype)
+            except TypeError:
+                dtype = None
+            if dtype is not None and np.can_cast(values.dtype, dtype):
+                self.values = self.values.astype(dtype)
+                return
+        self.values = np.zeros((self.capacity, *values.shape), dtype=values.dtype)
+        self.num_records = 0
+
+    def get_order(self) -> np.ndarray | slice:
+        """Indices of the recorded rows from the oldest to the latest."""
+        if self.num_records <= self.capacity:
+            return slice(0, self.num_records)
+        start = self.num_records % self.capacity
+        return np.roll(np.arange(self.capacity), -start)
+
+    def snapshot(self) -> dict[str, np.ndarray]:
+        """Copy of the recorded transactions, from the oldest to the latest."""
+        order = self.get_order()
+        snapshot = {
+            "timestamp_utc": self.timestamp_utc[order].copy(),
+            "duration_s": self.duration_s[order].copy(),
+            "retries": self.retries[order].copy(),
+        }
+        if self.values is not None:
+            snapshot["values"] = self.values[order].copy()
+        return snapshot
+
+    def latest(self) -> dict | None:
+        if self.num_records == 0:
+            return None
+        i = (self.num_records - 1) % self.capacity
+        latest = {
+            "timestamp_utc": float(self.timestamp_utc[i]),
+            "duration_s": float(self.duration_s[i]),
+            "retries": int(self.retries[i]),
+        }
+        if self.values is not None:
+            latest["values"] = self.values[i].copy()
+        return latest
+
+    def clear(self):
+        self.num_records = 0
+
+
+class TelemetryRecorder:
+    """`TelemetryChannel`s of a bus, by `(operation, group_key)` where `group_key` is `(data_name, motor_names)`."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.channels = {}
+
+    def record(self, operation, group_key, timestamp_utc, duration_s, retries=0, values=None):
+        channel = self.channels.get((operation, group_key))
+        if channel is None:
+            channel = TelemetryChannel(self.capacity)
+            self.channels[(operation, group_key)] = channel
+        channel.record(timestamp_utc, duration_s, retries, values)
+
+    def get_channel(self, operation: str, data_name: str | tuple | None = None) -> TelemetryChannel | None:
+        """Channel of `operation` on `data_name`. If several groups of motors match, the latest created is returned."""
+        channel = None
+        for (op, (name, _)), ch in self.channels.items():
+            if op == operation and (data_name is None or name == data_name):
+                channel = ch
+        return channel
+
+    def snapshot(self) -> dict[tuple, dict[str, np.ndarray]]:
+        return {key: channel.snapshot() for key, channel in self.channels.items() if len(channel) > 0}
+
+    def export(self, path: str):
+        """Save all the channels to a `.npz` file, with keys like "read/Present_Position/servo_1,servo_2/duration_s"."""
+        arrays = {}
+        for (operation, (data_name, motor_names)), snapshot in self.snapshot().items():
+            if isinstance(data_name, tuple):
+                data_name = "+".join(data_name)
+            prefix = f"{operation}/{data_name}/{','.join(motor_names)}"
+            for field, values in snapshot.items():
+                arrays[f"{prefix}/{field}"] = values
+        np.savez(path, **arrays)
+
+    def clear(self):
+        for channel in self.channels.values():
+            channel.clear()
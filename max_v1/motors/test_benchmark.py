@@ -0,0 +1,37 @@
+"""
+Tests of the throughput benchmark of `FeetechMotorsBus`, on emulated servos.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_benchmark.py::test_benchmark_counts_bytes_on_the_wire
+```
+"""
+
+import sys
+
+import pytest
+
+from max_v1.motors.benchmark import compare_results, run_benchmark
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="The emulator runs on a Linux pty")
+def test_benchmark_counts_bytes_on_the_wire():
+    results = run_benchmark([6], workloads=["position", "read_write"], duration_s=0.1)
+    position, read_write = results
+
+    assert position["num_ticks"] > 0 and position["num_failures"] == 0
+    # Sync read request of 6 motors, then 6 status packets of a 2 bytes register. A few retried ticks send more.
+    assert position["tx_bytes_per_tick"] == pytest.approx(8 + 6, rel=0.1)
+    assert position["rx_bytes_per_tick"] == pytest.approx(6 * (6 + 2), rel=0.1)
+    # The sync write of Goal_Position adds 2 bytes and the id of each motor
+    assert read_write["tx_bytes_per_tick"] == pytest.approx(8 + 6 + 8 + 6 * 3, rel=0.1)
+    assert read_write["latency_s"]["p50"] <= read_write["latency_s"]["p99"]
+
+
+def test_compare_results_reports_regressions():
+    key = {"motors": 6, "workload": "state", "baudrate": 1_000_000, "retry_policy": "default", "backend": "native"}
+    baseline = [{**key, "rate_hz": 500.0}, {**key, "motors": 12, "rate_hz": 250.0}]
+
+    assert compare_results([{**key, "rate_hz": 460.0}], baseline, tolerance=0.1) == []
+    regressions = compare_results([{**key, "rate_hz": 400.0}, {**key, "motors": 12, "rate_hz": 260.0}], baseline)
+    assert len(regressions) == 1 and "500 -> 400" in regressions[0]
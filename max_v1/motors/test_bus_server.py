@@ -0,0 +1,158 @@
+"""
+Tests of `BusServer` and its `RemoteMotorsBus` clients, serving the servos of `BusEmulator`.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_bus_server.py::test_concurrent_reads_are_merged
+```
+"""
+
+import os
+import socket
+import tempfile
+import threading
+
+import numpy as np
+import pytest
+
+from max_v1.motors.bus_server import HEADER, INFO, READ, WRITE, BusServer, RemoteMotorsBus, encode_request
+from max_v1.motors.emulator import BusEmulator
+from max_v1.motors.feetech import FeetechMotorsBus, FeetechMotorsBusConfig
+
+MOTOR_IDS = [1, 2, 3, 4]
+
+
+@pytest.fixture
+def server():
+    emulator = BusEmulator(MOTOR_IDS)
+    port = emulator.start(loopback=f"test_bus_server_{id(emulator)}")
+    motors = {f"servo_{i}": (i, "sts3215") for i in MOTOR_IDS}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port, motors, backend="native"))
+    motors_bus.connect()
+    path = os.path.join(tempfile.mkdtemp(), "bus.sock")
+    # Long enough for the requests of the test threads to arrive in the same batch
+    with BusServer(motors_bus, path, merge_window_s=0.05) as server:
+        yield server
+    motors_bus.disconnect()
+    emulator.stop()
+
+
+def connect(server):
+    motors_bus = RemoteMotorsBus(server.path)
+    motors_bus.connect()
+    return motors_bus
+
+
+def run_concurrently(*fns):
+    results = [None] * len(fns)
+    barrier = threading.Barrier(len(fns))
+
+    def run(i):
+        barrier.wait()
+        results[i] = fns[i]()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(fns))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_remote_bus_has_the_api_of_the_bus(server):
+    motors_bus = connect(server)
+    assert motors_bus.motor_names == server.motors_bus.motor_names
+    assert motors_bus.motor_indices == MOTOR_IDS
+
+    motors_bus.write("Goal_Speed", 500)
+    motors_bus.write("Goal_Speed", [10, 20], ["servo_1", "servo_3"])
+    np.testing.assert_array_equal(motors_bus.read("Goal_Speed"), [10, 500, 20, 500])
+    state = motors_bus.read_state("servo_2")
+    assert state.dtype == server.motors_bus.read_state().dtype
+    assert state["Present_Position"].tolist() == [2048]
+
+    with pytest.raises(KeyError):
+        motors_bus.read("Unknown_Register")
+    motors_bus.disconnect()
+
+
+def test_concurrent_reads_are_merged(server):
+    clients = [connect(server) for _ in range(3)]
+    server.stats["transactions"] = 0
+    positions = run_concurrently(
+        lambda: clients[0].read("Present_Position", ["servo_1", "servo_2"]),
+        lambda: clients[1].read("Present_Position", ["servo_4"]),
+        lambda: clients[2].read("Present_Position"),
+    )
+    assert [values.tolist() for values in positions] == [[2048, 2048], [2048], [2048] * 4]
+    assert server.stats["transactions"] == 1
+    for client in clients:
+        client.disconnect()
+
+
+def test_concurrent_writes_are_merged(server):
+    clients = [connect(server) for _ in range(2)]
+    server.stats["transactions"] = 0
+    run_concurrently(
+        lambda: clients[0].write("Goal_Speed", [1, 2], ["servo_1", "servo_2"]),
+        lambda: clients[1].write("Goal_Speed", [3, 4], ["servo_3", "servo_4"]),
+    )
+    assert server.stats["transactions"] == 1
+    np.testing.assert_array_equal(clients[0].read("Goal_Speed"), [1, 2, 3, 4])
+    for client in clients:
+        client.disconnect()
+
+
+
+def test_invalid_requests_only_fail_their_client(server):
+    clients = [connect(server) for _ in range(4)]
+
+    def get_error(fn):
+        try:
+            fn()
+        except ValueError as e:
+            return e
+
+    server.stats["transactions"] = 0
+    results = run_concurrently(
+        lambda: clients[0].read("Goal_Speed"),
+        # A motor index past the motors of the bus
+        lambda: get_error(lambda: clients[1].request(READ, encode_request("Goal_Speed", [1, len(MOTOR_IDS)]))),
+        lambda: clients[2].write("Goal_Speed", [5, 6], ["servo_1", "servo_2"]),
+        # More values than motors
+        lambda: get_error(lambda: clients[3].request(WRITE, encode_request("Goal_Speed", [2, 3], [7, 8, 9]))),
+    )
+    assert server.stats["transactions"] == 2
+    assert "out of range" in str(results[1])
+    assert "3 values for the 2 motors" in str(results[3])
+    np.testing.assert_array_equal(results[0], [5, 6, 0, 0])
+    for client in clients:
+        client.disconnect()
+
+
+def test_client_which_does_not_read_is_dropped(server):
+    server.max_pending_bytes = 64 * 1024
+    slow_client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    slow_client.connect(server.path)
+    # Many more replies than the socket buffers hold, never read
+    request = encode_request("", [])
+    slow_client.sendall((HEADER.pack(len(request), 0, INFO) + request) * 5000)
+
+    motors_bus = connect(server)
+    np.testing.assert_array_equal(motors_bus.read("ID"), MOTOR_IDS)
+    assert server.stats["dropped_clients"] == 1
+    motors_bus.disconnect()
+    slow_client.close()
+
+
+def test_client_times_out_on_a_stalled_server():
+    path = os.path.join(tempfile.mkdtemp(), "stalled.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen()
+
+    motors_bus = RemoteMotorsBus(path, timeout_s=0.05)
+    with pytest.raises(TimeoutError, match="did not reply within 0.05s"):
+        motors_bus.connect()
+    assert not motors_bus.is_connected
+    listener.close()
@@ -0,0 +1,91 @@
+"""
+Tests for the native packet codec of the Feetech protocol.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_codec.py::test_sync_write_packet
+```
+"""
+
+import numpy as np
+
+from max_v1.motors.codec import RegWritePackets, SyncReadPacket, SyncWritePacket, make_instruction_packet
+
+
+def checksum(payload):
+    return ~sum(payload) & 0xFF
+
+
+def status_packet(motor_id, params, error=0):
+    payload = [motor_id, len(params) + 2, error, *params]
+    return bytes([0xFF, 0xFF, *payload, checksum(payload)])
+
+
+def test_sync_write_packet():
+    packet = SyncWritePacket(42, 2, [1, 2])
+    payload = [0xFE, 10, 0x83, 42, 2, 1, 0x00, 0x08, 2, 0xFF, 0xFF]
+
+    # -1 is sent as its two's complement, like `convert_to_bytes`
+    assert bytes(packet.pack([2048, -1])) == bytes([0xFF, 0xFF, *payload, checksum(payload)])
+
+    # The packet is reused for the next values
+    payload[6:8] = [0x10, 0x00]
+    assert bytes(packet.pack(np.array([16, -1]))) == bytes([0xFF, 0xFF, *payload, checksum(payload)])
+
+
+def test_sync_write_packet_with_several_registers():
+    # Goal_Position and Goal_Speed around Goal_Time, in a single block of 6 bytes
+    packet = SyncWritePacket(42, 6, [1, 2])
+    packet.pack_registers([(0, 2, [2048, 16]), (4, 2, [100, -1])])
+    payload = [0xFE, 18, 0x83, 42, 6, 1, 0x00, 0x08, 0, 0, 100, 0, 2, 0x10, 0x00, 0, 0, 0xFF, 0xFF]
+    assert bytes(packet.buffer) == bytes([0xFF, 0xFF, *payload, checksum(payload)])
+
+
+def test_instruction_packet():
+    payload = [1, 4, 0x02, 56, 2]
+    assert make_instruction_packet(1, 0x02, [56, 2]) == bytes([0xFF, 0xFF, *payload, checksum(payload)])
+
+
+def test_sync_read_packet_decodes_all_motors():
+    packet = SyncReadPacket(56, 2, [1, 2, 3])
+    payload = [0xFE, 7, 0x82, 56, 2, 1, 2, 3]
+    assert packet.request == bytes([0xFF, 0xFF, *payload, checksum(payload)])
+
+    response = status_packet(1, [0x00, 0x08]) + status_packet(2, [0xFF, 0x0F]) + status_packet(3, [0x01, 0x00])
+    packet.response[:] = response
+
+    assert packet.decode(len(response)).all()
+    np.testing.assert_array_equal(packet.get_values(), [2048, 4095, 1])
+
+
+def test_sync_read_packet_with_missing_and_corrupted_replies():
+    packet = SyncReadPacket(56, 2, [1, 2, 3])
+
+    corrupted = bytearray(status_packet(3, [0x01, 0x00]))
+    corrupted[-1] ^= 0xFF
+    response = status_packet(1, [0x00, 0x08]) + bytes(corrupted)
+    packet.response[: len(response)] = response
+
+    valid = packet.decode(len(response))
+    np.testing.assert_array_equal(valid, [True, False, False])
+    assert packet.get_values()[0] == 2048
+
+
+def test_reg_write_packets_only_resend_unacknowledged_motors():
+    packets = RegWritePackets(42, 2, [1, 2])
+    packets.pack([2048, 100])
+    first = [1, 5, 0x04, 42, 0x00, 0x08]
+    second = [2, 5, 0x04, 42, 100, 0x00]
+    assert bytes(packets.get_pending_packets()) == bytes(
+        [0xFF, 0xFF, *first, checksum(first), 0xFF, 0xFF, *second, checksum(second)]
+    )
+
+    # Only the first motor acknowledged, the second one is sent again
+    ack = status_packet(1, [])
+    packets.pending_response[: len(ack)] = ack
+    np.testing.assert_array_equal(packets.decode(len(ack)), [True, False])
+    assert bytes(packets.get_pending_packets()) == bytes([0xFF, 0xFF, *second, checksum(second)])
+
+    ack = status_packet(2, [])
+    packets.pending_response[: len(ack)] = ack
+    assert packets.decode(len(ack)).all()
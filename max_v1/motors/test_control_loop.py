@@ -0,0 +1,72 @@
+"""
+Tests of the fixed-rate `ControlLoop`, with a fake bus.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_control_loop.py::test_control_loop_runs_at_rate
+```
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from max_v1.motors.control_loop import ControlLoop, ControlLoopOverrunError, DegradePolicy
+
+
+class FakeBus:
+    def __init__(self, read_s=0.0):
+        self.read_s = read_s
+        self.writes = []
+
+    def read_state(self):
+        time.sleep(self.read_s)
+        return {"Present_Position": np.zeros(2)}
+
+    def write(self, data_name, values):
+        self.writes.append((data_name, values))
+
+
+def test_control_loop_runs_at_rate():
+    bus = FakeBus()
+    # Catch up instead of skipping ticks, in case the test machine is loaded
+    loop = ControlLoop(
+        bus,
+        lambda state, tick: state["Present_Position"] + tick,
+        rate_hz=200,
+        degrade_policy=DegradePolicy.CATCH_UP,
+    )
+
+    start = time.perf_counter()
+    stats = loop.run(num_ticks=40)
+    elapsed = time.perf_counter() - start
+
+    assert stats.num_ticks == 40
+    assert len(bus.writes) == 40
+    assert bus.writes[3][0] == "Goal_Position"
+    np.testing.assert_array_equal(bus.writes[3][1], [3, 3])
+    # The last tick starts 39 periods after the first one
+    assert elapsed >= 39 / 200
+
+    summary = stats.summary()
+    assert set(summary["jitter_s"]) == {"p50", "p90", "p99", "max"}
+    assert summary["read_s"]["p50"] >= 0
+
+
+def test_control_loop_skips_overrun_ticks():
+    bus = FakeBus(read_s=0.012)
+    loop = ControlLoop(bus, lambda state, tick: None, rate_hz=200, degrade_policy=DegradePolicy.SKIP)
+    stats = loop.run(num_ticks=20)
+
+    assert stats.num_overruns == stats.num_ticks
+    assert stats.num_ticks + stats.num_skipped == 20
+    assert bus.writes == []
+
+
+def test_control_loop_raises_on_overrun():
+    bus = FakeBus(read_s=0.012)
+    loop = ControlLoop(bus, lambda state, tick: None, rate_hz=200, degrade_policy="raise")
+    with pytest.raises(ControlLoopOverrunError):
+        loop.run(num_ticks=5)
+    assert not loop.is_running
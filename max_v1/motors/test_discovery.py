@@ -0,0 +1,156 @@
+"""
+Tests for the bus discovery of `max_v1.motors.discovery`, with a scripted serial port and with emulated servos whose
+replies to broadcast pings collide.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_discovery.py::test_broadcast_ping_stops_once_expected_ids_replied
+```
+"""
+
+import sys
+import time
+
+import pytest
+
+from max_v1.motors.codec import BROADCAST_ID, INST_PING, INST_SYNC_READ, PortHandler, make_instruction_packet
+from max_v1.motors.discovery import (
+    broadcast_ping,
+    get_response_window,
+    ping_ids,
+    scan_baudrates,
+)
+from max_v1.motors.emulator import BusEmulator, FaultConfig
+from max_v1.motors.feetech import FeetechMotorsBus, FeetechMotorsBusConfig
+
+COLLIDING_IDS = [1, 2, 3, 4, 5, 6]
+
+
+def make_status_packet(motor_id, params=b""):
+    # Status packets have the same layout as instruction packets, with the error byte instead of the instruction
+    return make_instruction_packet(motor_id, 0, params)
+
+
+class FakeSerial:
+    def __init__(self):
+        self.rx = bytearray()
+
+    @property
+    def in_waiting(self):
+        return len(self.rx)
+
+    def reset_input_buffer(self):
+        self.rx.clear()
+
+
+class FakePortHandler:
+    """Motors of `motors` (id -> model number) reply at `baudrate` only."""
+
+    def __init__(self, motors, baudrate=1_000_000):
+        self.ser = FakeSerial()
+        self.motors = motors
+        self.motors_baudrate = baudrate
+        self.baudrate = 1_000_000
+        self.requests = []
+
+    def getBaudRate(self):
+        return self.baudrate
+
+    def setBaudRate(self, baudrate):
+        self.baudrate = baudrate
+        return True
+
+    def writePort(self, packet):
+        self.requests.append(bytes(packet))
+        if self.baudrate != self.motors_baudrate:
+            return len(packet)
+        if packet[2] == BROADCAST_ID and packet[4] == INST_PING:
+            for motor_id in sorted(self.motors):
+                self.ser.rx += make_status_packet(motor_id)
+        elif packet[4] == INST_SYNC_READ:
+            for motor_id in packet[7:-1]:
+                if motor_id in self.motors:
+                    self.ser.rx += make_status_packet(motor_id, self.motors[motor_id].to_bytes(2, "little"))
+        return len(packet)
+
+    def readPort(self, length):
+        data = bytes(self.ser.rx[:length])
+        del self.ser.rx[:length]
+        return data
+
+
+def test_response_window_scales_with_baudrate():
+    fast = get_response_window(1_000_000, 12, 6, latency_s=0)
+    slow = get_response_window(19_200, 12, 6, latency_s=0)
+    assert fast < 0.002
+    assert slow > 10 * fast
+
+
+def test_broadcast_ping_stops_once_expected_ids_replied():
+    port_handler = FakePortHandler({1: 777, 2: 777, 3: 777})
+
+    start = time.perf_counter()
+    assert broadcast_ping(port_handler, expected_ids=[1, 2, 3], latency_s=0.5) == [1, 2, 3]
+    assert time.perf_counter() - start < 0.1
+
+    # Without expected ids, listening stops once the line stays quiet after the replies
+    start = time.perf_counter()
+    assert broadcast_ping(port_handler, latency_s=0.01) == [1, 2, 3]
+    assert time.perf_counter() - start < 0.1
+
+
+def test_ping_ids_returns_models():
+    port_handler = FakePortHandler({5: 777, 40: 1284})
+    assert ping_ids(port_handler, range(64), latency_s=0.001) == {5: 777, 40: 1284}
+    # One sync read per chunk of 32 ids
+    assert len(port_handler.requests) == 2
+
+
+def test_scan_baudrates_inventory():
+    port_handler = FakePortHandler({7: 777, 8: 777}, baudrate=500_000)
+    inventory = scan_baudrates(port_handler, [1_000_000, 500_000, 250_000], expected_ids=[7, 8], latency_s=0.001)
+
+    assert [(motor.id, motor.baudrate, motor.model) for motor in inventory] == [
+        (7, 500_000, "sts3215"),
+        (8, 500_000, "sts3215"),
+    ]
+    # The port is back to its initial baud rate
+    assert port_handler.getBaudRate() == 1_000_000
+
+
+def make_colliding_emulator() -> BusEmulator:
+    """Servos 1 and 2 reply to broadcast pings on their own, the replies of servos 3 to 6 collide."""
+    emulator = BusEmulator(COLLIDING_IDS, faults=FaultConfig(collide_broadcast=True))
+    emulator.get_servo(1).set("Return_Delay", 50)
+    emulator.get_servo(2).set("Return_Delay", 100)
+    return emulator
+
+
+def open_port(emulator) -> PortHandler:
+    port_handler = PortHandler(emulator.port)
+    assert port_handler.openPort()
+    return port_handler
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="The emulator runs on a Linux pty")
+def test_scan_baudrates_finds_the_motors_whose_replies_collided():
+    with make_colliding_emulator() as emulator:
+        port_handler = open_port(emulator)
+        assert broadcast_ping(port_handler, latency_s=0.005) == [1, 2]
+
+        inventory = scan_baudrates(port_handler, [1_000_000], expected_ids=COLLIDING_IDS, latency_s=0.005)
+        assert [(motor.id, motor.model) for motor in inventory] == [(i, "sts3215") for i in COLLIDING_IDS]
+        # Without expected ids, the garbled replies trigger the sync reads of all the ids
+        inventory = scan_baudrates(port_handler, [1_000_000], latency_s=0.005)
+        assert [motor.id for motor in inventory] == COLLIDING_IDS
+        port_handler.closePort()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="The emulator runs on a Linux pty")
+def test_find_motor_indices_finds_the_motors_whose_replies_collided():
+    with make_colliding_emulator() as emulator:
+        config = FeetechMotorsBusConfig(emulator.port, motors={}, backend="native")
+        motors_bus = FeetechMotorsBus(config)
+        motors_bus.connect()
+        assert motors_bus.find_motor_indices(range(1, 10)) == COLLIDING_IDS
+        motors_bus.disconnect()
@@ -0,0 +1,133 @@
+"""
+Tests of `FeetechMotorsBus` with the native backend against the servos of `BusEmulator`, over a pty.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_emulator.py::test_read_write_round_trip
+```
+"""
+
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from max_v1.motors.emulator import BusEmulator, FaultConfig
+from max_v1.motors.feetech import EmergencyStopError, FeetechMotorsBus, FeetechMotorsBusConfig
+from max_v1.motors.retry import RetryPolicy
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="The emulator runs on a Linux pty")
+
+MOTOR_IDS = [1, 2, 3]
+
+
+def connect(emulator, **kwargs):
+    motors = {f"servo_{i}": (i, "sts3215") for i in MOTOR_IDS}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(emulator.port, motors, backend="native", **kwargs))
+    motors_bus.connect()
+    return motors_bus
+
+
+def test_read_write_round_trip():
+    with BusEmulator(MOTOR_IDS) as emulator:
+        motors_bus = connect(emulator)
+        np.testing.assert_array_equal(motors_bus.read("Model"), [777, 777, 777])
+
+        motors_bus.write("Torque_Enable", 1)
+        motors_bus.write_registers({"Goal_Position": [100, 200, 300], "Goal_Speed": 500})
+        np.testing.assert_array_equal(motors_bus.read("Goal_Speed"), [500, 500, 500])
+        np.testing.assert_array_equal(motors_bus.read_state()["Present_Position"], [100, 200, 300])
+        assert emulator.get_servo(2).get("Goal_Position") == 200
+        motors_bus.disconnect()
+
+
+def test_read_after_reconnect():
+    with BusEmulator(MOTOR_IDS) as emulator:
+        motors_bus = connect(emulator)
+        motors_bus.write("Goal_Position", [100, 200, 300])
+        np.testing.assert_array_equal(motors_bus.read("Goal_Position"), [100, 200, 300])
+
+        motors_bus.port_handler.closePort()
+        motors_bus.reconnect()
+        np.testing.assert_array_equal(motors_bus.read("Goal_Position"), [100, 200, 300])
+        motors_bus.disconnect()
+
+
+def test_replies_take_the_wire_time():
+    # One byte takes 10 bits on the wire, so a sync read of 3 motors at 19200 baud takes several milliseconds
+    with BusEmulator(MOTOR_IDS, baudrate=19200) as emulator:
+        motors_bus = connect(emulator)
+        motors_bus.set_bus_baudrate(19200)
+        start = time.perf_counter()
+        motors_bus.read("Present_Position")
+        elapsed = time.perf_counter() - start
+
+        request_bytes, reply_bytes = 6 + 2 + len(MOTOR_IDS), 6 + 2
+        assert elapsed >= (request_bytes + len(MOTOR_IDS) * reply_bytes) * 10 / 19200
+        motors_bus.disconnect()
+
+
+def test_dropped_replies_fail_the_read():
+    faults = FaultConfig(drop_rate=1.0, seed=0)
+    with BusEmulator(MOTOR_IDS, faults=faults) as emulator:
+        motors_bus = connect(emulator, retry_policy=RetryPolicy(budget_s=0.02, initial_timeout_s=0.002))
+        with pytest.raises(ConnectionError):
+            motors_bus.read("Present_Position")
+        assert emulator.stats["dropped"] > 0
+        assert emulator.stats["replies"] == 0
+        motors_bus.disconnect()
+
+
+def test_emulator_backend_starts_its_own_servos():
+    motors = {f"servo_{i}": (i, "sts3215") for i in MOTOR_IDS}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port="emulator", motors=motors, backend="emulator"))
+    motors_bus.connect()
+    assert motors_bus.is_native
+    assert motors_bus.find_motor_indices(range(10)) == MOTOR_IDS
+    np.testing.assert_array_equal(motors_bus.read("ID"), MOTOR_IDS)
+
+    emulator = motors_bus.emulator
+    motors_bus.disconnect()
+    assert motors_bus.emulator is None and not emulator.is_running
+
+
+def test_staged_write_is_applied_on_commit():
+    with BusEmulator(MOTOR_IDS) as emulator:
+        motors_bus = connect(emulator)
+        motors_bus.stage_write("Goal_Position", [100, 200, 300])
+        assert [emulator.get_servo(i).get("Goal_Position") for i in MOTOR_IDS] == [0, 0, 0]
+
+        motors_bus.commit_staged()
+        np.testing.assert_array_equal(motors_bus.read("Goal_Position"), [100, 200, 300])
+        motors_bus.disconnect()
+
+
+def test_emergency_stop_aborts_the_retrying_read():
+    with BusEmulator(MOTOR_IDS) as emulator:
+        motors_bus = connect(emulator, retry_policy=RetryPolicy(num_retry=1000, budget_s=5.0))
+        motors_bus.write("Torque_Enable", 1)
+        # The read retries for seconds, since none of the replies arrive anymore
+        emulator.faults = FaultConfig(drop_rate=1.0, seed=0)
+        errors = []
+
+        def read():
+            try:
+                motors_bus.read("Present_Position")
+            except EmergencyStopError as e:
+                errors.append((e, time.perf_counter()))
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        time.sleep(0.05)
+        start = time.perf_counter()
+        motors_bus.emergency_stop()
+        thread.join(1)
+
+        assert errors and errors[0][1] - start < 0.1
+        assert [emulator.get_servo(i).get("Torque_Enable") for i in MOTOR_IDS] == [0, 0, 0]
+        emulator.faults = FaultConfig()
+        motors_bus.clear_emergency_stop()
+        np.testing.assert_array_equal(motors_bus.read("Torque_Enable"), [0, 0, 0])
+        motors_bus.disconnect()
@@ -0,0 +1,230 @@
+"""
+Tests for the hardware-independent logic of `FeetechMotorsBus`.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_feetech.py::test_group_sync_cache_evicts_least_recently_used
+```
+"""
+
+import numpy as np
+import pytest
+
+from max_v1.motors.feetech import (
+    SCS_SERIES_CONTROL_TABLE,
+    STATE_DATA_NAMES,
+    EmergencyStopError,
+    FeetechMotorsBus,
+    FeetechMotorsBusConfig,
+    GroupSyncCache,
+    JointOutOfRangeError,
+    MultiTurnTracker,
+    decode_block,
+    get_block_address,
+    get_contiguous_runs,
+    get_state_dtype,
+)
+
+
+def test_group_sync_cache_evicts_least_recently_used():
+    cache = GroupSyncCache(maxsize=2)
+    cache[("Present_Position", ("a",))] = "reader_a"
+    cache[("Present_Position", ("b",))] = "reader_b"
+
+    # Looking up `a` makes `b` the least recently used handle
+    assert cache.get(("Present_Position", ("a",))) == "reader_a"
+    cache[("Present_Position", ("c",))] = "reader_c"
+
+    assert list(cache.keys()) == [("Present_Position", ("a",)), ("Present_Position", ("c",))]
+    assert cache.get(("Present_Position", ("b",))) is None
+
+
+def test_decode_state_block():
+    ctrl_table = SCS_SERIES_CONTROL_TABLE
+    addr, bytes = get_block_address(ctrl_table, STATE_DATA_NAMES)
+    assert (addr, bytes) == (56, 15)
+
+    raw = np.zeros((2, bytes), dtype=np.uint8)
+    # Present_Position=2049 and Present_Current=300 for the first motor, little-endian
+    raw[0, 0:2] = [0x01, 0x08]
+    raw[0, 13:15] = [0x2C, 0x01]
+    # Present_Voltage=121 and Present_Temperature=35 for the second motor
+    raw[1, 6] = 121
+    raw[1, 7] = 35
+
+    state = decode_block(raw, addr, ctrl_table, STATE_DATA_NAMES, get_state_dtype(STATE_DATA_NAMES))
+
+    assert state.dtype.names == tuple(STATE_DATA_NAMES)
+    assert state["Present_Position"].tolist() == [2049, 0]
+    assert state["Present_Current"].tolist() == [300, 0]
+    assert state["Present_Voltage"].tolist() == [0, 121]
+    assert state["Present_Temperature"].tolist() == [0, 35]
+
+
+def make_calibrated_bus():
+    motors = {"shoulder": (1, "sts3215"), "knee": (2, "sts3215"), "gripper": (3, "sts3215")}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port="/dev/null", motors=motors))
+    motors_bus.set_calibration(
+        {
+            "homing_offset": [-2048, 1024, 0],
+            "drive_mode": [0, 1, 0],
+            "start_pos": [0, 0, 2499],
+            "end_pos": [0, 0, 3144],
+            "calib_mode": ["DEGREE", "DEGREE", "LINEAR"],
+            "motor_names": ["shoulder", "knee", "gripper"],
+        }
+    )
+    return motors_bus
+
+
+def test_calibration_round_trip():
+    motors_bus = make_calibrated_bus()
+    values = np.array([3072, 0, 2821], dtype=np.int32)
+
+    calibrated = motors_bus.apply_calibration(values, None)
+    np.testing.assert_allclose(calibrated, [90.0, 90.0, 49.922], atol=1e-3)
+    np.testing.assert_array_equal(motors_bus.revert_calibration(calibrated, None), values)
+
+    # Subsets of motors use the calibration of the matching motors
+    calibrated = motors_bus.apply_calibration(values[[1]], ["knee"])
+    np.testing.assert_allclose(calibrated, [90.0])
+
+
+def test_calibration_out_of_range_mask_and_autocorrect():
+    motors_bus = make_calibrated_bus()
+    # The shoulder jumped by a full turn
+    values = np.array([3072 + 4096, 0, 2821], dtype=np.int32)
+
+    out_of_range = motors_bus.calibration_out_of_range(
+        motors_bus.get_compiled_calibration().apply(values, slice(None)), None
+    )
+    np.testing.assert_array_equal(out_of_range, [True, False, False])
+    with pytest.raises(JointOutOfRangeError):
+        motors_bus.apply_calibration(values, None)
+
+    calibrated = motors_bus.apply_calibration_autocorrect(values, None)
+    np.testing.assert_allclose(calibrated, [90.0, 90.0, 49.922], atol=1e-3)
+    assert motors_bus.calibration["homing_offset"] == [-2048 - 4096, 1024, 0]
+
+
+def test_multi_turn_tracker_counts_full_turns():
+    tracker = MultiTurnTracker(np.array([4096, 4096]))
+
+    np.testing.assert_array_equal(tracker.unwrap(np.array([4000, 100], dtype=np.int32)), [4000, 100])
+    # First motor wraps from 4095 to 0, second one from 0 to 4095
+    np.testing.assert_array_equal(tracker.unwrap(np.array([50, 4000], dtype=np.int32)), [4146, -96])
+    np.testing.assert_array_equal(tracker.turns, [1, -1])
+
+    # Wrap a second time on the first motor only, when unwrapping a subset of motors
+    tracker.unwrap(np.array([2000], dtype=np.int32), np.array([0]))
+    tracker.unwrap(np.array([4000], dtype=np.int32), np.array([0]))
+    np.testing.assert_array_equal(tracker.unwrap(np.array([10], dtype=np.int32), np.array([0])), [8202])
+    np.testing.assert_array_equal(tracker.turns, [2, -1])
+
+
+def test_avoid_rotation_reset_leaves_values_unchanged():
+    motors = {"shoulder": (1, "sts3215"), "knee": (2, "sts3215")}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port="/dev/null", motors=motors, mock=True))
+    motors_bus.avoid_rotation_reset(np.array([4000, 100], dtype=np.int32), None, "Present_Position")
+
+    values = np.array([50, 4000], dtype=np.int32)
+    unwrapped = motors_bus.avoid_rotation_reset(values, None, "Present_Position")
+    np.testing.assert_array_equal(unwrapped, [4146, -96])
+    np.testing.assert_array_equal(values, [50, 4000])
+
+    # The reads unwrap their fresh arrays in place
+    values = np.array([60, 4010], dtype=np.int32)
+    assert motors_bus.unwrap_positions(values, None, "Present_Position") is values
+    np.testing.assert_array_equal(values, [4156, -86])
+
+
+def test_get_contiguous_runs():
+    runs = get_contiguous_runs(SCS_SERIES_CONTROL_TABLE, ["Goal_Speed", "Torque_Enable", "Goal_Position", "Goal_Time"])
+    assert runs == [["Torque_Enable"], ["Goal_Position", "Goal_Time", "Goal_Speed"]]
+
+
+class FakeWritePort:
+    """Records the packets written to the bus."""
+
+    is_using = False
+
+    def __init__(self):
+        self.packets = []
+
+    def writePort(self, packet):
+        self.packets.append(bytes(packet))
+        return len(packet)
+
+    def closePort(self):
+        pass
+
+
+def make_native_bus(**kwargs):
+    import max_v1.motors.codec as scs
+
+    motors = {f"servo_{i}": (i, "sts3215") for i in range(1, 4)}
+    bus = FeetechMotorsBus(FeetechMotorsBusConfig(port="/dev/null", motors=motors, backend="native", **kwargs))
+    bus.port_handler = FakeWritePort()
+    bus.packet_handler = scs.PacketHandler()
+    bus.is_connected = True
+    return bus
+
+
+def test_write_registers_merges_adjacent_registers_and_skips_unchanged_motors():
+    bus = make_native_bus(write_tolerances={"Goal_Position": 2})
+    bus.write_registers({"Goal_Position": [1000, 2000, 3000], "Goal_Time": 0, "Goal_Speed": 100})
+    # A single sync write of the 6 bytes from Goal_Position to Goal_Speed
+    assert len(bus.port_handler.packets) == 1
+    assert bus.port_handler.packets[0][5:7] == bytes([42, 6])
+
+    bus.write("Goal_Position", [1001, 2000, 2999])
+    assert len(bus.port_handler.packets) == 1
+
+    bus.write("Goal_Position", [1001, 2010, 3000])
+    packet = bus.port_handler.packets[-1]
+    # Only servo_2 is sent: ID, then its 2 bytes
+    assert packet[3] == 7 and packet[7:10] == bytes([2, 0xDA, 0x07])
+
+    bus.invalidate_writes()
+    bus.write("Goal_Position", [1001, 2010, 3000])
+    assert bus.port_handler.packets[-1][3] == 13
+
+
+def test_write_uniform_values_with_broadcast():
+    bus = make_native_bus(broadcast_writes=True)
+    bus.write("Torque_Enable", 1)
+    payload = [0xFE, 4, 0x03, 40, 1]
+    assert bus.port_handler.packets == [bytes([0xFF, 0xFF, *payload, ~sum(payload) & 0xFF])]
+
+    # Differing values, or a subset of the motors, still need a sync write
+    bus.write("Torque_Enable", [1, 0, 1])
+    bus.write("Torque_Enable", 1, ["servo_1", "servo_2"])
+    assert [packet[4] for packet in bus.port_handler.packets[1:]] == [0x83, 0x83]
+
+
+def test_mock_backend_reads_back_written_values():
+    motors = {"shoulder": (1, "sts3215"), "knee": (2, "sts3215")}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port="/dev/null", motors=motors, mock=True))
+    assert motors_bus.backend == "mock"
+    motors_bus.connect()
+    assert motors_bus.scs.__name__ == "max_v1.tests.motors.mock_scservo_sdk"
+
+    motors_bus.write_registers({"Goal_Position": [1000, 3000], "Goal_Speed": 100})
+    np.testing.assert_array_equal(motors_bus.read("Goal_Position"), [1000, 3000])
+    np.testing.assert_array_equal(motors_bus.read("Goal_Speed"), [100, 100])
+    motors_bus.disconnect()
+
+
+def test_emergency_stop_disables_torque_and_blocks_transactions():
+    motors = {"shoulder": (1, "sts3215"), "knee": (2, "sts3215")}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port="/dev/null", motors=motors, mock=True))
+    motors_bus.connect()
+    motors_bus.write("Torque_Enable", 1)
+
+    assert motors_bus.emergency_stop() >= 0
+    with pytest.raises(EmergencyStopError):
+        motors_bus.read("Torque_Enable")
+    motors_bus.clear_emergency_stop()
+    np.testing.assert_array_equal(motors_bus.read("Torque_Enable"), [0, 0])
+    assert motors_bus.get_estop_stats()["count"] == 1
+    motors_bus.disconnect()
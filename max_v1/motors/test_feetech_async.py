@@ -0,0 +1,129 @@
+"""
+Tests of `AsyncFeetechMotorsBus` against the servos of `BusEmulator`, over a pty.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_feetech_async.py::test_two_buses_under_gather
+```
+"""
+
+import asyncio
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from max_v1.motors.emulator import BusEmulator, FaultConfig
+from max_v1.motors.feetech import EmergencyStopError, FeetechMotorsBusConfig
+from max_v1.motors.feetech_async import AsyncFeetechMotorsBus
+from max_v1.motors.retry import RetryPolicy
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="The emulator runs on a Linux pty")
+
+FRONT_IDS = [1, 2, 3]
+REAR_IDS = [7, 8, 9]
+
+
+def connect(emulator, motor_ids, **kwargs):
+    motors = {f"servo_{i}": (i, "sts3215") for i in motor_ids}
+    motors_bus = AsyncFeetechMotorsBus(FeetechMotorsBusConfig(emulator.port, motors, backend="native", **kwargs))
+    motors_bus.connect()
+    return motors_bus
+
+
+def test_two_buses_under_gather():
+    async def run(front_bus, rear_bus):
+        await asyncio.gather(
+            front_bus.write("Goal_Position", [100, 200, 300]), rear_bus.write("Goal_Position", [700, 800, 900])
+        )
+        front_goals, rear_goals = await asyncio.gather(
+            front_bus.read("Goal_Position"), rear_bus.read("Goal_Position")
+        )
+        front_state, rear_state = await asyncio.gather(front_bus.read_state(), rear_bus.read_state())
+        return front_goals, rear_goals, front_state, rear_state
+
+    with BusEmulator(FRONT_IDS) as front, BusEmulator(REAR_IDS) as rear:
+        front_bus = connect(front, FRONT_IDS)
+        rear_bus = connect(rear, REAR_IDS)
+        front_goals, rear_goals, front_state, rear_state = asyncio.run(run(front_bus, rear_bus))
+
+        np.testing.assert_array_equal(front_goals, [100, 200, 300])
+        np.testing.assert_array_equal(rear_goals, [700, 800, 900])
+        np.testing.assert_array_equal(front_state["Present_Temperature"], [30, 30, 30])
+        assert len(rear_state) == len(REAR_IDS)
+        assert rear.get_servo(8).get("Goal_Position") == 800
+        front_bus.disconnect()
+        rear_bus.disconnect()
+
+
+def test_read_times_out_without_replies():
+    async def run(motors_bus):
+        # Nothing was sent, so the wait ends at its deadline
+        start = time.perf_counter()
+        num_bytes = await motors_bus.reader.read_into(bytearray(8), 0.05)
+        elapsed_s = time.perf_counter() - start
+
+        with pytest.raises(ConnectionError):
+            await motors_bus.read("Present_Position")
+        return num_bytes, elapsed_s
+
+    with BusEmulator(FRONT_IDS) as emulator:
+        motors_bus = connect(emulator, FRONT_IDS, retry_policy=RetryPolicy(num_retry=3, budget_s=0.1))
+        emulator.faults = FaultConfig(drop_rate=1.0, seed=0)
+        num_bytes, elapsed_s = asyncio.run(run(motors_bus))
+
+        assert num_bytes == 0
+        assert 0.05 <= elapsed_s < 0.5
+        assert motors_bus.failure_stats.summary()["registers"]["Present_Position"]["failures"] == 1
+        motors_bus.disconnect()
+
+
+def test_emergency_stop_wakes_up_the_read():
+    async def run(motors_bus):
+        loop = asyncio.get_running_loop()
+        # None of the replies arrive anymore, and each try waits for seconds: only the abort pipe ends the wait early
+        loop.call_later(0.05, motors_bus.emergency_stop)
+        start = time.perf_counter()
+        with pytest.raises(EmergencyStopError):
+            await motors_bus.read("Present_Position")
+        return time.perf_counter() - start
+
+    with BusEmulator(FRONT_IDS) as emulator:
+        policy = RetryPolicy(num_retry=1000, budget_s=5.0, initial_timeout_s=5.0, max_timeout_s=5.0)
+        motors_bus = connect(emulator, FRONT_IDS, retry_policy=policy)
+        emulator.faults = FaultConfig(drop_rate=1.0, seed=0)
+        elapsed_s = asyncio.run(run(motors_bus))
+
+        assert elapsed_s < 0.5
+        assert [emulator.get_servo(i).get("Torque_Enable") for i in FRONT_IDS] == [0, 0, 0]
+        motors_bus.disconnect()
+
+
+def test_partial_reads_retry_the_missing_motor():
+    async def read_partial(motors_bus):
+        return await motors_bus.read_partial("Goal_Position"), await motors_bus.read_state_partial()
+
+    with BusEmulator(FRONT_IDS[:2]) as emulator:
+        motors_bus = connect(emulator, FRONT_IDS, retry_policy=RetryPolicy(budget_s=0.05))
+        emulator.get_servo(2).set("Goal_Position", 200)
+        partial, state_partial = asyncio.run(read_partial(motors_bus))
+        assert partial.valid.tolist() == [True, True, False]
+        assert partial.values[:2].tolist() == [0, 200]
+        assert state_partial.valid.tolist() == [True, True, False]
+
+        servo = emulator.add_servo(FRONT_IDS[2])
+        servo.set("Goal_Position", 300)
+        asyncio.run(motors_bus.retry_stale_motors(0.1))
+        assert partial.valid.all() and state_partial.valid.all()
+        assert partial.values.tolist() == [0, 200, 300]
+        assert state_partial.values["Present_Position"].tolist() == [2048] * 3
+        motors_bus.disconnect()
+
+
+def test_backend_must_be_native():
+    motors = {"servo_1": (1, "sts3215")}
+    with pytest.raises(ValueError, match="needs a native backend"):
+        AsyncFeetechMotorsBus(FeetechMotorsBusConfig("/dev/null", motors, backend="scservo_sdk"))
+    with pytest.raises(ValueError, match="does not support mocked motors"):
+        AsyncFeetechMotorsBus(FeetechMotorsBusConfig("/dev/null", motors, mock=True))
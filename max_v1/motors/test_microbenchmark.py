@@ -0,0 +1,31 @@
+"""
+Tests of the harness of the microbenchmarks of `FeetechMotorsBus`.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_microbenchmark.py::test_microbenchmarks_cover_the_baseline
+```
+"""
+
+import max_v1.motors.microbenchmark as microbenchmark
+
+
+def test_microbenchmarks_cover_the_baseline(monkeypatch):
+    monkeypatch.setattr(microbenchmark, "REPEAT_S", 0.0001)
+    monkeypatch.setattr(microbenchmark, "NUM_REPEATS", 1)
+    results = microbenchmark.run_microbenchmarks([6])
+
+    assert results["apply_calibration/6/calibrated"] > 0
+    assert "apply_calibration/6/raw" not in results
+    # Every function of the committed baseline is still benchmarked
+    baseline = microbenchmark.load_results(microbenchmark.BASELINE_PATH)
+    assert {key for key in baseline if "/6/" in key} <= results.keys()
+    assert "convert_to_bytes/6/raw" in baseline
+
+
+def test_compare_results_reports_slowdowns_above_threshold():
+    baseline = {"motor_names/6/raw": 100.0, "motor_names/12/raw": 200.0}
+    results = {"motor_names/6/raw": 120.0, "motor_names/12/raw": 300.0, "motor_names/48/raw": 1000.0}
+
+    regressions = microbenchmark.compare_results(results, baseline, threshold=0.25)
+    assert regressions == ["motor_names/12/raw: 200 -> 300 ns (+50.0%)"]
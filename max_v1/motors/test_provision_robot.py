@@ -0,0 +1,91 @@
+"""
+Tests of the batch provisioning of `provision_robot.py`, against the servos of `BusEmulator`.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_provision_robot.py::test_assign_id_changes_the_baud_rate_last
+```
+"""
+
+import sys
+
+import numpy as np
+import pytest
+
+from max_v1.motors.discovery import DiscoveredMotor
+from max_v1.motors.emulator import BusEmulator
+from max_v1.motors.feetech import SCS_SERIES_CONTROL_TABLE, FeetechMotorsBus, FeetechMotorsBusConfig
+from max_v1.motors.provision_robot import SETTINGS, assign_id, configure_and_verify, move_to_baudrate
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="The emulator runs on a Linux pty")
+
+TARGET_IDS = [1, 2, 3]
+TARGET_BAUDRATE = 1_000_000
+FACTORY_BAUDRATE = 500_000
+
+
+def connect(emulator):
+    motors = {f"servo_{i}": (i, "sts3215") for i in TARGET_IDS}
+    motor_bus = FeetechMotorsBus(FeetechMotorsBusConfig(emulator.port, motors, backend="native"))
+    motor_bus.connect()
+
+    # Like a real adapter, which finishes sending before the baud rate changes, the servos read all the bytes sent at a
+    # baud rate before the line switches to the next one
+    port_handler = motor_bus.port_handler
+    write_port, set_baudrate = port_handler.writePort, port_handler.setBaudRate
+    num_bytes_sent = 0
+
+    def counted_write_port(packet):
+        nonlocal num_bytes_sent
+        num_bytes_sent += len(packet)
+        return write_port(packet)
+
+    def set_baudrate_once_read(baudrate):
+        emulator.wait_until_read(num_bytes_sent)
+        set_baudrate(baudrate)
+
+    port_handler.writePort, port_handler.setBaudRate = counted_write_port, set_baudrate_once_read
+    return motor_bus
+
+
+def test_assign_id_changes_the_baud_rate_last():
+    with BusEmulator() as emulator:
+        servo = emulator.add_servo(1, FACTORY_BAUDRATE)
+        motor_bus = connect(emulator)
+
+        # The ID is written at the baud rate the servo was found at: if the baud rate was written first, the servo
+        # would not hear the ID anymore and keep the ID 1
+        assign_id(motor_bus, DiscoveredMotor(1, FACTORY_BAUDRATE, 777), 3, TARGET_BAUDRATE)
+        assert motor_bus.port_handler.getBaudRate() == TARGET_BAUDRATE
+        np.testing.assert_array_equal(motor_bus.read("ID", "servo_3"), [3])
+        assert servo.id == 3
+        assert servo.baudrate == TARGET_BAUDRATE
+        motor_bus.disconnect()
+
+
+def test_move_to_baudrate_moves_all_the_servos_at_once():
+    with BusEmulator(TARGET_IDS, baudrate=FACTORY_BAUDRATE) as emulator:
+        motor_bus = connect(emulator)
+        move_to_baudrate(motor_bus, TARGET_IDS, FACTORY_BAUDRATE, TARGET_BAUDRATE)
+
+        np.testing.assert_array_equal(motor_bus.read("ID"), TARGET_IDS)
+        assert [emulator.get_servo(i).baudrate for i in TARGET_IDS] == [TARGET_BAUDRATE] * 3
+        motor_bus.disconnect()
+
+
+def test_configure_and_verify_reads_back_the_settings():
+    with BusEmulator(TARGET_IDS) as emulator:
+        motor_bus = connect(emulator)
+        configure_and_verify(motor_bus, TARGET_IDS, TARGET_BAUDRATE)
+        for data_name, value in SETTINGS.items():
+            assert [emulator.get_servo(i).get(data_name) for i in TARGET_IDS] == [value] * 3
+
+        # A servo which does not keep a setting fails the verification
+        servo = emulator.get_servo(2)
+        servo.set("Maximum_Acceleration", 0)
+        addr, _ = SCS_SERIES_CONTROL_TABLE["Maximum_Acceleration"]
+        write = servo.write
+        servo.write = lambda address, data: None if address == addr else write(address, data)
+        with pytest.raises(OSError, match="servo 2: Maximum_Acceleration=0 instead of 254"):
+            configure_and_verify(motor_bus, TARGET_IDS, TARGET_BAUDRATE)
+        motor_bus.disconnect()
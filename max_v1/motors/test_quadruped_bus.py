@@ -0,0 +1,102 @@
+"""
+Tests of `QuadrupedBus`, with the mocked sdk and with one `BusEmulator` per bus.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_quadruped_bus.py::test_synchronized_write_commits_both_buses
+```
+"""
+
+import json
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from max_v1.motors.emulator import BusEmulator
+from max_v1.motors.quadruped_bus import QuadrupedBus
+
+FRONT_IDS = [1, 2, 3, 4, 5, 6]
+REAR_IDS = [7, 8, 9, 10, 11, 12]
+
+
+def write_config(tmp_path, front_port, rear_port):
+    path = tmp_path / "servo_config.json"
+    config = {
+        "front_servo_ids": FRONT_IDS,
+        "rear_servo_ids": REAR_IDS,
+        "front_servo_port": front_port,
+        "rear_servo_port": rear_port,
+    }
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="The emulator runs on a Linux pty")
+def test_write_slices_and_read_state_concatenates(tmp_path):
+    with BusEmulator(FRONT_IDS) as front, BusEmulator(REAR_IDS) as rear:
+        quadruped = QuadrupedBus(write_config(tmp_path, front.port, rear.port), backend="native")
+        quadruped.connect()
+        assert quadruped.motor_names == [f"servo_{i}" for i in FRONT_IDS + REAR_IDS]
+
+        quadruped.write("Torque_Enable", 1)
+        goals = 1000 + np.arange(12) * 10
+        quadruped.write("Goal_Position", goals)
+        # Each bus only gets the values of its own motors
+        assert [front.get_servo(i).get("Goal_Position") for i in FRONT_IDS] == list(goals[:6])
+        assert [rear.get_servo(i).get("Goal_Position") for i in REAR_IDS] == list(goals[6:])
+
+        start = time.monotonic()
+        state = quadruped.read_state()
+        np.testing.assert_array_equal(state["Present_Position"], goals)
+        np.testing.assert_array_equal(state["timestamp"][:6], quadruped.timestamps[0])
+        np.testing.assert_array_equal(state["timestamp"][6:], quadruped.timestamps[1])
+        assert start <= state["timestamp"].min() and state["timestamp"].max() <= time.monotonic()
+        quadruped.disconnect()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="The emulator runs on a Linux pty")
+def test_failed_connect_releases_the_connected_bus(tmp_path):
+    with BusEmulator(FRONT_IDS) as front:
+        quadruped = QuadrupedBus(write_config(tmp_path, front.port, "loop://missing_rear_bus"), backend="native")
+        with pytest.raises(OSError):
+            quadruped.connect()
+
+        assert not quadruped.is_connected
+        assert not quadruped.buses["front"].is_connected
+        assert quadruped.executors == {}
+        # The front port was released, so that connecting again can succeed once the rear bus is available
+        assert quadruped.buses["front"].port_handler is None
+
+
+def test_write_synchronized_with_mock(tmp_path):
+    quadruped = QuadrupedBus(write_config(tmp_path, "/dev/null", "/dev/null"), mock=True)
+    quadruped.connect()
+    goals = np.arange(12) * 100
+
+    quadruped.stage_write("Goal_Position", goals)
+    np.testing.assert_array_equal(quadruped.read("Goal_Position"), np.zeros(12))
+    assert quadruped.commit() >= 0
+    np.testing.assert_array_equal(quadruped.read("Goal_Position"), goals)
+    assert quadruped.get_commit_stats()["count"] == 1
+    quadruped.disconnect()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="The emulator runs on a Linux pty")
+def test_synchronized_write_commits_both_buses(tmp_path):
+    with BusEmulator(FRONT_IDS) as front, BusEmulator(REAR_IDS) as rear:
+        quadruped = QuadrupedBus(write_config(tmp_path, front.port, rear.port), backend="native")
+        quadruped.connect()
+        goals = 1000 + np.arange(12)
+
+        quadruped.stage_write("Goal_Position", goals)
+        servos = [front.get_servo(i) for i in FRONT_IDS] + [rear.get_servo(i) for i in REAR_IDS]
+        assert [servo.get("Goal_Position") for servo in servos] == [0] * 12
+
+        for _ in range(5):
+            skew_s = quadruped.write_synchronized("Goal_Position", goals)
+            assert 0 <= skew_s < 0.01
+        np.testing.assert_array_equal(quadruped.read("Goal_Position"), goals)
+        assert quadruped.get_commit_stats()["count"] == 5
+        quadruped.disconnect()
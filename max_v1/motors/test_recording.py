@@ -0,0 +1,104 @@
+"""
+Tests of the record and replay of the traffic of `FeetechMotorsBus`, recorded on the servos of `BusEmulator`.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_recording.py::test_replay_returns_the_recorded_values
+```
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from max_v1.motors.emulator import BusEmulator
+from max_v1.motors.feetech import FeetechMotorsBus, FeetechMotorsBusConfig
+from max_v1.motors.recording import BAUD, RX, TX, ReplayMismatchError, read_recording
+from max_v1.motors.retry import RetryPolicy
+
+MOTOR_IDS = [1, 2, 3]
+# Waits long enough for every reply, even on a loaded machine, so that no try is repeated while recording or
+# replaying, which would shift the transactions of the replay
+PATIENT_POLICY = RetryPolicy(budget_s=2.0, initial_timeout_s=0.5, min_timeout_s=0.5, max_timeout_s=1.0)
+
+
+def connect(port, **kwargs):
+    motors = {f"servo_{i}": (i, "sts3215") for i in MOTOR_IDS}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port, motors, backend="native", **kwargs))
+    motors_bus.connect()
+    return motors_bus
+
+
+def run_ticks(motors_bus, num_ticks=5):
+    positions = []
+    for i in range(num_ticks):
+        motors_bus.write("Goal_Position", [100 * i, 200 * i, 300 * i])
+        positions.append(motors_bus.read("Present_Position"))
+    return np.array(positions)
+
+
+def record(path, num_ticks=5, baudrate=1_000_000):
+    emulator = BusEmulator(MOTOR_IDS, baudrate=baudrate)
+    port = emulator.start(loopback=str(path))
+    try:
+        motors_bus = connect(port, record_path=str(path), retry_policy=PATIENT_POLICY)
+        motors_bus.set_bus_baudrate(baudrate)
+        motors_bus.write("Torque_Enable", 1)
+        positions = run_ticks(motors_bus, num_ticks)
+        motors_bus.disconnect()
+    finally:
+        emulator.stop()
+    return positions
+
+
+def test_recording_has_one_transaction_per_packet(tmp_path):
+    path = tmp_path / "bus.ftrc"
+    record(path, num_ticks=3)
+    records = read_recording(path)
+
+    assert records[0].kind == BAUD
+    timestamps = [record.timestamp_ns for record in records]
+    assert timestamps == sorted(timestamps)
+    requests = [record for record in records if record.kind == TX]
+    # Torque_Enable, then a write and a read per tick
+    assert [record.transaction_id for record in requests] == list(range(1, 8))
+    assert all(record.payload.startswith(b"\xff\xff") for record in requests)
+    responses = b"".join(record.payload for record in records if record.kind == RX and record.transaction_id == 7)
+    assert len(responses) == len(MOTOR_IDS) * (6 + 2)
+
+
+def test_replay_returns_the_recorded_values(tmp_path):
+    path = tmp_path / "bus.ftrc"
+    positions = record(path)
+
+    motors_bus = connect(f"replay://{path}?speed=0")
+    motors_bus.write("Torque_Enable", 1)
+    np.testing.assert_array_equal(run_ticks(motors_bus), positions)
+    assert motors_bus.port_handler.ser.mismatches == []
+    with pytest.raises(EOFError):
+        motors_bus.read("Present_Position")
+    motors_bus.disconnect()
+
+
+def test_replay_at_recorded_speed(tmp_path):
+    # At 19200 baud, the response of a sync read of 3 motors takes several milliseconds on the wire
+    path = tmp_path / "bus.ftrc"
+    record(path, num_ticks=3, baudrate=19200)
+
+    motors_bus = connect(f"replay://{path}", retry_policy=PATIENT_POLICY)
+    motors_bus.write("Torque_Enable", 1)
+    start = time.perf_counter()
+    run_ticks(motors_bus, num_ticks=3)
+    assert time.perf_counter() - start >= 3 * len(MOTOR_IDS) * (6 + 2) * 10 / 19200
+    motors_bus.disconnect()
+
+
+def test_strict_replay_detects_divergence(tmp_path):
+    path = tmp_path / "bus.ftrc"
+    record(path)
+
+    motors_bus = connect(f"replay://{path}?speed=0&strict=1")
+    with pytest.raises(ReplayMismatchError):
+        motors_bus.write("Torque_Enable", 0)
+    motors_bus.disconnect()
@@ -0,0 +1,176 @@
+"""
+Tests for the retry policy and failure statistics of `FeetechMotorsBus`, with a scripted sync read group.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_retry.py::test_read_fails_within_budget
+```
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+import max_v1.motors.codec as scs
+from max_v1.motors.feetech import FeetechMotorsBus, FeetechMotorsBusConfig
+from max_v1.motors.retry import RetryPolicy, RttEstimator
+
+
+class FakePortHandler:
+    def __init__(self):
+        self.timeouts_ms = []
+
+    def setPacketTimeoutMillis(self, msec):
+        self.timeouts_ms.append(msec)
+
+    def closePort(self):
+        pass
+
+
+class FakeGroupSyncRead:
+    """Replies of all motors but those of `missing`, which time out after the packet timeout."""
+
+    def __init__(self, port_handler, num_motors, missing=(), rtt_s=0.0):
+        self.port_handler = port_handler
+        self.valid = np.ones(num_motors, dtype=bool)
+        self.valid[list(missing)] = False
+        self.rtt_s = rtt_s
+
+    def txPacket(self):
+        return scs.COMM_SUCCESS
+
+    def rxPacket(self):
+        if self.valid.all():
+            time.sleep(self.rtt_s)
+            return scs.COMM_SUCCESS
+        time.sleep(self.port_handler.timeouts_ms[-1] / 1000)
+        return scs.COMM_RX_TIMEOUT
+
+
+def make_bus(retry_policy):
+    motors = {f"servo_{i}": (i, "sts3215") for i in range(1, 4)}
+    bus = FeetechMotorsBus(FeetechMotorsBusConfig(port="/dev/null", motors=motors, retry_policy=retry_policy))
+    bus.port_handler = FakePortHandler()
+    return bus
+
+
+def test_retry_policy_timeout_follows_rtt():
+    policy = RetryPolicy(initial_timeout_s=0.02, min_timeout_s=0.001, max_timeout_s=0.1, rtt_margin=4.0)
+    estimator = RttEstimator()
+    assert policy.get_timeout(estimator, 0) == pytest.approx(0.02)
+
+    for _ in range(50):
+        estimator.update(0.002)
+    assert estimator.srtt == pytest.approx(0.002)
+    assert policy.get_timeout(estimator, 0) == pytest.approx(0.002, abs=1e-4)
+    # Exponential backoff after each failed try, up to `max_timeout_s`
+    assert policy.get_timeout(estimator, 2) == pytest.approx(0.008, abs=4e-4)
+    assert policy.get_timeout(estimator, 10) == 0.1
+
+
+def test_read_fails_within_budget():
+    bus = make_bus(RetryPolicy(num_retry=20, budget_s=0.03, initial_timeout_s=0.005))
+    group = FakeGroupSyncRead(bus.port_handler, 3, missing=[1])
+
+    start = time.perf_counter()
+    comm, num_tries, motor_failures = bus.txrx_group(scs, group, 2, [1, 2, 3])
+    elapsed = time.perf_counter() - start
+
+    assert comm == scs.COMM_RX_TIMEOUT
+    assert 1 < num_tries < 20
+    assert elapsed < 0.03 + 0.05
+    np.testing.assert_array_equal(motor_failures, [0, num_tries, 0])
+
+    bus.record_failures("Present_Position", bus.motor_names, False, num_tries, motor_failures)
+    summary = bus.failure_stats.summary()
+    assert summary["motors"]["servo_2"]["consecutive_failures"] == num_tries
+    assert summary["motors"]["servo_1"]["failures"] == 0
+    assert summary["registers"]["Present_Position"] == {
+        "transactions": 1,
+        "retries": num_tries - 1,
+        "failures": 1,
+    }
+
+
+def test_read_success_resets_consecutive_failures():
+    bus = make_bus(RetryPolicy())
+    bus.failure_stats.motor_consecutive_failures[:] = [0, 5, 0]
+
+    group = FakeGroupSyncRead(bus.port_handler, 3)
+    comm, num_tries, motor_failures = bus.txrx_group(scs, group, 2, [1, 2, 3])
+    assert comm == scs.COMM_SUCCESS
+    assert num_tries == 1
+    assert bus.get_rtt_estimator(2, 3).srtt is not None
+
+    bus.record_failures("Present_Position", None, True, num_tries, motor_failures)
+    np.testing.assert_array_equal(bus.failure_stats.motor_consecutive_failures, [0, 0, 0])
+    np.testing.assert_array_equal(bus.failure_stats.motor_transactions, [1, 1, 1])
+
+
+class FakeValuesGroup:
+    """Native sync read group whose motors reply with `values`, except the motors of `missing`."""
+
+    def __init__(self, values, missing=()):
+        self.values = np.array(values)
+        self.valid = np.ones(len(values), dtype=bool)
+        self.valid[list(missing)] = False
+
+    def txPacket(self):
+        return scs.COMM_SUCCESS
+
+    def rxPacket(self):
+        return scs.COMM_SUCCESS if self.valid.all() else scs.COMM_RX_TIMEOUT
+
+    def getValues(self, address=None, data_length=None):
+        return self.values
+
+
+def test_read_partial_retries_missing_motor_individually():
+    bus = make_bus(RetryPolicy(budget_s=0.05, initial_timeout_s=0.001))
+    bus.backend = "native"
+    bus.packet_handler = scs.PacketHandler()
+    bus.is_connected = True
+    bus.group_readers[("Present_Speed", tuple(bus.motor_names))] = FakeValuesGroup([10, 20, 30], missing=[1, 2])
+    # servo_2 replies when read alone, servo_3 does not
+    bus.group_readers[("Present_Speed", ("servo_1",))] = FakeValuesGroup([11], missing=[0])
+    bus.group_readers[("Present_Speed", ("servo_2",))] = FakeValuesGroup([21])
+    bus.group_readers[("Present_Speed", ("servo_3",))] = FakeValuesGroup([31], missing=[0])
+
+    partial = bus.read_partial("Present_Speed")
+    np.testing.assert_array_equal(partial.values, [10, 21, 0])
+    np.testing.assert_array_equal(partial.valid, [True, True, False])
+    np.testing.assert_array_equal(partial.age, [0, 0, 1])
+
+    # The group now fails altogether, the latest values are kept and aged
+    bus.group_readers[("Present_Speed", tuple(bus.motor_names))].valid[:] = False
+    bus.group_readers[("Present_Speed", ("servo_2",))].valid[:] = False
+    assert bus.read_partial("Present_Speed", budget_s=0.01) is partial
+    np.testing.assert_array_equal(partial.values, [10, 21, 0])
+    np.testing.assert_array_equal(partial.valid, [False, False, False])
+    np.testing.assert_array_equal(partial.age, [1, 1, 2])
+
+    # servo_3 comes back, and is caught up outside of the group read
+    bus.group_readers[("Present_Speed", ("servo_3",))].valid[:] = True
+    bus.group_readers[("Present_Speed", ("servo_3",))].values[:] = 32
+    bus.retry_stale_motors(0.01)
+    np.testing.assert_array_equal(partial.values, [10, 21, 32])
+    np.testing.assert_array_equal(partial.age, [1, 1, 0])
+
+
+class FailedTxGroup(FakeValuesGroup):
+    """Group whose request cannot be sent, while `valid` is still the mask of a previous read."""
+
+    def txPacket(self):
+        return scs.COMM_TX_FAIL
+
+
+def test_transmit_failure_counts_every_motor():
+    bus = make_bus(RetryPolicy(num_retry=3, budget_s=0.05, initial_timeout_s=0.001))
+    bus.backend = "native"
+    group = FailedTxGroup([10, 20, 30], missing=[1])
+
+    comm, num_tries, motor_failures = bus.txrx_group(scs, group, 2, [1, 2, 3])
+    assert comm == scs.COMM_TX_FAIL
+    np.testing.assert_array_equal(motor_failures, [num_tries] * 3)
+    np.testing.assert_array_equal(bus.get_valid_mask(group, comm, 3), [False, False, False])
@@ -0,0 +1,78 @@
+"""
+Tests of `BusScheduler` on the servos of `BusEmulator`.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_scheduler.py::test_background_streams_use_the_slack
+```
+"""
+
+import pytest
+
+from max_v1.motors.emulator import BusEmulator
+from max_v1.motors.feetech import FeetechMotorsBus, FeetechMotorsBusConfig
+from max_v1.motors.scheduler import STATE_STREAM, BusScheduler
+
+MOTOR_IDS = [1, 2, 3, 4]
+
+
+@pytest.fixture
+def motors_bus():
+    emulator = BusEmulator(MOTOR_IDS)
+    port = emulator.start(loopback=f"test_scheduler_{id(emulator)}")
+    motors = {f"servo_{i}": (i, "sts3215") for i in MOTOR_IDS}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port, motors, backend="native"))
+    motors_bus.connect()
+    yield motors_bus
+    motors_bus.disconnect()
+    emulator.stop()
+
+
+def run_ticks(scheduler, num_ticks, budget_s=None):
+    for _ in range(num_ticks):
+        state = scheduler.poll_control()["state"]
+        scheduler.write("Goal_Position", state["Present_Position"])
+        scheduler.poll_background(budget_s)
+
+
+def test_background_streams_use_the_slack(motors_bus):
+    scheduler = BusScheduler(motors_bus, tick_hz=100)
+    scheduler.add_stream("state", STATE_STREAM, rate_hz=100)
+    scheduler.add_stream("temperature", "Present_Temperature", rate_hz=10, priority=1)
+    scheduler.add_stream("voltage", "Present_Voltage", rate_hz=5, priority=2, motor_names=["servo_1"])
+    run_ticks(scheduler, 20)
+
+    utilization = scheduler.get_utilization()
+    streams = utilization["streams"]
+    assert [streams[name]["num_reads"] for name in ["state", "temperature", "voltage"]] == [20, 2, 1]
+    assert streams["temperature"]["num_deferred"] == 0
+    assert scheduler.results["voltage"].shape == (1,)
+    assert scheduler.results["temperature"].shape == (len(MOTOR_IDS),)
+    assert 0 < utilization["utilization"] < 1
+    assert utilization["write_bytes_per_tick"] == 6 + 2 + len(MOTOR_IDS) * 3
+
+
+def test_control_streams_are_never_deferred(motors_bus):
+    # At 1000 ticks per second, the state block of 4 motors alone exceeds the byte budget of a tick
+    scheduler = BusScheduler(motors_bus, tick_hz=1000)
+    scheduler.add_stream("state", STATE_STREAM, rate_hz=1000)
+    scheduler.add_stream("temperature", "Present_Temperature", rate_hz=100, priority=1)
+    run_ticks(scheduler, 20)
+
+    streams = scheduler.get_utilization()["streams"]
+    assert streams["state"]["num_reads"] == 20
+    assert streams["temperature"]["num_reads"] == 0
+    assert streams["temperature"]["num_deferred"] == 20
+
+
+def test_background_streams_fit_in_the_idle_time(motors_bus):
+    scheduler = BusScheduler(motors_bus, tick_hz=100)
+    scheduler.add_stream("state", STATE_STREAM, rate_hz=100)
+    scheduler.add_stream("temperature", "Present_Temperature", rate_hz=100, priority=1)
+    run_ticks(scheduler, 3, budget_s=0)
+    assert scheduler.streams["temperature"].num_reads == 0
+    run_ticks(scheduler, 3, budget_s=0.1)
+    assert scheduler.streams["temperature"].num_reads == 3
+
+    with pytest.raises(ValueError):
+        scheduler.add_stream("position", "Present_Position", rate_hz=200)
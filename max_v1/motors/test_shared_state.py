@@ -0,0 +1,133 @@
+"""
+Tests of the shared-memory joint state and command channels of `FeetechMotorsBus`, with the servos of `BusEmulator`.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_shared_state.py::test_other_process_reads_state_and_pushes_goals
+```
+"""
+
+import asyncio
+import multiprocessing
+import os
+
+import numpy as np
+import pytest
+
+from max_v1.motors.emulator import BusEmulator
+from max_v1.motors.feetech import FeetechMotorsBus, FeetechMotorsBusConfig
+from max_v1.motors.feetech_async import AsyncFeetechMotorsBus
+from max_v1.motors.shared_state import SharedCommandRing, SharedJointState
+
+MOTOR_IDS = [1, 2, 3]
+
+
+def get_name(test_name):
+    return f"{test_name}_{os.getpid()}"
+
+
+def test_joint_state_is_read_by_attached_blocks():
+    state = SharedJointState(get_name("state"), ["a", "b", "c"])
+    attached = SharedJointState.attach(state.name)
+    assert attached.motor_names == ["a", "b", "c"]
+    assert np.isnan(attached.read()["position"]).all()
+
+    state.publish({"position": [1.0, 2.0], "load": [5.0, 6.0]}, slice(0, 2), timestamp=10.0)
+    state.publish({"velocity": [3.0]}, np.array([2]), timestamp=11.0)
+    snapshot = attached.read()
+    np.testing.assert_array_equal(snapshot["position"][:2], [1.0, 2.0])
+    np.testing.assert_array_equal(snapshot["velocity"][2], 3.0)
+    np.testing.assert_array_equal(snapshot["timestamp"], [10.0, 10.0, 11.0])
+    assert attached.num_updates == 2
+
+    attached.close()
+    state.close()
+
+
+def test_reader_times_out_when_the_writer_died_mid_publish():
+    state = SharedJointState(get_name("dead_writer"), ["a", "b"])
+    attached = SharedJointState.attach(state.name)
+    # The writer stopped between the two increments of the sequence number of `publish`
+    state.seq[0] += 1
+    with pytest.raises(TimeoutError, match="may have died during a publish"):
+        attached.read(timeout_s=0.05)
+    attached.close()
+    state.close()
+
+
+def test_command_ring_is_bounded_and_merges_goals():
+    ring = SharedCommandRing(get_name("ring"), num_motors=2, capacity=2)
+    producer = SharedCommandRing.attach(ring.name)
+    assert ring.pop() is None
+
+    assert producer.push([1.0, np.nan])
+    assert producer.push([np.nan, 2.0])
+    assert not producer.push([3.0, 3.0])
+    np.testing.assert_array_equal(ring.pop_latest(), [1.0, 2.0])
+    assert len(ring) == 0
+
+    # The slots are reused once popped
+    assert producer.push([4.0, 4.0])
+    np.testing.assert_array_equal(ring.pop(), [4.0, 4.0])
+    producer.close()
+    ring.close()
+
+
+def run_other_process(state_name, commands_name, queue):
+    state = SharedJointState.attach(state_name)
+    queue.put(state.read()["position"].tolist())
+    commands = SharedCommandRing.attach(commands_name)
+    commands.push([100.0, np.nan, 300.0])
+    state.close()
+    commands.close()
+
+
+def test_other_process_reads_state_and_pushes_goals():
+    emulator = BusEmulator(MOTOR_IDS)
+    port = emulator.start(loopback="test_shared_state")
+    motors = {f"servo_{i}": (i, "sts3215") for i in MOTOR_IDS}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port, motors, backend="native"))
+    motors_bus.connect()
+    try:
+        motors_bus.share_state(get_name("bus_state"))
+        motors_bus.share_commands(get_name("bus_commands"))
+        assert not motors_bus.apply_shared_commands()
+        motors_bus.write("Torque_Enable", 1)
+        motors_bus.read_state()
+
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        process = context.Process(
+            target=run_other_process, args=(motors_bus.shared_state.name, motors_bus.shared_commands.name, queue)
+        )
+        process.start()
+        assert queue.get(timeout=10) == [2048.0, 2048.0, 2048.0]
+        process.join(10)
+        assert process.exitcode == 0
+
+        assert motors_bus.apply_shared_commands()
+        # Motor 2 was not commanded and keeps its goal
+        np.testing.assert_array_equal(motors_bus.read("Goal_Position"), [100, 0, 300])
+        motors_bus.read("Present_Position", ["servo_1", "servo_3"])
+        np.testing.assert_array_equal(motors_bus.shared_state.read()["position"], [100, 2048, 300])
+    finally:
+        motors_bus.disconnect()
+        emulator.stop()
+    assert motors_bus.shared_state is None
+
+
+def test_async_bus_awaits_the_shared_goals():
+    emulator = BusEmulator(MOTOR_IDS)
+    port = emulator.start(loopback="test_shared_state_async")
+    motors = {f"servo_{i}": (i, "sts3215") for i in MOTOR_IDS}
+    motors_bus = AsyncFeetechMotorsBus(FeetechMotorsBusConfig(port, motors, backend="native"))
+    motors_bus.connect()
+    try:
+        commands = motors_bus.share_commands(get_name("async_bus_commands"))
+        commands.push([np.nan, 200.0, np.nan])
+        assert asyncio.run(motors_bus.apply_shared_commands())
+        assert len(commands) == 0
+        np.testing.assert_array_equal(asyncio.run(motors_bus.read("Goal_Position")), [0, 200, 0])
+    finally:
+        motors_bus.disconnect()
+        emulator.stop()
@@ -0,0 +1,51 @@
+import numpy as np
+
+from max_v1.motors.telemetry import TelemetryRecorder
+
+
+def test_telemetry_channel_wraps_around():
+    recorder = TelemetryRecorder(capacity=4)
+    group_key = ("Present_Position", ("servo_1", "servo_2"))
+    for i in range(6):
+        recorder.record("read", group_key, 100.0 + i, 0.001 * i, i % 2, np.array([i, -i]))
+
+    channel = recorder.get_channel("read", "Present_Position")
+    assert len(channel) == 4
+    values = channel.values
+    snapshot = channel.snapshot()
+    np.testing.assert_array_equal(snapshot["timestamp_utc"], [102, 103, 104, 105])
+    np.testing.assert_array_equal(snapshot["retries"], [0, 1, 0, 1])
+    np.testing.assert_array_equal(snapshot["values"][:, 1], [-2, -3, -4, -5])
+    assert channel.latest()["retries"] == 1
+
+    # Recording reuses the buffers allocated on the first record
+    recorder.record("read", group_key, 106.0, 0.0, 0, np.array([6, -6]))
+    assert channel.values is values
+    assert recorder.get_channel("write") is None
+
+
+def test_telemetry_export(tmp_path):
+    recorder = TelemetryRecorder(capacity=8)
+    recorder.record("write", ("Goal_Position", ("servo_1",)), 1.0, 0.002, 0, np.array([2048]))
+    recorder.export(tmp_path / "telemetry.npz")
+
+    with np.load(tmp_path / "telemetry.npz") as data:
+        np.testing.assert_array_equal(data["write/Goal_Position/servo_1/values"], [[2048]])
+        np.testing.assert_array_equal(data["write/Goal_Position/servo_1/duration_s"], [0.002])
+
+
+def test_telemetry_channel_follows_the_dtype_of_the_values():
+    recorder = TelemetryRecorder(capacity=4)
+    group_key = ("Present_Position", ("servo_1",))
+    # Raw steps, then degrees once the calibration is set
+    recorder.record("read", group_key, 1.0, 0.001, 0, np.array([2048], dtype=np.int32))
+    recorder.record("read", group_key, 2.0, 0.001, 0, np.array([90.5], dtype=np.float32))
+
+    snapshot = recorder.get_channel("read", "Present_Position").snapshot()
+    np.testing.assert_array_equal(snapshot["values"], [[2048.0], [90.5]])
+
+    # Values of another shape cannot be kept with the previous ones
+    recorder.record("read", group_key, 3.0, 0.001, 0, np.array([1.0, 2.0]))
+    snapshot = recorder.get_channel("read", "Present_Position").snapshot()
+    np.testing.assert_array_equal(snapshot["timestamp_utc"], [3.0])
+    np.testing.assert_array_equal(snapshot["values"], [[1.0, 2.0]])
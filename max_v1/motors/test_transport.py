@@ -0,0 +1,114 @@
+"""
+Tests of the transports of `codec.PortHandler`, with the servos of `BusEmulator`.
+
+Example of running a specific test:
+```bash
+pytest -sx max_v1/motors/test_transport.py::test_bus_over_loopback
+```
+"""
+
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from max_v1.motors.emulator import BusEmulator
+from max_v1.motors.feetech import FeetechMotorsBus, FeetechMotorsBusConfig
+from max_v1.motors.retry import RetryPolicy
+from max_v1.motors.transport import SocketTransport, open_transport, parse_port
+
+MOTOR_IDS = [1, 2, 3]
+
+
+def connect(port, **kwargs):
+    motors = {f"servo_{i}": (i, "sts3215") for i in MOTOR_IDS}
+    motors_bus = FeetechMotorsBus(FeetechMotorsBusConfig(port, motors, backend="native", **kwargs))
+    motors_bus.connect()
+    return motors_bus
+
+
+def test_parse_port():
+    assert parse_port("/dev/ttyACM0") == ("serial", "/dev/ttyACM0")
+    assert parse_port("fd:///dev/ttyACM0") == ("fd", "/dev/ttyACM0")
+    assert parse_port("tcp://localhost:2000") == ("tcp", "localhost:2000")
+    with pytest.raises(ValueError):
+        open_transport("rfc2217://localhost:2000", 1_000_000)
+
+
+def test_bus_over_loopback():
+    emulator = BusEmulator(MOTOR_IDS)
+    port = emulator.start(loopback="test_bus_over_loopback")
+    try:
+        motors_bus = connect(port)
+        motors_bus.write("Goal_Speed", [10, 20, 30])
+        np.testing.assert_array_equal(motors_bus.read("Goal_Speed"), [10, 20, 30])
+        assert motors_bus.read_state()["Present_Position"].tolist() == [2048, 2048, 2048]
+        motors_bus.disconnect()
+    finally:
+        emulator.stop()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Raw file descriptors are only supported on Linux")
+def test_bus_over_raw_fd_follows_baud_rate():
+    with BusEmulator(MOTOR_IDS, baudrate=128_000) as emulator:
+        motors_bus = connect(f"fd://{emulator.port}", retry_policy=RetryPolicy(budget_s=0.02, initial_timeout_s=0.005))
+        # The servos only answer at their baud rate, which has no termios constant
+        with pytest.raises(ConnectionError):
+            motors_bus.read("ID")
+        motors_bus.set_bus_baudrate(128_000)
+        np.testing.assert_array_equal(motors_bus.read("ID"), MOTOR_IDS)
+        motors_bus.disconnect()
+
+
+def test_socket_transport_to_gateway():
+    path = os.path.join(tempfile.mkdtemp(), "gateway.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+
+    def echo():
+        conn, _ = server.accept()
+        while data := conn.recv(1024):
+            conn.sendall(data)
+        conn.close()
+
+    thread = threading.Thread(target=echo, daemon=True)
+    thread.start()
+
+    transport = open_transport(f"unix://{path}", 1_000_000)
+    assert isinstance(transport, SocketTransport)
+    assert transport.read(10) == b""
+    transport.write(b"\xff\xff\x01")
+    deadline = time.monotonic() + 1
+    while transport.in_waiting < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    assert transport.read(10) == b"\xff\xff\x01"
+
+    transport.write(b"stale")
+    time.sleep(0.01)
+    transport.reset_input_buffer()
+    assert transport.in_waiting == 0
+    transport.close()
+    thread.join(1)
+    server.close()
+
+
+
+def test_socket_transport_reports_the_closed_gateway():
+    bus_end, gateway_end = socket.socketpair()
+    transport = SocketTransport("gateway", 1_000_000, sock=bus_end)
+    assert transport.read(10) == b""
+
+    # The gateway stops sending, e.g. its serial port was unplugged: the requests are still accepted, but no reply
+    # will ever come
+    gateway_end.shutdown(socket.SHUT_WR)
+    transport.write(b"\xff\xff\x01")
+    with pytest.raises(ConnectionError, match="closed the connection"):
+        transport.read(10)
+    transport.close()
+    gateway_end.close()
@@ -0,0 +1,271 @@
+"""Transports carrying the bytes of the Feetech protocol for `codec.PortHandler`, i.e. for the "native" and
+"emulator" backends of `FeetechMotorsBus`. The bus logic is the same whatever the transport.
+
+The transport is chosen from the scheme of the port name:
+- "/dev/ttyACM0", "COM3" or "serial:///dev/ttyACM0": pyserial,
+- "fd:///dev/ttyACM0": raw file descriptor set up with termios, in raw mode and with the low latency flag of the
+  USB-serial driver, read without the pyserial layer (`FdTransport`),
+- "tcp://host:port" or "unix:///run/servo.sock": socket to a serial gateway, e.g. ser2net, which sets the baud rate of
+  the serial port on its side (`SocketTransport`),
+- "loop://name": in-memory loopback whose other end is served in the same process, created with `create_loopback`,
+  e.g. by `BusEmulator.start(loopback="name")` (`LoopbackTransport`).
+- "replay://path": responses of a recording of the bus, see `max_v1.motors.recording` (`ReplayTransport`).
+
+Transports are non-blocking and implement the subset of the pyserial interface used by `codec.PortHandler`:
+`read`, `write`, `fileno` (to wait with `select`), `in_waiting`, `reset_input_buffer`, `reset_output_buffer`,
+`baudrate` and `close`. Other transports can be added with `register_transport`.
+
+Example of usage:
+```python
+config = FeetechMotorsBusConfig(port="fd:///dev/ttyACM0", motors=motors, backend="native")
+motors_bus = FeetechMotorsBus(config)
+motors_bus.connect()
+```
+"""
+
+import os
+import select
+import socket
+import struct
+import sys
+
+# Linux ioctls of the serial drivers, see `linux/serial.h` and `asm-generic/ioctls.h`
+TIOCGSERIAL = 0x541E
+TIOCSSERIAL = 0x541F
+ASYNC_LOW_LATENCY = 1 << 13
+# Offset of `flags` in `struct serial_struct`, after `type`, `line`, `port` and `irq`
+SERIAL_FLAGS_OFFSET = 16
+SERIAL_STRUCT_SIZE = 72
+# `struct termios2`, to set baud rates without a termios constant (e.g. 128000)
+TCGETS2 = 0x802C542A
+TCSETS2 = 0x402C542B
+TERMIOS2_FORMAT = "4I20s2I"
+CBAUD = 0o010017
+BOTHER = 0o010000
+
+# Ends of the loopbacks created with `create_loopback` which are not connected yet, by name
+LOOPBACKS = {}
+
+
+def parse_port(port: str) -> tuple[str, str]:
+    """`(scheme, address)` of a port name, with "serial" for plain device names."""
+    scheme, separator, address = port.partition("://")
+    if not separator:
+        return "serial", port
+    return scheme, address
+
+
+def open_serial(address: str, baudrate: int):
+    import serial
+
+    # Non blocking reads, waiting for bytes is done with `select`
+    return serial.Serial(port=address, baudrate=baudrate, bytesize=serial.EIGHTBITS, timeout=0)
+
+
+def write_all(fd: int, data) -> int:
+    """Write all of `data` to the non-blocking `fd`, waiting for it to be writable when its buffer is full."""
+    view = memoryview(data)
+    num_bytes = 0
+    while num_bytes < len(view):
+        try:
+            num_bytes += os.write(fd, view[num_bytes:])
+        except BlockingIOError:
+            select.select([], [fd], [])
+    return num_bytes
+
+
+def read_available(fd: int, size: int) -> bytes:
+    try:
+        return os.read(fd, size)
+    except BlockingIOError:
+        return b""
+
+
+def get_in_waiting(fd: int) -> int:
+    import fcntl
+    import termios
+
+    return struct.unpack("I", fcntl.ioctl(fd, termios.FIONREAD, bytes(4)))[0]
+
+
+class FdTransport:
+    """Serial port opened as a raw non-blocking file descriptor, configured with termios."""
+
+    def __init__(self, address: str, baudrate: int):
+        if not sys.platform.startswith("linux"):
+            raise OSError("The fd transport is only available on Linux, use the serial one instead.")
+        import tty
+
+        self.fd = os.open(address, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        tty.setraw(self.fd)
+        self.set_low_latency()
+        self._baudrate = None
+        self.baudrate = baudrate
+
+    def set_low_latency(self):
+        """Ask the USB-serial driver to push received bytes right away, instead of after its latency timer.
+        Ignored by the drivers which do not support it, e.g. ptys."""
+        import fcntl
+
+        try:
+            serial_struct = bytearray(fcntl.ioctl(self.fd, TIOCGSERIAL, bytes(SERIAL_STRUCT_SIZE)))
+        except OSError:
+            return
+        (flags,) = struct.unpack_from("i", serial_struct, SERIAL_FLAGS_OFFSET)
+        struct.pack_into("i", serial_struct, SERIAL_FLAGS_OFFSET, flags | ASYNC_LOW_LATENCY)
+        try:
+            fcntl.ioctl(self.fd, TIOCSSERIAL, bytes(serial_struct))
+        except OSError:
+            pass
+
+    @property
+    def baudrate(self) -> int:
+        return self._baudrate
+
+    @baudrate.setter
+    def baudrate(self, baudrate: int):
+        import termios
+
+        speed = getattr(termios, f"B{baudrate}", None)
+        if speed is not None:
+            attributes = termios.tcgetattr(self.fd)
+            attributes[4] = attributes[5] = speed
+            termios.tcsetattr(self.fd, termios.TCSANOW, attributes)
+        else:
+            import fcntl
+
+            fields = list(struct.unpack(TERMIOS2_FORMAT, fcntl.ioctl(self.fd, TCGETS2, bytes(44))))
+            fields[2] = (fields[2] & ~CBAUD) | BOTHER
+            fields[-2] = fields[-1] = baudrate
+            fcntl.ioctl(self.fd, TCSETS2, struct.pack(TERMIOS2_FORMAT, *fields))
+        self._baudrate = baudrate
+
+    @property
+    def in_waiting(self) -> int:
+        return get_in_waiting(self.fd)
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def read(self, size: int = 1) -> bytes:
+        return read_available(self.fd, size)
+
+    def write(self, data) -> int:
+        return write_all(self.fd, data)
+
+    def reset_input_buffer(self):
+        import termios
+
+        termios.tcflush(self.fd, termios.TCIFLUSH)
+
+    def reset_output_buffer(self):
+        import termios
+
+        termios.tcflush(self.fd, termios.TCOFLUSH)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class SocketTransport:
+    """Stream socket to a serial gateway. The baud rate is only recorded, the gateway sets the one of its port."""
+
+    def __init__(self, address: str, baudrate: int, scheme: str = "tcp", sock: socket.socket | None = None):
+        if sock is None:
+            sock = self.connect(scheme, address)
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.baudrate = baudrate
+
+    @staticmethod
+    def connect(scheme: str, address: str) -> socket.socket:
+        if scheme == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(address)
+            return sock
+
+        host, _, port = address.rpartition(":")
+        sock = socket.create_connection((host, int(port)))
+        # Packets are small and latency bound, they must not wait to be merged
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    @property
+    def in_waiting(self) -> int:
+        return get_in_waiting(self.sock.fileno())
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def read(self, size: int = 1) -> bytes:
+        try:
+            data = self.sock.recv(size)
+        except BlockingIOError:
+            return b""
+        if not data and size > 0:
+            # Unlike the "no data yet" case above, an empty recv is the end of the stream
+            raise ConnectionError(f"The gateway closed the connection of {type(self).__name__}.")
+        return data
+
+    def write(self, data) -> int:
+        return write_all(self.sock.fileno(), data)
+
+    def reset_input_buffer(self):
+        while self.read(4096):
+            pass
+
+    def reset_output_buffer(self):
+        # Sent bytes are already out of reach, in the buffers of the gateway
+        pass
+
+    def close(self):
+        self.sock.close()
+
+
+def create_loopback(name: str) -> socket.socket:
+    """Create the loopback "loop://name", and return the socket of its other end, to serve the motors."""
+    bus_end, device_end = socket.socketpair()
+    LOOPBACKS[name] = bus_end
+    return device_end
+
+
+class LoopbackTransport(SocketTransport):
+    """Bus end of a loopback created with `create_loopback`. Each loopback can be connected once."""
+
+    def __init__(self, address: str, baudrate: int):
+        sock = LOOPBACKS.pop(address, None)
+        if sock is None:
+            raise OSError(f"No loopback named '{address}', create it with `create_loopback` first.")
+        super().__init__(address, baudrate, sock=sock)
+
+
+def open_replay(address: str, baudrate: int):
+    from max_v1.motors.recording import ReplayTransport
+
+    return ReplayTransport(address, baudrate)
+
+
+# Factories of the transports by scheme, called with the address of the port and its baud rate
+TRANSPORTS = {
+    "serial": open_serial,
+    "fd": FdTransport,
+    "tcp": lambda address, baudrate: SocketTransport(address, baudrate, "tcp"),
+    "unix": lambda address, baudrate: SocketTransport(address, baudrate, "unix"),
+    "loop": LoopbackTransport,
+    "replay": open_replay,
+}
+
+
+def register_transport(scheme: str, factory):
+    """Make the ports "scheme://address" open with `factory(address, baudrate)`."""
+    TRANSPORTS[scheme] = factory
+
+
+def open_transport(port: str, baudrate: int):
+    scheme, address = parse_port(port)
+    factory = TRANSPORTS.get(scheme)
+    if factory is None:
+        raise ValueError(f"Unknown transport '{scheme}' of port '{port}'. Available transports: {list(TRANSPORTS)}")
+    return factory(address, baudrate)
@@ -16,6 +16,10 @@ and testing code logic that requires hardware and devices (e.g. robot arms, came
 
 Warning: These mocked versions are minimalist. They do not exactly mock every behaviors
 from the original classes and functions (e.g. return types might be None instead of boolean).
+Transactions succeed instantly; for the timing of a real bus, see `max_v1.motors.emulator`.
+
+The register memory of the motors is kept on the `PortHandler`, as bytes, so that what is written with
+`GroupSyncWrite`, `PacketHandler.writeTxOnly` or `regWriteTxRx` then `action` is read back by `GroupSyncRead`.
 """
 
 # from dynamixel_sdk import COMM_SUCCESS
@@ -39,18 +43,20 @@ DEFAULT_DEVICE_NAME = "/dev/ttyUSB0"
 DEFAULT_PROTOCOL_VERSION = 2.0
 
 
+BROADCAST_ID = 0xFE
+MEMORY_SIZE = 256
+
+
 def convert_to_bytes(value, bytes):
-    # TODO(rcadene): remove need to mock `convert_to_bytes` by implemented the inverse transform
-    # `convert_bytes_to_value`
-    del bytes  # unused
-    return value
+    # Little-endian two's complement, like `scservo_sdk`
+    return list((int(value) & ((1 << (8 * bytes)) - 1)).to_bytes(bytes, "little"))
 
 
 def get_default_motor_values(motor_index):
     return {
         # Key (int) are from SCS_SERIES_CONTROL_TABLE
         5: motor_index,  # ID
-        6: DEFAULT_BAUDRATE,  # Baud_rate
+        6: 0,  # Baud_rate, index of DEFAULT_BAUDRATE
         10: 0,  # Drive_Mode
         21: 32,  # P_Coefficient
         22: 32,  # D_Coefficient
@@ -69,17 +75,63 @@ def get_default_motor_values(motor_index):
     }
 
 
+# Size in bytes of the registers of `get_default_motor_values` which are not 1 byte long
+DEFAULT_VALUE_BYTES = {31: 2, 56: 2, 58: 2, 69: 2, 85: 2}
+
+
+def get_default_motor_memory(motor_index):
+    memory = bytearray(MEMORY_SIZE)
+    for address, value in get_default_motor_values(motor_index).items():
+        bytes = DEFAULT_VALUE_BYTES.get(address, 1)
+        memory[address : address + bytes] = convert_to_bytes(value, bytes)
+    return memory
+
+
+class MockSerial:
+    """Serial port without any byte to read."""
+
+    in_waiting = 0
+
+    def reset_input_buffer(self):
+        pass
+
+    def reset_output_buffer(self):
+        pass
+
+    def read(self, size=1):
+        return b""
+
+    def write(self, data):
+        return len(data)
+
+    def close(self):
+        pass
+
+
 class PortHandler:
     def __init__(self, port_name):
         self.port_name = port_name
         self.baudrate = DEFAULT_BAUDRATE
         self.is_open = False
-        self.ser = None  # Simuler un port série
+        self.ser = MockSerial()  # Simuler un port série
+        self.memory = {}  # Registres des moteurs par ID
+        self.registered = {}  # Valeurs en attente d'ACTION par ID, comme (adresse, octets)
 
     def openPort(self):
         self.is_open = True
         return True
 
+    def get_memory(self, id):
+        if id not in self.memory:
+            self.memory[id] = get_default_motor_memory(id)
+        return self.memory[id]
+
+    def readPort(self, length):
+        return self.ser.read(length)
+
+    def writePort(self, packet):
+        return self.ser.write(packet)
+
     def closePort(self):
         self.is_open = False
         return True
@@ -123,6 +175,24 @@ class PacketHandler:
     def getRxPacketError(self, error):
         return "NO_ERROR"  # Simuler qu'il n'y a pas d'erreur
 
+    def writeTxOnly(self, port, scs_id, address, length, data):
+        ids = list(port.memory) if scs_id == BROADCAST_ID else [scs_id]
+        for id in ids:
+            port.get_memory(id)[address : address + length] = bytes(data[:length])
+        return COMM_SUCCESS
+
+    def regWriteTxRx(self, port, scs_id, address, length, data):
+        port.registered[scs_id] = (address, bytes(data[:length]))
+        return COMM_SUCCESS, 0
+
+    def action(self, port, scs_id):
+        ids = list(port.registered) if scs_id == BROADCAST_ID else [scs_id]
+        for id in ids:
+            if id in port.registered:
+                address, data = port.registered.pop(id)
+                port.get_memory(id)[address : address + len(data)] = data
+        return COMM_SUCCESS
+
 
 class GroupSyncRead:
     def __init__(self, port_handler, packet_handler, start_address, data_length):
@@ -130,32 +200,42 @@ class GroupSyncRead:
         self.packet_handler = packet_handler
         self.start_address = start_address
         self.data_length = data_length
-        self.data = {}  # Stocker les données simulées par ID de moteur
+        self.data_dict = {}  # Octets bruts par ID de moteur, comme dans scservo_sdk
 
     def addParam(self, id):
-        # Initialiser les données pour ce moteur si nécessaire
-        if id not in self.data:
-            self.data[id] = {}
-            for addr in range(self.start_address, self.start_address + self.data_length):
-                self.data[id][addr] = 0  # Valeur par défaut
+        if id not in self.data_dict:
+            self.data_dict[id] = [0] * self.data_length
 
     def removeParam(self, id):
-        if id in self.data:
-            del self.data[id]
+        if id in self.data_dict:
+            del self.data_dict[id]
 
     def clearParam(self):
-        self.data = {}
+        self.data_dict = {}
 
-    def txRxPacket(self):
+    def txPacket(self):
+        return COMM_SUCCESS
+
+    def rxPacket(self):
+        # Copier les registres des moteurs, comme s'ils avaient répondu
+        start, end = self.start_address, self.start_address + self.data_length
+        for id in self.data_dict:
+            self.data_dict[id] = list(self.port_handler.get_memory(id)[start:end])
         return COMM_SUCCESS
 
+    def txRxPacket(self):
+        self.txPacket()
+        return self.rxPacket()
+
     def isAvailable(self, id, address, data_length):
-        return id in self.data and address in self.data[id]
+        offset = address - self.start_address
+        return id in self.data_dict and offset >= 0 and offset + data_length <= self.data_length
 
     def getData(self, id, address, data_length):
-        if id in self.data and address in self.data[id]:
-            return self.data[id][address]
-        return 0
+        if not self.isAvailable(id, address, data_length):
+            return 0
+        offset = address - self.start_address
+        return int.from_bytes(bytes(self.data_dict[id][offset : offset + data_length]), "little")
 
 
 class GroupSyncWrite:
@@ -164,25 +244,32 @@ class GroupSyncWrite:
         self.packet_handler = packet_handler
         self.start_address = start_address
         self.data_length = data_length
-        self.data = {}  # Stocker les données simulées par ID de moteur
+        self.data_dict = {}  # Octets bruts par ID de moteur, comme dans scservo_sdk
 
     def addParam(self, id, data):
-        if id not in self.data:
-            self.data[id] = {}
-        self.data[id][self.start_address] = data
+        if id in self.data_dict:
+            return False
+        self.data_dict[id] = list(data)
+        return True
 
     def removeParam(self, id):
-        if id in self.data:
-            del self.data[id]
+        if id in self.data_dict:
+            del self.data_dict[id]
 
     def changeParam(self, id, data):
-        if id in self.data:
-            self.data[id][self.start_address] = data
+        if id not in self.data_dict:
+            return False
+        self.data_dict[id] = list(data)
+        return True
 
     def clearParam(self):
-        self.data = {}
+        self.data_dict = {}
 
     def txPacket(self):
+        # Écrire dans les registres des moteurs
+        start = self.start_address
+        for id, data in self.data_dict.items():
+            self.port_handler.get_memory(id)[start : start + self.data_length] = bytes(data[: self.data_length])
         return COMM_SUCCESS
 
 